@@ -0,0 +1,125 @@
+"""Benchmark MarkerPoseSolver against aruco.estimatePoseSingleMarkers: time and jitter."""
+
+import argparse
+import pathlib
+import sys
+import time
+
+import cv2
+import cv2.aruco as aruco
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
+
+from capture.frame_analyzer import rvecs_to_yaw  # noqa: E402
+from capture.marker_pose import MarkerPoseSolver, marker_object_points  # noqa: E402
+from constants import MARKER_LENGTH  # noqa: E402
+
+CAMERA_MATRIX = np.array([[900.0, 0, 640], [0, 900.0, 360], [0, 0, 1]])
+DIST_COEFFS = np.zeros(5)
+
+
+def make_markers(marker_count, distance, tilt_deg, seed=0):
+    """Static marker poses in front of the camera, facing it with a small random tilt."""
+    rng = np.random.default_rng(seed)
+    rvecs = []
+    tvecs = []
+    for _ in range(marker_count):
+        yaw = rng.uniform(-np.pi, np.pi)
+        tilt = np.deg2rad(rng.uniform(-tilt_deg, tilt_deg, 2))
+        rotation_z, _ = cv2.Rodrigues(np.array([0.0, 0.0, yaw]))
+        rotation_tilt, _ = cv2.Rodrigues(np.array([tilt[0], tilt[1], 0.0]))
+        # Marker z axis pointing back at the camera
+        rotation_flip, _ = cv2.Rodrigues(np.array([np.pi, 0.0, 0.0]))
+        rvec, _ = cv2.Rodrigues(rotation_flip @ rotation_tilt @ rotation_z)
+        rvecs.append(rvec.ravel())
+        tvecs.append([rng.uniform(-0.6, 0.6), rng.uniform(-0.35, 0.35), distance])
+    return np.array(rvecs), np.array(tvecs)
+
+
+def project_markers(rvecs, tvecs):
+    """(N, 4, 2) image corners of the markers."""
+    object_points = marker_object_points(MARKER_LENGTH)
+    corners = [
+        cv2.projectPoints(object_points, rvec, tvec, CAMERA_MATRIX, DIST_COEFFS)[0].reshape(4, 2)
+        for rvec, tvec in zip(rvecs, tvecs)
+    ]
+    return np.array(corners, dtype=np.float32)
+
+
+def run(solve, frames):
+    """Per-frame times and (frames, N) position and yaw estimates."""
+    times = []
+    positions = []
+    yaws = []
+    for timestamp, corners in frames:
+        start = time.perf_counter()
+        rvecs, tvecs = solve(corners, timestamp)
+        times.append(time.perf_counter() - start)
+        positions.append(tvecs[:, 0, :2])
+        yaws.append(rvecs_to_yaw(rvecs))
+    return np.array(times), np.array(positions), np.array(yaws)
+
+
+def report(name, times, positions, yaws):
+    position_jitter = np.linalg.norm(positions - positions.mean(axis=0), axis=2).std() * 1000
+    yaw_deviation = np.angle(np.exp(1j * (yaws - np.median(yaws, axis=0))))
+    flips = np.count_nonzero(np.abs(yaw_deviation) > np.deg2rad(10))
+    inliers = np.where(np.abs(yaw_deviation) > np.deg2rad(10), np.nan, yaw_deviation)
+    print(
+        f"{name:>28}: {times.mean() * 1000:7.3f} ms/frame, "
+        f"position jitter {position_jitter:6.3f} mm, "
+        f"yaw jitter {np.rad2deg(np.nanstd(inliers)):6.3f} deg, "
+        f"{flips} flipped poses"
+    )
+
+
+def benchmark(marker_count, frame_count, noise, distance, tilt_deg):
+    rvecs, tvecs = make_markers(marker_count, distance, tilt_deg)
+    clean = project_markers(rvecs, tvecs)
+    rng = np.random.default_rng(1)
+    frames = [
+        (index / 30.0, clean + rng.normal(0, noise, clean.shape).astype(np.float32))
+        for index in range(frame_count)
+    ]
+    ids = np.arange(marker_count)
+
+    def estimate_single(corners, timestamp):
+        rvecs, tvecs, _ = aruco.estimatePoseSingleMarkers(
+            list(corners[:, None]), MARKER_LENGTH, CAMERA_MATRIX, DIST_COEFFS
+        )
+        return rvecs, tvecs
+
+    # Refinement from the previous pose is opt-in, enable it for 3 frames
+    solver = MarkerPoseSolver(max_guess_age=0.1)
+
+    def solve_ippe(corners, timestamp):
+        rvecs, tvecs, _, _ = solver.solve(ids, corners, CAMERA_MATRIX, DIST_COEFFS, timestamp)
+        return rvecs, tvecs
+
+    # Without guesses every marker is solved from scratch with IPPE
+    no_guess = MarkerPoseSolver(max_guess_age=0.0)
+
+    def solve_ippe_only(corners, timestamp):
+        rvecs, tvecs, _, _ = no_guess.solve(ids, corners, CAMERA_MATRIX, DIST_COEFFS, timestamp)
+        return rvecs, tvecs
+
+    print(
+        f"{marker_count} markers at {distance} m, {frame_count} frames, "
+        f"corner noise {noise} px"
+    )
+    report("estimatePoseSingleMarkers", *run(estimate_single, frames))
+    report("IPPE only", *run(solve_ippe_only, frames))
+    report("IPPE + previous pose guess", *run(solve_ippe, frames))
+    print(f"{solver.guessed} guessed solves, {solver.rejected} rejected")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--markers", type=int, default=16)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--noise", type=float, default=0.3, help="Corner noise std in pixels")
+    parser.add_argument("--distance", type=float, default=2.0, help="Camera distance in meters")
+    parser.add_argument("--tilt", type=float, default=5.0, help="Max marker tilt in degrees")
+    args = parser.parse_args()
+    benchmark(args.markers, args.frames, args.noise, args.distance, args.tilt)
@@ -0,0 +1,128 @@
+"""Benchmark the array-backed pose stores against the old dict-of-Pose2D stores."""
+
+import argparse
+import pathlib
+import sys
+import time
+from threading import Lock
+
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
+
+from constants import MARKER_DICTIONARY_SIZE  # noqa: E402
+from models.vectors import Pose2D, Stamp  # noqa: E402
+from path_crossing_resolver import PathCrossingResolver  # noqa: E402
+from stores.controller_context import ControllerContext  # noqa: E402
+from stores.shared_controller_context import SharedControllerContext  # noqa: E402
+
+
+class DictPoseStore:
+    """The lock-and-copy dict store the array-backed stores replaced."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._poses: dict[int, Pose2D] = {}
+
+    def update_batch(self, pose_dict):
+        with self._lock:
+            self._poses.update(pose_dict)
+
+    def get_all(self):
+        with self._lock:
+            return self._poses.copy()
+
+
+def time_call(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def benchmark(agent_count, repeats, rng):
+    ids = np.arange(agent_count)
+    # Fleet on a 1 m grid, each agent heading for a point close by
+    side = int(np.ceil(np.sqrt(agent_count)))
+    pose = np.stack([ids % side * 1.0, ids // side * 1.0, rng.uniform(-np.pi, np.pi, agent_count)])
+    target = pose + rng.uniform(-0.5, 0.5, (3, agent_count))
+    stamp = Stamp(time.monotonic(), 1)
+    pose_dict = {i: Pose2D(*pose[:, i].tolist(), stamp) for i in range(agent_count)}
+    target_dict = {i: Pose2D(*target[:, i].tolist(), stamp) for i in range(agent_count)}
+
+    dict_poses, dict_targets = DictPoseStore(), DictPoseStore()
+    dict_targets.update_batch(target_dict)
+
+    def dict_cycle():
+        # Publish a frame, then a consumer reads both stores and loops
+        dict_poses.update_batch({i: Pose2D(p.x, p.y, p.theta, stamp) for i, p in pose_dict.items()})
+        poses, targets = dict_poses.get_all(), dict_targets.get_all()
+        return [
+            ((targets[i].x - p.x) ** 2 + (targets[i].y - p.y) ** 2) ** 0.5
+            for i, p in poses.items()
+        ]
+
+    def array_cycle(context):
+        context.agent_pose_store.update_arrays(ids, pose, timestamp=stamp.timestamp, sequence=1)
+        state = context.world_state.snapshot()
+        poses, targets = state.agent_poses, state.agent_targets
+        return np.hypot(targets.x[ids] - poses.x[ids], targets.y[ids] - poses.y[ids])
+
+    context = ControllerContext()
+    context.agent_target_store.update_arrays(ids, target, timestamp=stamp.timestamp)
+    # Same cycle through shared memory as a stage process sees it, which holds
+    # MARKER_DICTIONARY_SIZE agents
+    shared_context = SharedControllerContext() if agent_count <= MARKER_DICTIONARY_SIZE else None
+    if shared_context is not None:
+        shared_context.agent_target_store.update_arrays(ids, target, timestamp=stamp.timestamp)
+
+    def shim_cycle():
+        # Dict in, dict out through the compatibility layer
+        context.agent_pose_store.update_batch(pose_dict)
+        return dict(context.agent_pose_store.get_all().items())
+
+    np.testing.assert_allclose(dict_cycle(), array_cycle(context))
+    if shared_context is not None:
+        np.testing.assert_allclose(dict_cycle(), array_cycle(shared_context))
+    resolver = PathCrossingResolver(context)
+    state = context.world_state.snapshot()
+    result = {
+        "dict": time_call(dict_cycle, repeats),
+        "arrays": time_call(lambda: array_cycle(context), repeats),
+        "shared": (
+            time_call(lambda: array_cycle(shared_context), repeats)
+            if shared_context is not None
+            else float("nan")
+        ),
+        "shim": time_call(shim_cycle, repeats),
+        "conflicts": time_call(
+            lambda: resolver.detect_conflicts(state.agent_targets, state.agent_poses),
+            max(1, repeats // 10),
+        ),
+    }
+    if shared_context is not None:
+        shared_context.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--agents", type=int, nargs="+", default=[4, 64, 512])
+    parser.add_argument("--repeats", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print("Per publish + read cycle, microseconds")
+    print(
+        f"{'agents':>7} {'dict':>10} {'arrays':>10} {'shared':>10} {'dict shim':>10} {'conflicts':>10}"
+    )
+    for agent_count in args.agents:
+        result = benchmark(agent_count, args.repeats, rng)
+        print(
+            f"{agent_count:>7} {result['dict']:>10.1f} {result['arrays']:>10.1f} "
+            f"{result['shared']:>10.1f} {result['shim']:>10.1f} {result['conflicts']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
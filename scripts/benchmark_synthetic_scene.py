@@ -0,0 +1,142 @@
+"""
+Camera-free benchmark on rendered ArUco scenes.
+
+For every marker count and resolution a SyntheticScene is rendered and
+- detection throughput and rate are measured on pre-rendered frames,
+- pose accuracy against the ground truth is measured with MarkerPoseSolver,
+- end-to-end latency (capture timestamp to pose in AgentPoseStore) is
+  measured by running ObserverThread and FrameAnalyzer on a
+  SyntheticFrameSource in real time.
+
+    python scripts/benchmark_synthetic_scene.py --markers 4 16 64 --resolutions 1280x720 2560x1440
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+
+import numpy as np
+from PyQt6.QtCore import QCoreApplication
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
+
+from capture.detector_profile import load_detector_profile  # noqa: E402
+from capture.frame_analyzer import FrameAnalyzer, rvecs_to_yaw  # noqa: E402
+from capture.marker_detector import MarkerDetector  # noqa: E402
+from capture.marker_pose import MarkerPoseSolver  # noqa: E402
+from capture.observer import ObserverThread  # noqa: E402
+from capture.synthetic_scene import SyntheticFrameSource, SyntheticScene  # noqa: E402
+from stores.controller_context import ControllerContext  # noqa: E402
+
+
+def parse_resolution(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def measure_detection(scene, frame_count, fps):
+    """Detection ms per frame, detection rate and pose errors on pre-rendered frames."""
+    frames = [scene.render(index / fps, index) for index in range(frame_count)]
+    detector = MarkerDetector(load_detector_profile(0).create_detector())
+    solver = MarkerPoseSolver()
+    times = []
+    found = 0
+    position_errors = []
+    yaw_errors = []
+    for index, (frame, truth) in enumerate(frames):
+        start = time.perf_counter()
+        corners, ids = detector.detect(frame)
+        times.append(time.perf_counter() - start)
+        if ids is None:
+            continue
+        flat_ids = ids.flatten()
+        known = flat_ids < scene.marker_count
+        found += np.count_nonzero(known)
+        rvecs, tvecs, _, valid = solver.solve(
+            flat_ids, corners, scene.camera_matrix, np.zeros(5), index / fps
+        )
+        yaws = rvecs_to_yaw(rvecs)
+        for marker_id, tvec, yaw, ok in zip(flat_ids, tvecs[:, 0], yaws, valid & known):
+            if not ok:
+                continue
+            pose = truth[int(marker_id)]
+            position_errors.append(np.hypot(tvec[0] - pose.x, tvec[1] - pose.y))
+            yaw_errors.append(abs(np.angle(np.exp(1j * (yaw - pose.theta)))))
+    return (
+        np.mean(times) * 1000,
+        found / (frame_count * scene.marker_count),
+        np.array(position_errors) * 1000,
+        np.degrees(yaw_errors),
+    )
+
+
+def measure_latency(scene, fps, seconds):
+    """Capture-to-AgentPoseStore latencies in ms with the real pipeline threads."""
+    context = ControllerContext()
+    source = SyntheticFrameSource(scene, fps, frame_count=int(fps * seconds))
+    observer = ObserverThread(context, frame_source=source)
+    analyzer = FrameAnalyzer(observer, context)
+    observer.start()
+    analyzer.start()
+    latencies = []
+    last_sequence = 0
+    while observer.isRunning():
+        stamps = [pose.stamp for pose in context.agent_pose_store.get_all().values() if pose]
+        if stamps:
+            newest = max(stamps, key=lambda stamp: stamp.sequence)
+            if newest.sequence > last_sequence:
+                last_sequence = newest.sequence
+                latencies.append((time.monotonic() - newest.timestamp) * 1000)
+        time.sleep(0.001)
+    analyzer.stop()
+    analyzer.wait()
+    return np.array(latencies), observer.processed_frames, observer.dropped_frames
+
+
+def percentile(values, q):
+    return np.percentile(values, q) if len(values) else float("nan")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--markers", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument(
+        "--resolutions", type=parse_resolution, nargs="+", default=[(1280, 720), (2560, 1440)]
+    )
+    parser.add_argument("--frames", type=int, default=30, help="Frames for throughput and accuracy")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--latency-seconds", type=float, default=3.0, help="0 skips latency")
+    parser.add_argument("--blur", type=float, default=0.8, help="Gaussian blur sigma in pixels")
+    parser.add_argument("--noise", type=float, default=3.0, help="Noise std in gray levels")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+    for width, height in args.resolutions:
+        for marker_count in args.markers:
+            scene = SyntheticScene(
+                marker_count, width, height, blur=args.blur, noise=args.noise, seed=args.seed
+            )
+            detect_ms, rate, position_errors, yaw_errors = measure_detection(
+                scene, args.frames, args.fps
+            )
+            print(
+                f"{width}x{height}, {marker_count:3d} markers: "
+                f"detect {detect_ms:7.2f} ms/frame, rate {rate:6.1%}, "
+                f"position error median {percentile(position_errors, 50):5.1f} / "
+                f"p95 {percentile(position_errors, 95):5.1f} mm, "
+                f"yaw error median {percentile(yaw_errors, 50):4.2f} / "
+                f"p95 {percentile(yaw_errors, 95):4.2f} deg"
+            )
+            if args.latency_seconds > 0:
+                latencies, processed, dropped = measure_latency(
+                    scene, args.fps, args.latency_seconds
+                )
+                print(
+                    f"{'':>24}end-to-end latency median {percentile(latencies, 50):6.1f} / "
+                    f"p95 {percentile(latencies, 95):6.1f} ms, "
+                    f"{processed} frames processed, {dropped} dropped"
+                )
@@ -0,0 +1,99 @@
+"""Benchmark tiled parallel marker detection against a single detectMarkers call."""
+
+import argparse
+import pathlib
+import sys
+import time
+
+import cv2
+import cv2.aruco as aruco
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
+
+from capture.marker_detector import MarkerDetector, TiledDetector  # noqa: E402
+
+
+def render_scene(width, height, marker_count, marker_size, seed=0):
+    """Gray frame with randomly placed, non-overlapping DICT_5X5_100 markers."""
+    dictionary = aruco.getPredefinedDictionary(aruco.DICT_5X5_100)
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width), 180, dtype=np.uint8)
+    cell = marker_size * 2
+    cells = [
+        (x, y)
+        for y in range(0, height - cell + 1, cell)
+        for x in range(0, width - cell + 1, cell)
+    ]
+    if marker_count > len(cells):
+        raise ValueError(f"At most {len(cells)} markers of {marker_size}px fit")
+    for marker_id, index in enumerate(rng.choice(len(cells), marker_count, replace=False)):
+        x, y = cells[index]
+        quiet = marker_size // 4
+        frame[y : y + marker_size + 2 * quiet, x : x + marker_size + 2 * quiet] = 255
+        marker = aruco.generateImageMarker(dictionary, marker_id, marker_size)
+        frame[y + quiet : y + quiet + marker_size, x + quiet : x + quiet + marker_size] = marker
+    return cv2.GaussianBlur(frame, (3, 3), 0)
+
+
+def time_detector(detector, frame, repeats):
+    detector.detect(frame)  # warm up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        corners, ids = detector.detect(frame)
+        timings.append((time.perf_counter() - start) * 1000)
+    found = set() if ids is None else set(ids.flatten().tolist())
+    return np.array(timings), found
+
+
+def benchmark(width, height, marker_count, marker_size, grid, overlap, workers, repeats):
+    aruco_detector = aruco.ArucoDetector(
+        aruco.getPredefinedDictionary(aruco.DICT_5X5_100), aruco.DetectorParameters()
+    )
+    frame = render_scene(width, height, marker_count, marker_size)
+
+    single = MarkerDetector(aruco_detector)
+    tiled = TiledDetector(aruco_detector, grid=grid, overlap=overlap, workers=workers)
+
+    print(f"{width}x{height}, {marker_count} markers of {marker_size}px, {repeats} runs")
+    single_times, single_found = time_detector(single, frame, repeats)
+    tiled_times, tiled_found = time_detector(tiled, frame, repeats)
+    tiled.close()
+
+    for name, times, found in (
+        ("single call", single_times, single_found),
+        (f"tiled {grid[0]}x{grid[1]}, {workers} threads", tiled_times, tiled_found),
+    ):
+        print(
+            f"  {name:<28} median {np.median(times):7.2f} ms  "
+            f"p95 {np.percentile(times, 95):7.2f} ms  found {len(found)}"
+        )
+    print(f"  speedup {np.median(single_times) / np.median(tiled_times):.2f}x")
+    if single_found != tiled_found:
+        print(f"  id mismatch: single only {sorted(single_found - tiled_found)}, "
+              f"tiled only {sorted(tiled_found - single_found)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=2560)
+    parser.add_argument("--height", type=int, default=1440)
+    parser.add_argument("--markers", type=int, default=4)
+    parser.add_argument("--marker-size", type=int, default=120)
+    parser.add_argument("--grid", type=int, nargs=2, default=[4, 2], metavar=("COLS", "ROWS"))
+    parser.add_argument("--overlap", type=int, default=160)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    benchmark(
+        args.width,
+        args.height,
+        args.markers,
+        args.marker_size,
+        tuple(args.grid),
+        args.overlap,
+        args.workers,
+        args.repeats,
+    )
@@ -0,0 +1,64 @@
+"""Measure a camera's capture modes and save the best one as its capture profile."""
+
+import argparse
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
+
+from capture.capture_profile import (  # noqa: E402
+    FOURCCS,
+    negotiate_capture_profile,
+    save_capture_profile,
+)
+from constants import CAPTURE_PROFILE_PATH, CAPTURE_RESOLUTIONS, CAPTURE_TARGET_FPS  # noqa: E402
+
+
+def parse_resolution(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("device", type=int, help="Camera index")
+    parser.add_argument(
+        "--resolutions",
+        type=parse_resolution,
+        nargs="+",
+        default=CAPTURE_RESOLUTIONS,
+        help="Candidates as WIDTHxHEIGHT",
+    )
+    parser.add_argument("--fourccs", nargs="+", default=list(FOURCCS))
+    parser.add_argument("--target-fps", type=float, default=CAPTURE_TARGET_FPS)
+    parser.add_argument(
+        "--gray", action="store_true", help="Capture luma only instead of BGR frames"
+    )
+    parser.add_argument("--output", type=pathlib.Path, default=CAPTURE_PROFILE_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="Do not save the result")
+    args = parser.parse_args()
+
+    best, measurements = negotiate_capture_profile(
+        args.device, args.resolutions, args.fourccs, args.target_fps, args.gray
+    )
+    print(f"{'mode':>18} {'fps':>7} {'latency':>10}")
+    for m in measurements:
+        latency = f"{m.latency_ms:.1f} ms" if m.latency_ms is not None else "n/a"
+        print(f"{m.profile.fourcc} {m.width:>5}x{m.height:<5} {m.fps:7.1f} {latency:>10}")
+    if best is None:
+        raise SystemExit(f"Camera {args.device} delivered no usable mode")
+
+    chosen = next(m for m in measurements if m.profile == best)
+    print(
+        f"Best: {best.fourcc} {best.width}x{best.height}{' gray' if best.gray else ''} "
+        f"at {chosen.fps:.1f} fps"
+    )
+    if not args.dry_run:
+        save_capture_profile(
+            args.device,
+            best,
+            args.output,
+            measured_fps=chosen.fps,
+            latency_ms=chosen.latency_ms,
+        )
+        print(f"Saved profile for camera {args.device} to {args.output}")
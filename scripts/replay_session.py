@@ -0,0 +1,102 @@
+"""
+Replay a detection recording without camera or robots.
+
+By default every recorded frame is run through FrameAnalyzer's pose
+extraction and the state estimator on this thread, as fast as possible, and
+the per-frame cost is reported. With --pipeline the recording is instead
+published into a FrameDataStore by a DetectionReplayThread at --speed and the
+FrameAnalyzer and PathCrossingResolver threads consume it as in a live session.
+
+    python scripts/replay_session.py recordings/session-20260101-120000-cam0.odr
+    python scripts/replay_session.py --pipeline --speed 2 recording.odr
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
+
+from capture.detection_recording import DetectionRecording, DetectionReplayThread  # noqa: E402
+from capture.frame_analyzer import FrameAnalyzer  # noqa: E402
+from constants import ALL_MARKER_IDS  # noqa: E402
+from enums.capture.pose_mode import PoseMode  # noqa: E402
+from path_crossing_resolver import PathCrossingResolver  # noqa: E402
+from stores.controller_context import ControllerContext  # noqa: E402
+
+
+def profile_analyzer(recording, pose_mode):
+    context = ControllerContext()
+    calibration = context.calibration_profile.get()
+    if calibration is None:
+        raise SystemExit("No calibration data")
+    analyzer = FrameAnalyzer(None, context, pose_mode=pose_mode)
+    times = []
+    detected = 0
+    for record in recording:
+        start = time.perf_counter()
+        if record.ids is not None:
+            poses = analyzer.extract_poses(
+                record.ids, record.corners, calibration.camera_matrix, record.timestamp
+            )
+        else:
+            poses = dict.fromkeys(ALL_MARKER_IDS.tolist())
+        context.pose_estimator.update(poses, record.timestamp, record.sequence)
+        times.append(time.perf_counter() - start)
+        detected += 0 if record.ids is None else len(record.ids)
+    times = np.array(times) * 1000
+    print(
+        f"{len(recording)} frames, {detected} detections: "
+        f"{times.mean():.3f} ms mean, {np.percentile(times, 95):.3f} ms p95, "
+        f"{times.max():.3f} ms max per frame"
+    )
+
+
+def replay_pipeline(recording, speed, pose_mode):
+    context = ControllerContext()
+    analyzer = FrameAnalyzer(None, context, pose_mode=pose_mode)
+    resolver = PathCrossingResolver(context)
+    replay = DetectionReplayThread(recording, context.frame_data_store, speed)
+    analyzer.start()
+    resolver.start()
+    start = time.monotonic()
+    replay.start()
+    replay.wait()
+    elapsed = time.monotonic() - start
+    # Let the analyzer finish the last frame
+    time.sleep(0.1)
+    for thread in (analyzer, resolver):
+        thread.stop()
+        thread.wait()
+    print(
+        f"Replayed {replay.published} frames in {elapsed:.2f} s "
+        f"(recorded {recording.duration:.2f} s), analyzer reached sequence "
+        f"{analyzer.last_sequence}"
+    )
+    for marker_id, pose in sorted(context.agent_pose_store.get_all().items()):
+        print(f"  agent {marker_id}: {pose}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("recording", type=pathlib.Path)
+    parser.add_argument("--pipeline", action="store_true", help="Replay through the threads")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="Replay speed, 0 for as fast as possible"
+    )
+    parser.add_argument(
+        "--pose-mode", choices=[mode.name for mode in PoseMode], default=PoseMode.PNP.name
+    )
+    args = parser.parse_args()
+
+    recording = DetectionRecording(args.recording)
+    pose_mode = PoseMode[args.pose_mode]
+    if args.pipeline:
+        replay_pipeline(recording, args.speed or None, pose_mode)
+    else:
+        profile_analyzer(recording, pose_mode)
@@ -0,0 +1,230 @@
+"""
+Search ArUco DetectorParameters for the best detection rate per millisecond.
+
+Candidates are scored against recorded frames of one camera. Markers found by
+a thorough reference configuration count as ground truth; a candidate must
+find at least --min-rate of them, without false positives and with corners
+within --max-corner-error pixels of the reference, and the one with the
+highest detection rate per millisecond is saved as that camera's profile.
+
+The ROI tracking, pyramid and tiled strategies search crops or a downscaled
+copy of the frame, so the best candidates are run through each of them as
+well and rejected if any of them loses markers or reports false positives.
+
+    python scripts/tune_detector_parameters.py --camera-id 0 frames/*.png
+    python scripts/tune_detector_parameters.py --camera-id 0 --device 0 --capture 60
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+
+import cv2
+import cv2.aruco as aruco
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
+
+from capture.detector_profile import DetectorProfile, save_detector_profile  # noqa: E402
+from capture.frame_source import CameraFrameSource  # noqa: E402
+from capture.marker_detector import create_marker_detector  # noqa: E402
+from constants import DETECTOR_PROFILE_PATH  # noqa: E402
+from enums.capture.detection_mode import DetectionMode  # noqa: E402
+
+THRESHOLD_WINDOWS = [3, 5, 7, 9, 13, 17, 23, 33, 43, 53]
+THRESHOLD_STEPS = [4, 6, 10, 20, 50]
+MIN_PERIMETER_RATES = [0.01, 0.02, 0.03, 0.05, 0.08, 0.12]
+MAX_PERIMETER_RATES = [0.5, 1.0, 2.0, 4.0]
+CORNER_REFINEMENTS = [
+    aruco.CORNER_REFINE_NONE,
+    aruco.CORNER_REFINE_SUBPIX,
+    aruco.CORNER_REFINE_CONTOUR,
+]
+
+REFERENCE = DetectorProfile(
+    aruco.DICT_5X5_100,
+    {
+        "adaptiveThreshWinSizeMin": 3,
+        "adaptiveThreshWinSizeMax": 53,
+        "adaptiveThreshWinSizeStep": 4,
+        "minMarkerPerimeterRate": 0.01,
+        "cornerRefinementMethod": aruco.CORNER_REFINE_SUBPIX,
+    },
+)
+
+
+def load_frames(paths):
+    frames = []
+    for path in paths:
+        image = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            print(f"Skipping unreadable {path}")
+            continue
+        frames.append(image)
+    return frames
+
+
+def capture_frames(device, count):
+    """Frames captured the way the pipeline captures them, with the camera's profile."""
+    source = CameraFrameSource(device)
+    if not source.open():
+        return []
+    frames = []
+    while len(frames) < count:
+        captured = source.read()
+        if captured is None:
+            break
+        image = captured.image
+        frames.append(image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+    source.release()
+    return frames
+
+
+def random_profile(rng) -> DetectorProfile:
+    window_min, window_max = sorted(rng.choice(THRESHOLD_WINDOWS, 2))
+    # Only the parameters are searched: the pipeline's id arrays hold exactly
+    # the ids of the default DICT_5X5_100, and smaller dictionaries of the
+    # family miss the ground reference markers
+    return DetectorProfile(
+        parameters={
+            "adaptiveThreshWinSizeMin": int(window_min),
+            "adaptiveThreshWinSizeMax": int(window_max),
+            "adaptiveThreshWinSizeStep": int(rng.choice(THRESHOLD_STEPS)),
+            "minMarkerPerimeterRate": float(rng.choice(MIN_PERIMETER_RATES)),
+            "maxMarkerPerimeterRate": float(rng.choice(MAX_PERIMETER_RATES)),
+            "cornerRefinementMethod": int(rng.choice(CORNER_REFINEMENTS)),
+        },
+    )
+
+
+def detect_all(profile, frames, mode=DetectionMode.FULL_FRAME):
+    """Per-frame {id: (4, 2) corners} and the mean detection time in ms."""
+    detector = create_marker_detector(
+        mode, profile.create_detector(), profile.create_crop_detector()
+    )
+    results = []
+    start = time.perf_counter()
+    for frame in frames:
+        corners, ids = detector.detect(frame)
+        results.append(
+            {}
+            if ids is None
+            else {int(i): c.reshape(4, 2) for i, c in zip(ids.flatten(), corners)}
+        )
+    elapsed_ms = (time.perf_counter() - start) * 1000 / len(frames)
+    detector.close()
+    return results, elapsed_ms
+
+
+def evaluate(profile, frames, reference, mode=DetectionMode.FULL_FRAME):
+    """(detection rate, false positives, mean corner error in px, ms per frame)."""
+    results, elapsed_ms = detect_all(profile, frames, mode)
+    expected = sum(len(markers) for markers in reference)
+    found = 0
+    false_positives = 0
+    corner_errors = []
+    for detected, truth in zip(results, reference):
+        for marker_id, corners in detected.items():
+            if marker_id not in truth:
+                false_positives += 1
+                continue
+            found += 1
+            corner_errors.append(np.linalg.norm(corners - truth[marker_id], axis=1).mean())
+    rate = found / expected if expected else 0.0
+    corner_error = float(np.mean(corner_errors)) if corner_errors else np.inf
+    return rate, false_positives, corner_error, elapsed_ms
+
+
+def strategy_failure(profile, frames, reference, modes, min_rate):
+    """Why the profile fails under one of the detection modes, or None."""
+    for mode in modes:
+        rate, false_positives, _, _ = evaluate(profile, frames, reference, mode)
+        if rate < min_rate or false_positives:
+            return f"{mode.name}: rate {rate:.3f}, {false_positives} false positives"
+    return None
+
+
+def tune(frames, trials, min_rate, max_corner_error, seed, modes):
+    reference, reference_ms = detect_all(REFERENCE, frames)
+    expected = sum(len(markers) for markers in reference)
+    if not expected:
+        raise SystemExit("No markers found in the frames, nothing to tune against")
+    print(f"{len(frames)} frames, {expected} reference detections, reference {reference_ms:.2f} ms")
+
+    rng = np.random.default_rng(seed)
+    candidates = [DetectorProfile()] + [random_profile(rng) for _ in range(trials)]
+    best = None
+    for index, profile in enumerate(candidates):
+        rate, false_positives, corner_error, elapsed_ms = evaluate(profile, frames, reference)
+        score = rate / elapsed_ms
+        accepted = (
+            rate >= min_rate and false_positives == 0 and corner_error <= max_corner_error
+        )
+        if index == 0:
+            print(
+                f"defaults: rate {rate:.3f}, {elapsed_ms:.2f} ms, "
+                f"corner error {corner_error:.2f} px, {score:.3f} /ms"
+            )
+        if not accepted or (best is not None and score <= best[0]):
+            continue
+        failure = strategy_failure(profile, frames, reference, modes, min_rate)
+        if failure is not None:
+            print(f"[{index}/{trials}] rejected, {failure}")
+        else:
+            best = (score, profile, rate, corner_error, elapsed_ms)
+            print(
+                f"[{index}/{trials}] rate {rate:.3f}, {elapsed_ms:.2f} ms, "
+                f"corner error {corner_error:.2f} px, {score:.3f} /ms"
+            )
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("frames", nargs="*", type=pathlib.Path, help="Recorded frame images")
+    parser.add_argument("--camera-id", type=int, default=0)
+    parser.add_argument("--device", type=int, help="Capture frames from this camera instead")
+    parser.add_argument("--capture", type=int, default=60, help="Frames to capture")
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--min-rate", type=float, default=0.98)
+    parser.add_argument("--max-corner-error", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--modes",
+        nargs="*",
+        type=lambda name: DetectionMode[name.upper()],
+        default=[DetectionMode.ROI_TRACKING, DetectionMode.PYRAMID, DetectionMode.TILED],
+        help="Detection modes the profile must also work with (frames in capture order)",
+    )
+    parser.add_argument("--output", type=pathlib.Path, default=DETECTOR_PROFILE_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="Do not save the result")
+    args = parser.parse_args()
+
+    if args.device is not None:
+        frames = capture_frames(args.device, args.capture)
+    else:
+        frames = load_frames(args.frames)
+    if not frames:
+        raise SystemExit("No frames to tune on")
+
+    best = tune(
+        frames, args.trials, args.min_rate, args.max_corner_error, args.seed, args.modes
+    )
+    if best is None:
+        raise SystemExit("No candidate met the detection rate and accuracy requirements")
+    score, profile, rate, corner_error, elapsed_ms = best
+    print(f"Best: {profile}")
+    if not args.dry_run:
+        save_detector_profile(
+            args.camera_id,
+            profile,
+            args.output,
+            detection_rate=rate,
+            corner_error=corner_error,
+            ms_per_frame=elapsed_ms,
+            frames=len(frames),
+        )
+        print(f"Saved profile for camera {args.camera_id} to {args.output}")
@@ -0,0 +1,179 @@
+"""Per-agent alpha-beta state estimation between detection and control."""
+
+from threading import Lock
+from typing import Optional
+
+import numpy as np
+
+from constants import (
+    ALL_MARKER_IDS,
+    ESTIMATOR_ALPHA,
+    ESTIMATOR_BETA,
+    ESTIMATOR_COAST_TIME,
+    MARKER_DICTIONARY_SIZE,
+)
+from models.vectors import Pose2D, Stamp
+from stores.pose_table import PoseTable
+
+
+def wrap_angle(angle: np.ndarray) -> np.ndarray:
+    """Wrap angles to [-pi, pi)."""
+    return (angle + np.pi) % (2 * np.pi) - np.pi
+
+
+class AgentStateEstimator:
+    """
+    Constant-velocity alpha-beta filter for every agent at once.
+
+    The state of each marker id (x, y, theta and their rates) lives in one
+    slot of a set of NumPy arrays, so a frame's measurements are filtered in a
+    single vectorized step. When a marker is not detected its pose coasts on
+    the estimated velocity for up to coast_time seconds before it is reported
+    as lost (None). predict() extrapolates every agent to an arbitrary time,
+    which lets the transmitter compensate for capture and processing latency.
+    Every returned pose is stamped with the capture time and frame sequence
+    of the agent's last actual detection, so coasted poses age correctly.
+    Measurements that carry a Stamp, such as fused poses partly observed by
+    other cameras, are filtered at their own capture time instead of the
+    frame's; those older than an agent's state are dropped rather than
+    rewinding it.
+    """
+
+    def __init__(
+        self,
+        alpha: float = ESTIMATOR_ALPHA,
+        beta: float = ESTIMATOR_BETA,
+        coast_time: float = ESTIMATOR_COAST_TIME,
+        size: int = MARKER_DICTIONARY_SIZE,
+    ):
+        self.alpha = alpha
+        self.beta = beta
+        self.coast_time = coast_time
+        self._lock = Lock()
+        self._position = np.zeros((size, 3))  # x, y, theta
+        self._rate = np.zeros((size, 3))  # vx, vy, omega
+        self._time = np.zeros(size)  # time the state refers to
+        self._last_seen = np.full(size, -np.inf)
+        self._last_sequence = np.full(size, -1, dtype=np.int64)
+        self._expected = np.zeros(size, dtype=bool)
+        self._expected[ALL_MARKER_IDS] = True
+
+    def update(
+        self,
+        measurements: dict[int, Optional[Pose2D]],
+        timestamp: float,
+        sequence: Optional[int] = None,
+    ) -> dict[int, Optional[Pose2D]]:
+        """Filter one frame's measurements and return the poses at timestamp."""
+        with self._lock:
+            self._measure(measurements, timestamp, sequence)
+            return self._poses_at(timestamp)
+
+    def update_table(
+        self,
+        measurements: dict[int, Optional[Pose2D]],
+        timestamp: float,
+        sequence: Optional[int] = None,
+    ) -> PoseTable:
+        """update() returning a PoseTable instead of Pose2D objects."""
+        with self._lock:
+            self._measure(measurements, timestamp, sequence)
+            return self._table_at(timestamp)
+
+    def predict(self, timestamp: float) -> dict[int, Optional[Pose2D]]:
+        """Poses of all tracked agents extrapolated to timestamp."""
+        with self._lock:
+            return self._poses_at(timestamp)
+
+    def predict_table(self, timestamp: float) -> PoseTable:
+        """predict() returning a PoseTable instead of Pose2D objects."""
+        with self._lock:
+            return self._table_at(timestamp)
+
+    def reset(self):
+        with self._lock:
+            self._rate[:] = 0.0
+            self._last_seen[:] = -np.inf
+
+    def _measure(
+        self, measurements: dict[int, Optional[Pose2D]], timestamp: float, sequence: Optional[int]
+    ):
+        measured = [
+            (i, p.x, p.y, p.theta, timestamp if p.stamp is None else p.stamp.timestamp)
+            for i, p in measurements.items()
+            if p is not None
+        ]
+        if measured:
+            table = np.array(measured)
+            ids = self._correct(table[:, 0].astype(int), table[:, 1:4], table[:, 4])
+            self._last_sequence[ids] = -1 if sequence is None else sequence
+
+    def _correct(
+        self, ids: np.ndarray, measurement: np.ndarray, timestamp: np.ndarray
+    ) -> np.ndarray:
+        """Filter measurements taken at the given capture times, returns the ids applied."""
+        # Agents that were lost (or never seen) restart from the measurement
+        fresh = (timestamp - self._last_seen[ids]) > self.coast_time
+        # A tracked agent's state never moves back in time: measurements older
+        # than it, e.g. a fused pose stamped by a slower camera, are dropped
+        current = fresh | (timestamp >= self._time[ids])
+        if not current.all():
+            ids, measurement, timestamp = ids[current], measurement[current], timestamp[current]
+            fresh = fresh[current]
+        dt = timestamp - self._time[ids]
+        tracked = ~fresh
+
+        if tracked.any():
+            t_ids = ids[tracked]
+            t_dt = dt[tracked][:, None]
+            predicted = self._position[t_ids] + self._rate[t_ids] * t_dt
+            residual = measurement[tracked] - predicted
+            residual[:, 2] = wrap_angle(residual[:, 2])
+            self._position[t_ids] = predicted + self.alpha * residual
+            self._position[t_ids, 2] = wrap_angle(self._position[t_ids, 2])
+            # Measurements from the state's own time only correct the position
+            gain = np.where(t_dt > 1e-6, self.beta / np.maximum(t_dt, 1e-6), 0.0)
+            self._rate[t_ids] += gain * residual
+
+        if fresh.any():
+            f_ids = ids[fresh]
+            self._position[f_ids] = measurement[fresh]
+            self._rate[f_ids] = 0.0
+
+        self._time[ids] = timestamp
+        self._last_seen[ids] = np.maximum(self._last_seen[ids], timestamp)
+        return ids
+
+    def _poses_at(self, timestamp: float) -> dict[int, Optional[Pose2D]]:
+        alive = (timestamp - self._last_seen) <= self.coast_time
+        alive_ids = np.flatnonzero(alive)
+        dt = (timestamp - self._time[alive_ids])[:, None]
+        pose = self._position[alive_ids] + self._rate[alive_ids] * dt
+        pose[:, 2] = wrap_angle(pose[:, 2])
+
+        poses: dict[int, Optional[Pose2D]] = dict.fromkeys(
+            np.flatnonzero(self._expected & ~alive).tolist()
+        )
+        stamps = map(
+            _stamp, self._last_seen[alive_ids].tolist(), self._last_sequence[alive_ids].tolist()
+        )
+        poses.update(zip(alive_ids.tolist(), map(Pose2D, *pose.T.tolist(), stamps)))
+        return poses
+
+    def _table_at(self, timestamp: float) -> PoseTable:
+        # Same entries as _poses_at: every alive agent plus expected ones as lost
+        alive = (timestamp - self._last_seen) <= self.coast_time
+        dt = np.where(alive, timestamp - self._time, 0.0)[:, None]
+        pose = self._position + self._rate * dt
+        pose[:, 2] = wrap_angle(pose[:, 2])
+        return PoseTable(
+            np.ascontiguousarray(pose.T),
+            np.where(alive, self._last_seen, np.nan),
+            np.where(alive, self._last_sequence, -1),
+            alive | self._expected,
+            alive,
+        )
+
+
+def _stamp(timestamp: float, sequence: int) -> Stamp:
+    return Stamp(timestamp, sequence if sequence >= 0 else None)
@@ -0,0 +1,136 @@
+"""Shared camera calibration with cached undistortion maps and hot reload."""
+
+import logging
+import os
+import pathlib
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from constants import (
+    CALIBRATION_DATA_PATH,
+    CALIBRATION_RELOAD_INTERVAL,
+    CAPTURE_HEIGHT,
+    CAPTURE_WIDTH,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CalibrationData:
+    """Immutable calibration snapshot for one capture resolution."""
+
+    camera_matrix: np.ndarray
+    dist_coeffs: np.ndarray
+    image_size: tuple[int, int]  # (width, height) the maps were built for
+    map1: np.ndarray
+    map2: np.ndarray
+    version: int
+
+
+class CalibrationProfile:
+    """
+    Single owner of the camera calibration shared by all capture threads.
+
+    The npz file is loaded once and the initUndistortRectifyMap tables are
+    precomputed for the capture resolution, so full-frame undistortion is a
+    cv2.remap with cached maps. get() checks the file's modification time at
+    most every reload_interval seconds and, when it changed, builds a complete
+    new CalibrationData before swapping it in, so readers never see a
+    half-loaded calibration and never block on a reload.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path = CALIBRATION_DATA_PATH,
+        image_size: tuple[int, int] = (CAPTURE_WIDTH, CAPTURE_HEIGHT),
+        reload_interval: float = CALIBRATION_RELOAD_INTERVAL,
+    ):
+        self.path = pathlib.Path(path)
+        self.reload_interval = reload_interval
+        self._lock = Lock()
+        self._image_size = image_size
+        self._data: Optional[CalibrationData] = None
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._version = 0
+        self.reload()
+
+    def get(self) -> Optional[CalibrationData]:
+        """Return the current calibration, picking up file changes."""
+        now = time.monotonic()
+        if now - self._last_check >= self.reload_interval:
+            # Only one thread pays for the reload, everyone else keeps
+            # using the current snapshot.
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._last_check = now
+                    if self._file_changed():
+                        self._load()
+                finally:
+                    self._lock.release()
+        return self._data
+
+    def reload(self) -> bool:
+        """Force a reload from disk. Returns True on success."""
+        with self._lock:
+            self._last_check = time.monotonic()
+            return self._load()
+
+    def set_image_size(self, image_size: tuple[int, int]):
+        """Rebuild the undistortion maps for a new capture resolution."""
+        with self._lock:
+            self._image_size = image_size
+            data = self._data
+            if data is None or data.image_size == image_size:
+                return
+            self._data = self._build(data.camera_matrix, data.dist_coeffs)
+        logger.info(f"Undistortion maps rebuilt for {image_size[0]}x{image_size[1]}")
+
+    def _file_changed(self) -> bool:
+        try:
+            return os.stat(self.path).st_mtime != self._mtime
+        except OSError:
+            return False
+
+    def _load(self) -> bool:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            logger.error(f"Calibration file not found: {self.path}")
+            return False
+
+        try:
+            with np.load(self.path) as npz_file:
+                camera_matrix = np.array(npz_file["camera_matrix"])
+                dist_coeffs = np.array(npz_file["dist_coeffs"])
+        except Exception as e:
+            # Keep the previous calibration and retry once the file changes again,
+            # e.g. when it was caught half-written
+            self._mtime = mtime
+            logger.error(f"Failed to load calibration data: {e}")
+            return False
+
+        self._data = self._build(camera_matrix, dist_coeffs)
+        self._mtime = mtime
+        logger.info(f"Calibration loaded (version {self._data.version}): {self.path}")
+        return True
+
+    def _build(self, camera_matrix: np.ndarray, dist_coeffs: np.ndarray) -> CalibrationData:
+        map1, map2 = cv2.initUndistortRectifyMap(
+            camera_matrix, dist_coeffs, None, camera_matrix, self._image_size, cv2.CV_16SC2
+        )
+        self._version += 1
+        return CalibrationData(
+            camera_matrix=camera_matrix,
+            dist_coeffs=dist_coeffs,
+            image_size=self._image_size,
+            map1=map1,
+            map2=map2,
+            version=self._version,
+        )
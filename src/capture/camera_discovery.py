@@ -0,0 +1,101 @@
+"""Finding the cameras attached to this machine without stalling the GUI."""
+
+import logging
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Iterable, Optional
+
+import cv2
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from constants import CAMERA_DISCOVERY_MAX
+
+logger = logging.getLogger(__name__)
+
+V4L2_SYSFS = pathlib.Path("/sys/class/video4linux")
+
+_cache_lock = Lock()
+_cached_cameras: Optional[list[tuple[int, str]]] = None
+
+
+def read_v4l2_cameras(sysfs: pathlib.Path = V4L2_SYSFS) -> Optional[list[tuple[int, str]]]:
+    """
+    Capture devices listed by the kernel, None where there is no V4L2 sysfs.
+
+    Only sysfs attributes are read, no device is opened. UVC cameras expose a
+    second node for metadata; only the node with index 0 captures frames.
+    """
+    if not sysfs.is_dir():
+        return None
+    cameras = []
+    for node in sysfs.glob("video*"):
+        try:
+            device_index = int(node.name[len("video"):])
+            if (node / "index").read_text().strip() != "0":
+                continue
+            name = (node / "name").read_text().strip()
+        except (OSError, ValueError):
+            continue
+        cameras.append((device_index, f"{name} (video{device_index})"))
+    return sorted(cameras)
+
+
+def probe_camera(index: int) -> Optional[tuple[int, str]]:
+    """Open a camera to see whether it exists, for platforms without sysfs."""
+    cap = cv2.VideoCapture(index)
+    try:
+        if not cap.isOpened():
+            return None
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        return index, f"Camera {index} ({width}x{height})"
+    finally:
+        cap.release()
+
+
+def get_available_cameras(
+    max_cameras: int = CAMERA_DISCOVERY_MAX,
+    refresh: bool = False,
+    active: Iterable[int] = (),
+) -> list[tuple[int, str]]:
+    """
+    Available cameras as (index, description), cached until refresh is set.
+
+    Without V4L2 sysfs every index is probed, all of them in parallel.
+    Cameras in active are already opened by us and are listed without being
+    probed, a second open of a busy device may fail.
+    """
+    global _cached_cameras
+    with _cache_lock:
+        if _cached_cameras is not None and not refresh:
+            return list(_cached_cameras)
+
+        cameras = read_v4l2_cameras()
+        if cameras is None:
+            active = set(active)
+            with ThreadPoolExecutor(max_workers=max_cameras) as executor:
+                probed = executor.map(
+                    probe_camera, [i for i in range(max_cameras) if i not in active]
+                )
+            cameras = sorted(
+                [camera for camera in probed if camera is not None]
+                + [(i, f"Camera {i} (in use)") for i in active]
+            )
+        logger.info(f"Found {len(cameras)} camera(s)")
+        _cached_cameras = cameras
+        return list(cameras)
+
+
+class CameraDiscoveryThread(QThread):
+    """Runs get_available_cameras off the GUI thread and reports the result."""
+
+    cameras_found = pyqtSignal(list)
+
+    def __init__(self, refresh: bool = False, active: Iterable[int] = ()):
+        super().__init__()
+        self.refresh = refresh
+        self.active = tuple(active)
+
+    def run(self):
+        self.cameras_found.emit(get_available_cameras(refresh=self.refresh, active=self.active))
@@ -0,0 +1,54 @@
+"""Loading the multi-camera rig description."""
+
+import json
+import logging
+import pathlib
+
+import numpy as np
+
+from constants import CALIBRATION_DATA_PATH, CAMERA_RIG_PATH
+from models.camera_config import CameraConfig
+
+logger = logging.getLogger(__name__)
+
+
+def load_camera_rig(path: pathlib.Path = CAMERA_RIG_PATH) -> list[CameraConfig]:
+    """
+    Read the cameras and their extrinsics from a JSON rig file.
+
+    Format:
+        {"cameras": [{"camera_id": 0, "device_index": 2,
+                      "calibration": "calibration_cam0.npz",
+                      "extrinsic": [[1, 0, 0, 0], [0, 1, 0, 0],
+                                    [0, 0, 1, 0], [0, 0, 0, 1]]}]}
+
+    Calibration paths are relative to the rig file. An empty list means no rig
+    is configured and the single camera chosen in the UI is used.
+    """
+    path = pathlib.Path(path)
+    if not path.exists():
+        return []
+    try:
+        with open(path) as rig_file:
+            rig = json.load(rig_file)
+        cameras = []
+        for camera in rig["cameras"]:
+            extrinsic = np.array(camera.get("extrinsic", np.eye(4)), dtype=np.float64)
+            if extrinsic.shape != (4, 4):
+                raise ValueError(f"Camera {camera['camera_id']}: extrinsic must be 4x4")
+            calibration = camera.get("calibration")
+            cameras.append(
+                CameraConfig(
+                    camera_id=int(camera["camera_id"]),
+                    device_index=int(camera["device_index"]),
+                    calibration_path=(
+                        path.parent / calibration if calibration else CALIBRATION_DATA_PATH
+                    ),
+                    extrinsic=extrinsic,
+                )
+            )
+    except Exception as e:
+        logger.error(f"Failed to load camera rig {path}: {e}")
+        return []
+    logger.info(f"Loaded camera rig with {len(cameras)} camera(s) from {path}")
+    return cameras
@@ -0,0 +1,215 @@
+"""Camera capture formats: applying them, measuring them and remembering the best."""
+
+import json
+import logging
+import pathlib
+import time
+from dataclasses import asdict, dataclass
+from typing import Iterable, Optional
+
+import cv2
+import numpy as np
+
+from constants import (
+    CAPTURE_BUFFER_SIZE,
+    CAPTURE_HEIGHT,
+    CAPTURE_PROFILE_PATH,
+    CAPTURE_REQUEST_FPS,
+    CAPTURE_RESOLUTIONS,
+    CAPTURE_TARGET_FPS,
+    CAPTURE_WIDTH,
+)
+
+logger = logging.getLogger(__name__)
+
+FOURCCS = ("MJPG", "YUYV")
+
+
+@dataclass(frozen=True)
+class CaptureProfile:
+    """
+    How to open a camera.
+
+    fourcc None keeps the backend's default pixel format. With gray set the
+    frame source asks the backend for undecoded frames and extracts only the
+    luma: the Y plane of YUYV directly, MJPG through a grayscale JPEG decode,
+    which skips chroma upsampling and the colour conversion. Backends that
+    always deliver BGR fall back to BGR frames. gray is off unless a saved
+    profile turns it on, see scripts/negotiate_capture_profile.py --gray.
+    """
+
+    fourcc: Optional[str] = None
+    width: int = CAPTURE_WIDTH
+    height: int = CAPTURE_HEIGHT
+    fps: Optional[float] = None
+    gray: bool = False
+
+
+@dataclass(frozen=True)
+class CaptureMeasurement:
+    profile: CaptureProfile
+    width: int  # what the camera actually delivered
+    height: int
+    fps: float
+    latency_ms: Optional[float]  # driver timestamp to retrieve(), None if unavailable
+
+
+def fourcc_to_str(code: float) -> str:
+    code = int(code)
+    return "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4))
+
+
+def apply_capture_profile(cap: cv2.VideoCapture, profile: CaptureProfile) -> bool:
+    """
+    Configure an opened capture. Returns whether raw frames were requested.
+
+    The FOURCC has to be set before the size, V4L2 picks the frame sizes
+    offered for the current pixel format.
+    """
+    if profile.fourcc is not None:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter.fourcc(*profile.fourcc))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, profile.width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, profile.height)
+    if profile.fps is not None:
+        cap.set(cv2.CAP_PROP_FPS, profile.fps)
+    # Only the newest frame matters, queued frames are pure latency
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, CAPTURE_BUFFER_SIZE)
+    return bool(profile.gray and cap.set(cv2.CAP_PROP_CONVERT_RGB, 0))
+
+
+def raw_to_gray(
+    raw: np.ndarray, width: int, height: int, dst: Optional[np.ndarray] = None
+) -> Optional[np.ndarray]:
+    """
+    Luma of an undecoded frame, None if the buffer is neither YUYV nor JPEG.
+
+    V4L2 hands out raw buffers as one row of bytes. When dst matches the
+    frame size YUYV luma is written into it; JPEG decoding always allocates.
+    """
+    if raw.ndim == 2 and raw.shape[0] > 1:
+        # Backend ignored CONVERT_RGB=0 for this format and decoded already
+        return raw
+    data = raw.reshape(-1)
+    if data.size == width * height * 2:
+        # YUYV: Y0 U Y1 V, luma is every other byte
+        return cv2.extractChannel(data.reshape(height, width, 2), 0, dst=dst)
+    if data.size >= 2 and data[0] == 0xFF and data[1] == 0xD8:
+        return cv2.imdecode(data, cv2.IMREAD_GRAYSCALE)
+    return None
+
+
+def measure_capture_profile(
+    camera_index: int, profile: CaptureProfile, frames: int = 60, warmup: int = 10
+) -> Optional[CaptureMeasurement]:
+    """Open the camera with a profile and measure what it really delivers."""
+    cap = cv2.VideoCapture(camera_index)
+    if not cap.isOpened():
+        return None
+    try:
+        apply_capture_profile(cap, profile)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if profile.fourcc is not None and fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC)) != profile.fourcc:
+            return None
+        for _ in range(warmup):
+            if not cap.grab():
+                return None
+        latencies = []
+        start = time.monotonic()
+        for _ in range(frames):
+            if not cap.grab():
+                return None
+            ok, _ = cap.retrieve()
+            if not ok:
+                return None
+            # V4L2 reports the kernel's CLOCK_MONOTONIC buffer timestamp here
+            latency = time.monotonic() * 1000 - cap.get(cv2.CAP_PROP_POS_MSEC)
+            if 0 <= latency < 1000:
+                latencies.append(latency)
+        fps = frames / (time.monotonic() - start)
+    finally:
+        cap.release()
+    return CaptureMeasurement(
+        profile,
+        width,
+        height,
+        fps,
+        float(np.median(latencies)) if len(latencies) == frames else None,
+    )
+
+
+def negotiate_capture_profile(
+    camera_index: int,
+    resolutions: Iterable[tuple[int, int]] = CAPTURE_RESOLUTIONS,
+    fourccs: Iterable[str] = FOURCCS,
+    target_fps: float = CAPTURE_TARGET_FPS,
+    gray: bool = False,
+) -> tuple[Optional[CaptureProfile], list[CaptureMeasurement]]:
+    """
+    Measure every format and resolution, captured gray or BGR, and pick the best.
+
+    Best is the highest resolution that actually reaches target_fps, ties
+    broken by latency. If nothing reaches it, the fastest mode wins.
+    """
+    measurements = []
+    for fourcc in fourccs:
+        for width, height in resolutions:
+            profile = CaptureProfile(fourcc, width, height, CAPTURE_REQUEST_FPS, gray)
+            measurement = measure_capture_profile(camera_index, profile)
+            if measurement is None:
+                logger.info(f"Camera {camera_index}: {fourcc} {width}x{height} unsupported")
+                continue
+            logger.info(
+                f"Camera {camera_index}: {fourcc} {width}x{height} -> "
+                f"{measurement.width}x{measurement.height} at {measurement.fps:.1f} fps, "
+                f"latency {measurement.latency_ms} ms"
+            )
+            # The camera substituted another size, that mode is measured on its own
+            if (measurement.width, measurement.height) == (width, height):
+                measurements.append(measurement)
+    if not measurements:
+        return None, []
+
+    def latency(m: CaptureMeasurement) -> float:
+        return m.latency_ms if m.latency_ms is not None else float("inf")
+
+    fast_enough = [m for m in measurements if m.fps >= 0.95 * target_fps]
+    if fast_enough:
+        best = min(fast_enough, key=lambda m: (-m.width * m.height, latency(m)))
+    else:
+        best = max(measurements, key=lambda m: m.fps)
+    return best.profile, measurements
+
+
+def load_capture_profile(
+    camera_index: int, path: pathlib.Path = CAPTURE_PROFILE_PATH
+) -> CaptureProfile:
+    """The negotiated profile of a camera, or the default resolution if it has none."""
+    try:
+        with open(path) as f:
+            entry = json.load(f).get(str(camera_index))
+    except FileNotFoundError:
+        return CaptureProfile()
+    except (OSError, ValueError) as e:
+        logger.error(f"Failed to read capture profiles from {path}: {e}")
+        return CaptureProfile()
+    if entry is None:
+        return CaptureProfile()
+    return CaptureProfile(**entry["profile"])
+
+
+def save_capture_profile(
+    camera_index: int,
+    profile: CaptureProfile,
+    path: pathlib.Path = CAPTURE_PROFILE_PATH,
+    **metadata,
+):
+    """Store a camera's profile, keeping the profiles of all other cameras."""
+    try:
+        with open(path) as f:
+            profiles = json.load(f)
+    except FileNotFoundError:
+        profiles = {}
+    profiles[str(camera_index)] = {"profile": asdict(profile), **metadata}
+    with open(path, "w") as f:
+        json.dump(profiles, f, indent=2)
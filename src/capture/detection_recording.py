@@ -0,0 +1,281 @@
+"""
+Append-only recordings of published detections and their replay.
+
+File layout: an 8 byte magic, then one record per published frame:
+
+    header   <QdHI  sequence, capture timestamp, marker count N, JPEG size J
+    ids      N x int32
+    corners  N x 4 x 2 float32
+    frame    J bytes of JPEG, J = 0 when frames are not recorded
+
+A record is only complete once all of it is on disk, so a recording cut off
+by a crash loses at most its last record.
+"""
+
+import logging
+import mmap
+import pathlib
+import struct
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Optional
+
+import cv2
+import numpy as np
+from PyQt6.QtCore import QThread
+
+from capture.frame_source import CapturedFrame, FrameSource
+from constants import RECORDING_JPEG_QUALITY
+from stores.frame_data_store import FrameDataStore
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ODYREC1\n"
+RECORD_HEADER = struct.Struct("<QdHI")
+
+
+@dataclass(frozen=True)
+class RecordedFrame:
+    sequence: int
+    timestamp: float  # time.monotonic() of the recording session
+    ids: Optional[np.ndarray]  # (N, 1) int32, None when nothing was detected
+    corners: tuple  # N x (1, 4, 2) float32, views into the recording
+    jpeg: Optional[np.ndarray]  # encoded frame, None when frames were not recorded
+
+    def decode_frame(self, flags: int = cv2.IMREAD_UNCHANGED) -> Optional[np.ndarray]:
+        return None if self.jpeg is None else cv2.imdecode(self.jpeg, flags)
+
+
+class DetectionRecorder:
+    """Writes what an ObserverThread publishes, optionally with the frames."""
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        record_frames: bool = False,
+        jpeg_quality: int = RECORDING_JPEG_QUALITY,
+    ):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.record_frames = record_frames
+        self._jpeg_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self._lock = Lock()
+        self._file = open(self.path, "wb")
+        self._file.write(MAGIC)
+        self.records = 0
+        logger.info(f"Recording detections to {self.path}")
+
+    def write(
+        self,
+        sequence: int,
+        timestamp: float,
+        ids: Optional[np.ndarray],
+        corners,
+        frame: Optional[np.ndarray] = None,
+    ):
+        count = 0 if ids is None else len(ids)
+        jpeg = b""
+        if self.record_frames and frame is not None:
+            ok, encoded = cv2.imencode(".jpg", frame, self._jpeg_params)
+            if ok:
+                jpeg = encoded.tobytes()
+        parts = [RECORD_HEADER.pack(sequence, timestamp, count, len(jpeg))]
+        if count:
+            parts.append(np.asarray(ids, dtype=np.int32).tobytes())
+            parts.append(np.asarray(corners, dtype=np.float32).tobytes())
+        parts.append(jpeg)
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(b"".join(parts))
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+                logger.info(f"Recorded {self.records} frames to {self.path}")
+
+
+class DetectionRecording:
+    """
+    Read-only, memory-mapped view of a recording.
+
+    Opening only walks the record headers to index them; ids, corners and
+    JPEG data are returned as views into the mapping and paged in on access.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = pathlib.Path(path)
+        self._file = open(self.path, "rb")
+        size = self.path.stat().st_size
+        if size < len(MAGIC):
+            raise ValueError(f"{self.path} is not a detection recording")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a detection recording")
+        self._buffer = memoryview(self._mmap)
+        self._offsets = []
+        offset = len(MAGIC)
+        while offset + RECORD_HEADER.size <= size:
+            _, _, count, jpeg_size = RECORD_HEADER.unpack_from(self._mmap, offset)
+            end = offset + RECORD_HEADER.size + count * 36 + jpeg_size
+            if end > size:
+                logger.warning(f"{self.path}: ignoring truncated last record")
+                break
+            self._offsets.append(offset)
+            offset = end
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, index: int) -> RecordedFrame:
+        offset = self._offsets[index]
+        sequence, timestamp, count, jpeg_size = RECORD_HEADER.unpack_from(self._mmap, offset)
+        offset += RECORD_HEADER.size
+        ids = None
+        corners = ()
+        if count:
+            ids = np.frombuffer(self._buffer, np.int32, count, offset).reshape(count, 1)
+            offset += count * 4
+            corners = tuple(
+                np.frombuffer(self._buffer, np.float32, count * 8, offset).reshape(count, 1, 4, 2)
+            )
+            offset += count * 32
+        jpeg = np.frombuffer(self._buffer, np.uint8, jpeg_size, offset) if jpeg_size else None
+        return RecordedFrame(sequence, timestamp, ids, corners, jpeg)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    @property
+    def duration(self) -> float:
+        if len(self) < 2:
+            return 0.0
+        return self[-1].timestamp - self[0].timestamp
+
+    def close(self):
+        # Views handed out keep the mapping alive until they are released
+        self._buffer.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+        self._file.close()
+
+
+class ReplayClock:
+    """
+    Maps recorded timestamps onto time.monotonic() of the replay.
+
+    speed 1.0 replays in real time, 2.0 twice as fast; None does not wait at
+    all. Replayed frames are stamped with the replay clock so staleness and
+    latency checks downstream see realistic ages.
+    """
+
+    def __init__(self, speed: Optional[float] = 1.0):
+        self.speed = speed
+        self._origin: Optional[tuple[float, float]] = None
+
+    def wait(self, recorded_timestamp: float) -> float:
+        """Sleep until the frame is due and return its replay timestamp."""
+        now = time.monotonic()
+        if self.speed is None:
+            return now
+        if self._origin is None:
+            self._origin = (recorded_timestamp, now)
+        recorded_start, replay_start = self._origin
+        due = replay_start + (recorded_timestamp - recorded_start) / self.speed
+        if due > now:
+            time.sleep(due - now)
+            return due
+        return now
+
+
+class ReplayFrameSource(FrameSource):
+    """
+    Recorded frames as camera input, for running the whole capture pipeline.
+
+    Only recordings made with record_frames contain frames; records without
+    one are skipped.
+    """
+
+    def __init__(self, path: pathlib.Path, speed: Optional[float] = 1.0, loop: bool = False):
+        self.path = pathlib.Path(path)
+        self.speed = speed
+        self.loop = loop
+        self.recording: Optional[DetectionRecording] = None
+        self._clock = ReplayClock(speed)
+        self._index = 0
+
+    def open(self) -> bool:
+        try:
+            self.recording = DetectionRecording(self.path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to open recording: {e}")
+            return False
+        return True
+
+    def read(self) -> Optional[CapturedFrame]:
+        while self.recording is not None:
+            if self._index >= len(self.recording):
+                if not self.loop or len(self.recording) == 0:
+                    return None
+                self._index = 0
+                self._clock = ReplayClock(self.speed)
+            record = self.recording[self._index]
+            self._index += 1
+            if record.jpeg is None:
+                continue
+            timestamp = self._clock.wait(record.timestamp)
+            return CapturedFrame(record.decode_frame(), timestamp)
+        return None
+
+    def release(self):
+        if self.recording is not None:
+            self.recording.close()
+            self.recording = None
+
+
+class DetectionReplayThread(QThread):
+    """
+    Publishes recorded detections into a FrameDataStore, bypassing the camera
+    and marker detection, so everything downstream of the ObserverThread runs
+    exactly as in the recorded session.
+    """
+
+    _running: bool
+
+    def __init__(
+        self,
+        recording: DetectionRecording,
+        frame_data_store: FrameDataStore,
+        speed: Optional[float] = 1.0,
+    ):
+        super().__init__()
+        self.recording = recording
+        self.frame_data_store = frame_data_store
+        self.speed = speed
+        self.published = 0
+        self._running = True
+
+    def run(self):
+        clock = ReplayClock(self.speed)
+        # Continue after whatever the store has seen, keeping recorded gaps
+        offset = self.frame_data_store.get_latest().sequence
+        for record in self.recording:
+            if not self._running:
+                break
+            timestamp = clock.wait(record.timestamp)
+            self.frame_data_store.update(
+                ids=record.ids,
+                corners=record.corners,
+                sequence=offset + record.sequence,
+                timestamp=timestamp,
+            )
+            self.published += 1
+        logger.info(f"Replayed {self.published} of {len(self.recording)} recorded frames")
+
+    def stop(self):
+        self._running = False
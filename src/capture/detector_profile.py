@@ -0,0 +1,101 @@
+"""Per-camera ArUco detector settings produced by scripts/tune_detector_parameters.py."""
+
+import json
+import logging
+import pathlib
+from dataclasses import dataclass, field
+from typing import Any
+
+import cv2.aruco as aruco
+
+from constants import DETECTOR_PROFILE_PATH, MARKER_DICTIONARY_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Relative to the larger side of the image searched, not of the camera frame
+FRAME_RELATIVE_PARAMETERS = ("minMarkerPerimeterRate", "maxMarkerPerimeterRate")
+
+
+@dataclass(frozen=True)
+class DetectorProfile:
+    """
+    ArUco dictionary plus the DetectorParameters that differ from the defaults.
+
+    Only overrides are stored so profiles stay valid when OpenCV changes its
+    defaults. The pipeline indexes its per-agent arrays by marker id, so the
+    dictionary must not decode ids of MARKER_DICTIONARY_SIZE or more.
+    """
+
+    dictionary_id: int = aruco.DICT_5X5_100
+    parameters: dict[str, Any] = field(default_factory=dict)
+
+    def create_dictionary(self) -> aruco.Dictionary:
+        return aruco.getPredefinedDictionary(self.dictionary_id)
+
+    def create_parameters(self) -> aruco.DetectorParameters:
+        parameters = aruco.DetectorParameters()
+        for name, value in self.parameters.items():
+            setattr(parameters, name, value)
+        return parameters
+
+    def create_detector(self) -> aruco.ArucoDetector:
+        return aruco.ArucoDetector(self.create_dictionary(), self.create_parameters())
+
+    def create_crop_detector(self) -> aruco.ArucoDetector:
+        """
+        Detector for crops of the frame, e.g. ROI windows and tiles.
+
+        The perimeter rates were tuned on whole frames; on a smaller crop they
+        would admit different marker sizes, so crops use the OpenCV defaults.
+        """
+        parameters = aruco.DetectorParameters()
+        for name, value in self.parameters.items():
+            if name not in FRAME_RELATIVE_PARAMETERS:
+                setattr(parameters, name, value)
+        return aruco.ArucoDetector(self.create_dictionary(), parameters)
+
+
+def load_detector_profile(
+    camera_id: int, path: pathlib.Path = DETECTOR_PROFILE_PATH
+) -> DetectorProfile:
+    """The tuned profile of a camera, or the OpenCV defaults if it has none."""
+    try:
+        with open(path) as f:
+            entry = json.load(f).get(str(camera_id))
+    except FileNotFoundError:
+        return DetectorProfile()
+    except (OSError, ValueError) as e:
+        logger.error(f"Failed to read detector profiles from {path}: {e}")
+        return DetectorProfile()
+    if entry is None:
+        return DetectorProfile()
+    profile = DetectorProfile(entry["dictionary_id"], entry.get("parameters", {}))
+    if len(profile.create_dictionary().bytesList) > MARKER_DICTIONARY_SIZE:
+        logger.error(
+            f"Detector profile for camera {camera_id} decodes more than "
+            f"{MARKER_DICTIONARY_SIZE} ids, using the default dictionary"
+        )
+        profile = DetectorProfile(parameters=profile.parameters)
+    logger.info(f"Loaded detector profile for camera {camera_id}: {profile}")
+    return profile
+
+
+def save_detector_profile(
+    camera_id: int,
+    profile: DetectorProfile,
+    path: pathlib.Path = DETECTOR_PROFILE_PATH,
+    **metadata,
+):
+    """Store a camera's profile, keeping the profiles of all other cameras."""
+    try:
+        with open(path) as f:
+            profiles = json.load(f)
+    except FileNotFoundError:
+        profiles = {}
+    profiles[str(camera_id)] = {
+        "dictionary_id": profile.dictionary_id,
+        "parameters": profile.parameters,
+        **metadata,
+    }
+    with open(path, "w") as f:
+        json.dump(profiles, f, indent=2)
@@ -1,80 +1,214 @@
 import logging
-import pathlib
-import time
+from typing import Optional
 
-# from typing import Dict
-import cv2.aruco as aruco
-import cv2
 import numpy as np
 from PyQt6.QtCore import QThread
 
-from concurrent.futures import ThreadPoolExecutor
+from capture.marker_pose import MarkerPoseSolver
 from capture.observer import ObserverThread
-from constants import MARKER_LENGTH, ALL_MARKER_IDS
+from constants import MARKER_DICTIONARY_SIZE, ALL_MARKER_IDS
+from enums.capture.pose_mode import PoseMode
 from models.vectors import Pose2D
 from stores.controller_context import ControllerContext
 
 logger = logging.getLogger(__name__)
 
-calibration_data_path = (
-    pathlib.Path(__file__).parent.parent.parent / "calibration_data_latest.npz"
-)
-
 
 class FrameAnalyzer(QThread):
     _running: bool
 
-    def __init__(self, observer: ObserverThread, context: ControllerContext):
+    def __init__(
+        self,
+        observer: Optional[ObserverThread],
+        context: ControllerContext,
+        camera_id: Optional[int] = None,
+        pose_mode: PoseMode = PoseMode.PNP,
+    ):
         super().__init__()
         self.context = context
+        self.channel = (
+            context.camera_channels[camera_id]
+            if camera_id is not None
+            else next(iter(context.camera_channels.values()))
+        )
+        extrinsic = self.channel.config.extrinsic
+        # Poses stay in the camera frame when the camera is the world frame
+        self._extrinsic = None if np.allclose(extrinsic, np.eye(4)) else extrinsic
+        self.pose_mode = pose_mode
+        # Set from the GUI, handled on the next frame by this thread
+        self._calibrate_ground_plane = False
+        self._warned_uncalibrated = False
         self._running = True
-        self.calibration_loaded = False
-
-        try:
-            npz_file = np.load(calibration_data_path)
-            self.camera_matrix = npz_file["camera_matrix"]
-            self.dist_coeff = npz_file["dist_coeffs"]
-            self.calibration_loaded = True
-        except FileNotFoundError:
-            logger.error(f"Calibration file not found: {calibration_data_path}")
-        except Exception as e:
-            logger.error(f"Failed to load calibration data: {e}")
-
-        self.arucoParams = cv2.aruco.DetectorParameters()
+        # Sequence number of the frame the current poses came from
+        self.last_sequence = 0
+        # Corners in FrameDataStore are already undistorted by the
+        # ObserverThread (whole frame or corner points), so the pose
+        # solver must not apply the lens model a second time.
+        self.dist_coeff = np.zeros(5)
+        self.pose_solver = MarkerPoseSolver()
+        # Reused every frame to find the expected markers that were not seen
+        self._present = np.zeros(MARKER_DICTIONARY_SIZE, dtype=bool)
+        self._all_missing = dict.fromkeys(ALL_MARKER_IDS.tolist())
 
     def run(self):
-        if not self.calibration_loaded:
+        calibration_profile = self.channel.calibration_profile
+        if calibration_profile.get() is None:
             logger.error("FrameAnalyzer: Cannot run without calibration data")
             return
 
         while self._running:
-            ids, corners = self.context.frame_data_store.get()
-            # print(ids)
-            if ids is not None:
-                missing_ids = np.setdiff1d(ALL_MARKER_IDS, ids.flatten())
-                # print(missing_ids)
-                for id in missing_ids:
-                    self.context.agent_pose_store.update(id, None)
-                rvecs, tvecs, _ = aruco.estimatePoseSingleMarkers(
-                    corners, MARKER_LENGTH, self.camera_matrix, self.dist_coeff
-                )
-                with ThreadPoolExecutor() as executor:
-                    executor.map(
-                        lambda args: process_marker(self.context, *args, rvecs, tvecs),
-                        enumerate(ids.flatten()),
-                    )
+            # Each detection result is processed exactly once
+            frame_data = self.channel.frame_data_store.wait_for_newer(
+                self.last_sequence, timeout=0.5
+            )
+            if frame_data is None:
+                continue
+            self.last_sequence = frame_data.sequence
+            ids, corners = frame_data.ids, frame_data.corners
+
+            if self._calibrate_ground_plane:
+                self._calibrate_ground_plane = False
+                if ids is not None:
+                    self.channel.ground_plane.calibrate(ids, corners)
+                else:
+                    logger.error("Ground plane calibration: no markers visible")
+
+            camera_matrix = calibration_profile.get().camera_matrix
+            if self.context.pose_fuser is not None:
+                poses = self.fuse_poses(ids, corners, camera_matrix, frame_data.timestamp)
+            elif ids is not None:
+                poses = self.extract_poses(ids, corners, camera_matrix, frame_data.timestamp)
             else:
-                for id in ALL_MARKER_IDS:
-                    self.context.agent_pose_store.update(id, None)
-                time.sleep(0.1)
+                poses = self._all_missing
+
+            # Smooth jitter and coast through short dropouts before publishing
+            self.context.agent_pose_store.update_batch(
+                self.context.pose_estimator.update_table(
+                    poses, frame_data.timestamp, frame_data.sequence
+                )
+            )
+
+    def extract_poses(
+        self, ids, corners, camera_matrix, timestamp: float
+    ) -> dict[int, Optional[Pose2D]]:
+        """Poses for all detected markers plus None for every expected marker not seen."""
+        flat_ids, xy, yaws, _ = self.solve_poses(ids.flatten(), corners, camera_matrix, timestamp)
+        self._present[:] = False
+        self._present[flat_ids] = True
+        missing_ids = ALL_MARKER_IDS[~self._present[ALL_MARKER_IDS]]
+
+        poses: dict[int, Optional[Pose2D]] = dict.fromkeys(missing_ids.tolist())
+        poses.update(
+            zip(flat_ids.tolist(), map(Pose2D, xy[:, 0].tolist(), xy[:, 1].tolist(), yaws.tolist()))
+        )
+        return poses
+
+    def fuse_poses(
+        self, ids, corners, camera_matrix, timestamp: float
+    ) -> dict[int, Optional[Pose2D]]:
+        """Hand this camera's observations to the PoseFuser and return the fused poses."""
+        if ids is None:
+            flat_ids = np.empty(0, dtype=np.int32)
+            xy, yaws, weights = np.empty((0, 2)), np.empty(0), np.empty(0)
+        else:
+            flat_ids, xy, yaws, weights = self.solve_poses(
+                ids.flatten(), corners, camera_matrix, timestamp
+            )
+        return self.context.pose_fuser.submit(
+            self.channel.config.camera_id, flat_ids, xy, yaws, weights, timestamp=timestamp
+        )
+
+    def solve_poses(
+        self, flat_ids: np.ndarray, corners, camera_matrix, timestamp: float
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (N,) ids, (N, 2) world positions, (N,) yaw and (N,) fusion weights.
+
+        Markers whose PnP solution fails the reprojection check are dropped.
+
+        Closer views resolve a marker with more pixels, so they are trusted
+        more: PnP weighs by inverse squared distance, the planar mode by the
+        marker's area in the image, which falls off the same way.
+        """
+        ground_plane = self.channel.ground_plane
+        if self.pose_mode == PoseMode.PLANAR:
+            if ground_plane.calibrated:
+                corner_array = np.asarray(corners, dtype=np.float32).reshape(-1, 4, 2)
+                xy, yaws = ground_plane.to_world(corner_array)
+                return flat_ids, xy, yaws, marker_areas(corner_array)
+            if not self._warned_uncalibrated:
+                logger.warning("Planar pose mode without ground plane calibration, using PnP")
+                self._warned_uncalibrated = True
+
+        rvecs, tvecs, _, valid = self.pose_solver.solve(
+            flat_ids, corners, camera_matrix, self.dist_coeff, timestamp
+        )
+        if not valid.all():
+            flat_ids, rvecs, tvecs = flat_ids[valid], rvecs[valid], tvecs[valid]
+        xy, yaws = self.to_world(rvecs, tvecs)
+        weights = 1.0 / np.maximum(np.einsum("ij,ij->i", tvecs[:, 0], tvecs[:, 0]), 1e-6)
+        return flat_ids, xy, yaws, weights
+
+    def set_pose_mode(self, mode: PoseMode):
+        self.pose_mode = mode
+        self._warned_uncalibrated = False
+
+    def calibrate_ground_plane(self):
+        """Fit the ground plane homography to the reference markers in the next frame."""
+        self._calibrate_ground_plane = True
+
+    def to_world(self, rvecs: np.ndarray, tvecs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(N, 2) world positions and (N,) world yaw for a batch of marker poses."""
+        if self._extrinsic is None:
+            return tvecs[:, 0, :2], rvecs_to_yaw(rvecs)
+        rotation = self._extrinsic[:3, :3]
+        positions = tvecs[:, 0] @ rotation.T + self._extrinsic[:3, 3]
+        world_rotations = rotation @ rvecs_to_matrices(rvecs)
+        yaws = np.arctan2(world_rotations[:, 1, 0], world_rotations[:, 0, 0])
+        return positions[:, :2], yaws
 
     def stop(self):
         self._running = False
 
 
-def process_marker(context: ControllerContext, i, marker_id, rvecs, tvecs):
-    x, y, _ = tvecs[i][0]
-    rvec = rvecs[i][0]
-    R, _ = cv2.Rodrigues(rvec)
-    yaw = np.arctan2(R[1, 0], R[0, 0])
-    context.agent_pose_store.update(marker_id, Pose2D(x, y, yaw))
+def marker_areas(corners: np.ndarray) -> np.ndarray:
+    """Image area of a batch of (N, 4, 2) marker quads (shoelace formula)."""
+    x = corners[:, :, 0]
+    y = corners[:, :, 1]
+    return 0.5 * np.abs(
+        np.sum(x * np.roll(y, -1, axis=1) - np.roll(x, -1, axis=1) * y, axis=1)
+    )
+
+
+def rvecs_to_matrices(rvecs: np.ndarray) -> np.ndarray:
+    """(N, 3, 3) rotation matrices for a batch of Rodrigues vectors."""
+    r = rvecs.reshape(-1, 3)
+    angle = np.linalg.norm(r, axis=1)
+    axis = r / np.where(angle > 1e-12, angle, 1.0)[:, None]
+    c = np.cos(angle)[:, None, None]
+    s = np.sin(angle)[:, None, None]
+    kx, ky, kz = axis.T
+    zeros = np.zeros_like(kx)
+    cross = np.stack(
+        [zeros, -kz, ky, kz, zeros, -kx, -ky, kx, zeros], axis=1
+    ).reshape(-1, 3, 3)
+    outer = axis[:, :, None] * axis[:, None, :]
+    return c * np.eye(3) + (1 - c) * outer + s * cross
+
+
+def rvecs_to_yaw(rvecs: np.ndarray) -> np.ndarray:
+    """
+    Yaw of a batch of Rodrigues rotation vectors.
+
+    Equivalent to atan2(R[1, 0], R[0, 0]) of cv2.Rodrigues(rvec) for every
+    vector, evaluated with the closed-form rotation matrix entries in one go.
+    """
+    r = rvecs.reshape(-1, 3)
+    angle = np.linalg.norm(r, axis=1)
+    axis = r / np.where(angle > 1e-12, angle, 1.0)[:, None]
+    kx, ky, kz = axis.T
+    c = np.cos(angle)
+    s = np.sin(angle)
+    r00 = c + (1 - c) * kx * kx
+    r10 = (1 - c) * kx * ky + s * kz
+    return np.arctan2(r10, r00)
@@ -0,0 +1,77 @@
+"""Reusable full-resolution image buffers for the capture pipeline."""
+
+import weakref
+from collections import defaultdict
+from threading import Lock
+from typing import Optional
+
+import numpy as np
+
+from constants import FRAME_POOL_MAX_FREE
+
+BufferKey = tuple[tuple[int, ...], np.dtype]
+
+
+class FrameBufferPool:
+    """
+    Recycles image buffers so OpenCV can write into them through dst=.
+
+    acquire() hands out a free buffer of the requested shape or allocates a
+    new one; release() returns it once its last user is done. Releasing an
+    array the pool did not hand out, or releasing twice, does nothing, so
+    frames from any source can be passed back unconditionally. At most
+    max_free buffers per shape are kept, buffers released beyond that are
+    left to the garbage collector.
+
+    acquire() and release() may be called from different threads.
+    """
+
+    def __init__(self, max_free: int = FRAME_POOL_MAX_FREE):
+        self.max_free = max_free
+        self._lock = Lock()
+        self._free: dict[BufferKey, list[np.ndarray]] = defaultdict(list)
+        self._outstanding: dict[BufferKey, int] = defaultdict(int)
+        # Weak, so a buffer its user dropped without release() cannot be confused
+        # with a new array that happens to get the same id
+        self._handed_out: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+        self.allocations = 0
+
+    def acquire(self, shape: tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        key = (tuple(shape), np.dtype(dtype))
+        with self._lock:
+            free = self._free[key]
+            if free:
+                buffer = free.pop()
+            else:
+                buffer = np.empty(shape, dtype)
+                self.allocations += 1
+            self._outstanding[key] += 1
+            self._handed_out[id(buffer)] = buffer
+            return buffer
+
+    def try_acquire(
+        self, shape: tuple[int, ...], dtype=np.uint8, limit: int = 1
+    ) -> Optional[np.ndarray]:
+        """Like acquire(), but None while limit buffers of this shape are in use."""
+        key = (tuple(shape), np.dtype(dtype))
+        with self._lock:
+            if self._outstanding[key] >= limit:
+                return None
+        return self.acquire(shape, dtype)
+
+    def release(self, buffer: Optional[np.ndarray]):
+        if buffer is None:
+            return
+        with self._lock:
+            if self._handed_out.get(id(buffer)) is not buffer:
+                return
+            del self._handed_out[id(buffer)]
+            key = (buffer.shape, buffer.dtype)
+            self._outstanding[key] -= 1
+            if len(self._free[key]) < self.max_free:
+                self._free[key].append(buffer)
+
+    def clear(self):
+        """Drop all free buffers, e.g. after the resolution changed."""
+        with self._lock:
+            self._free.clear()
@@ -0,0 +1,92 @@
+"""Dedicated grab stage that keeps only the newest camera frame."""
+
+import itertools
+import logging
+from threading import Condition
+from typing import Callable, Optional
+
+from PyQt6.QtCore import QThread
+
+from capture.frame_source import CapturedFrame, FrameSource
+
+logger = logging.getLogger(__name__)
+
+# Shared by all grabbers so sequence numbers keep increasing across camera restarts
+_frame_sequence = itertools.count(1)
+
+
+class LatestFrameBuffer:
+    """
+    Single-slot, latest-frame-wins handoff between grabber and consumer.
+
+    put() always replaces the slot; a frame that is replaced before anyone
+    took it is counted in dropped_frames and handed to on_drop, so its
+    buffer can be recycled. take() blocks until a frame newer than the last
+    one taken is available.
+    """
+
+    def __init__(self, on_drop: Optional[Callable[[CapturedFrame], None]] = None):
+        self._condition = Condition()
+        self.on_drop = on_drop
+        self._frame: Optional[CapturedFrame] = None
+        self._fresh = False
+        self._closed = False
+        self.dropped_frames = 0
+
+    def put(self, frame: CapturedFrame):
+        with self._condition:
+            if self._fresh:
+                self.dropped_frames += 1
+                if self.on_drop is not None:
+                    self.on_drop(self._frame)
+            self._frame = frame
+            self._fresh = True
+            self._condition.notify_all()
+
+    def take(self, timeout: Optional[float] = None) -> Optional[CapturedFrame]:
+        """Return the newest untaken frame, or None on timeout or close."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._fresh or self._closed, timeout)
+            if not self._fresh:
+                return None
+            self._fresh = False
+            return self._frame
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+
+class FrameGrabber(QThread):
+    """Reads a FrameSource as fast as it delivers and publishes to a LatestFrameBuffer."""
+
+    def __init__(self, source: FrameSource, buffer: Optional[LatestFrameBuffer] = None):
+        super().__init__()
+        self.source = source
+        self.buffer = buffer if buffer is not None else LatestFrameBuffer()
+        self.grabbed_frames = 0
+        self._running = True
+
+    def run(self):
+        try:
+            if not self.source.open():
+                return
+            while self._running:
+                frame = self.source.read()
+                if frame is None:
+                    logger.info("FrameGrabber: frame source ended")
+                    break
+                self.grabbed_frames += 1
+                frame.sequence = next(_frame_sequence)
+                self.buffer.put(frame)
+        finally:
+            self.source.release()
+            self.buffer.close()
+
+    def stop(self):
+        self._running = False
@@ -0,0 +1,120 @@
+"""Frame sources the ObserverThread can capture from."""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from capture.frame_buffer_pool import FrameBufferPool
+from capture.capture_profile import (
+    CaptureProfile,
+    apply_capture_profile,
+    fourcc_to_str,
+    load_capture_profile,
+    raw_to_gray,
+)
+from models.vectors import Pose2D
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CapturedFrame:
+    image: np.ndarray  # BGR, or single-channel gray when the source delivers luma
+    timestamp: float  # time.monotonic() when the frame was captured
+    sequence: int = 0  # assigned by the FrameGrabber, increases across restarts
+    ground_truth: Optional[dict[int, Pose2D]] = None  # marker poses, synthetic sources only
+
+
+class FrameSource:
+    """Base class for anything that produces frames for the capture pipeline."""
+
+    def open(self) -> bool:
+        return True
+
+    def read(self) -> Optional[CapturedFrame]:
+        """Block until the next frame is available. None means end of stream."""
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+
+class CameraFrameSource(FrameSource):
+    """
+    Frames from a local camera through cv2.VideoCapture.
+
+    Uses the camera's negotiated CaptureProfile unless one is given. With a
+    pool, decoded frames are written into its buffers; the consumer hands
+    them back with pool.release(frame.image).
+    """
+
+    def __init__(
+        self,
+        camera_index: int,
+        profile: Optional[CaptureProfile] = None,
+        pool: Optional[FrameBufferPool] = None,
+    ):
+        self.camera_index = camera_index
+        self.pool = pool
+        self.profile = profile if profile is not None else load_capture_profile(camera_index)
+        self.cap: Optional[cv2.VideoCapture] = None
+        self.width = self.profile.width
+        self.height = self.profile.height
+        # Frames come undecoded and only their luma is extracted
+        self.raw = False
+
+    def open(self) -> bool:
+        self.cap = cv2.VideoCapture(self.camera_index)
+        if not self.cap.isOpened():
+            logger.error(f"Failed to open camera {self.camera_index}")
+            return False
+        self.raw = apply_capture_profile(self.cap, self.profile)
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        logger.info(
+            f"Camera {self.camera_index}: {fourcc_to_str(self.cap.get(cv2.CAP_PROP_FOURCC))} "
+            f"{self.width}x{self.height} at {self.cap.get(cv2.CAP_PROP_FPS):.0f} fps"
+            f"{', grayscale' if self.raw else ''}"
+        )
+        return True
+
+    def read(self) -> Optional[CapturedFrame]:
+        # Stamp right after grab() so decoding time is not counted as capture delay
+        if self.cap is None or not self.cap.grab():
+            return None
+        timestamp = time.monotonic()
+        # Raw buffers vary in size (MJPG) and are not pooled, decoded frames are
+        shape = (self.height, self.width) if self.raw else (self.height, self.width, 3)
+        buffer = self.pool.acquire(shape) if self.pool is not None else None
+        ret, frame = self.cap.retrieve(None if self.raw else buffer)
+        if not ret:
+            self._release(buffer)
+            return None
+        if self.raw:
+            gray = raw_to_gray(frame, self.width, self.height, dst=buffer)
+            if gray is not buffer:
+                self._release(buffer)
+            if gray is not None:
+                return CapturedFrame(gray, timestamp)
+            # The backend decodes regardless, stay with what it delivers
+            logger.warning(f"Camera {self.camera_index}: no raw frames, using BGR")
+            self.raw = False
+            self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+            if frame.ndim != 3:
+                return self.read()
+        elif frame is not buffer:
+            # Size differs from what was negotiated, OpenCV allocated instead
+            self._release(buffer)
+        return CapturedFrame(frame, timestamp)
+
+    def _release(self, buffer: Optional[np.ndarray]):
+        if self.pool is not None:
+            self.pool.release(buffer)
+
+    def release(self):
+        if self.cap and self.cap.isOpened():
+            self.cap.release()
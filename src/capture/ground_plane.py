@@ -0,0 +1,108 @@
+"""Image-to-floor homography for robots driving on a flat floor."""
+
+import logging
+import pathlib
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from constants import GROUND_PLANE_PATH, GROUND_REFERENCE_MARKERS, MARKER_LENGTH
+
+logger = logging.getLogger(__name__)
+
+
+def ground_plane_path(camera_id: int) -> pathlib.Path:
+    """Homography file of a camera; the primary camera uses GROUND_PLANE_PATH."""
+    if camera_id == 0:
+        return GROUND_PLANE_PATH
+    return GROUND_PLANE_PATH.with_name(f"{GROUND_PLANE_PATH.stem}_cam{camera_id}.npz")
+
+
+def marker_corners_world(x: float, y: float, yaw: float, length: float) -> np.ndarray:
+    """World corners of a marker in ArUco order (TL, TR, BR, BL), shape (4, 2)."""
+    half = length / 2
+    local = np.array([[-half, half], [half, half], [half, -half], [-half, -half]])
+    rotation = np.array([[np.cos(yaw), -np.sin(yaw)], [np.sin(yaw), np.cos(yaw)]])
+    return local @ rotation.T + [x, y]
+
+
+class GroundPlane:
+    """
+    Homography from undistorted image pixels to metric floor coordinates.
+
+    The homography is valid for the plane the calibration markers lie in, so
+    the reference markers have to be mounted at the same height as the
+    markers on the robots. Once calibrated, every marker of a frame is mapped
+    to the world with one cv2.perspectiveTransform call.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = pathlib.Path(path)
+        self.homography: Optional[np.ndarray] = None
+        try:
+            with np.load(self.path) as npz_file:
+                self.homography = np.array(npz_file["homography"])
+            logger.info(f"Ground plane homography loaded: {self.path}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to load ground plane homography: {e}")
+
+    @property
+    def calibrated(self) -> bool:
+        return self.homography is not None
+
+    def calibrate(
+        self,
+        ids: np.ndarray,
+        corners,
+        references: dict[int, tuple[float, float, float]] = GROUND_REFERENCE_MARKERS,
+        marker_length: float = MARKER_LENGTH,
+    ) -> bool:
+        """
+        Fit the homography to the visible reference markers and save it.
+
+        references maps marker id to its (x, y, yaw) on the floor. One marker
+        is enough, every additional one makes the fit more robust.
+        """
+        image_points = []
+        world_points = []
+        for marker_corners, marker_id in zip(corners, ids.flatten()):
+            reference = references.get(int(marker_id))
+            if reference is None:
+                continue
+            image_points.append(np.reshape(marker_corners, (4, 2)))
+            world_points.append(marker_corners_world(*reference, marker_length))
+        if not image_points:
+            logger.error("Ground plane calibration: no reference markers visible")
+            return False
+
+        image_points = np.concatenate(image_points).astype(np.float32)
+        world_points = np.concatenate(world_points).astype(np.float32)
+        method = cv2.RANSAC if len(image_points) >= 8 else 0
+        homography, _ = cv2.findHomography(image_points, world_points, method)
+        if homography is None:
+            logger.error("Ground plane calibration: homography fit failed")
+            return False
+
+        projected = cv2.perspectiveTransform(image_points.reshape(-1, 1, 2), homography)
+        rms = np.sqrt(np.mean(np.sum((projected.reshape(-1, 2) - world_points) ** 2, axis=1)))
+        self.homography = homography
+        np.savez(self.path, homography=homography)
+        logger.info(
+            f"Ground plane calibrated from {len(image_points) // 4} marker(s), "
+            f"RMS error {rms * 1000:.1f} mm, saved to {self.path}"
+        )
+        return True
+
+    def to_world(self, corners: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(N, 2) world centres and (N,) yaw for (N, 4, 2) image corners."""
+        world = cv2.perspectiveTransform(
+            corners.reshape(-1, 1, 2).astype(np.float32), self.homography
+        ).reshape(-1, 4, 2)
+        centers = world.mean(axis=1)
+        # Marker x axis from the top and bottom edges (TL->TR and BL->BR)
+        x_axis = (world[:, 1] - world[:, 0]) + (world[:, 2] - world[:, 3])
+        yaws = np.arctan2(x_axis[:, 1], x_axis[:, 0])
+        return centers, yaws
@@ -0,0 +1,354 @@
+"""Marker detection strategies used by the ObserverThread."""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence
+
+import cv2
+import cv2.aruco as aruco
+import numpy as np
+
+from constants import (
+    PYRAMID_AUDIT_INTERVAL,
+    PYRAMID_SCALE,
+    ROI_FULL_SCAN_INTERVAL,
+    ROI_MIN_PADDING,
+    ROI_PADDING_FACTOR,
+    TILE_DUPLICATE_DISTANCE,
+    TILE_GRID,
+    TILE_OVERLAP,
+    TILE_WORKERS,
+)
+from enums.capture.detection_mode import DetectionMode
+
+logger = logging.getLogger(__name__)
+
+Detections = tuple[Sequence[np.ndarray], Optional[np.ndarray]]
+
+
+class MarkerDetector:
+    """
+    Full-frame ArUco detection.
+
+    Base class for all detection strategies. detect() returns (corners, ids)
+    in the same layout as aruco.detectMarkers: a sequence of (1, 4, 2)
+    float32 corner arrays and an (N, 1) int32 id array, or None when nothing
+    was found.
+
+    The ArucoDetector, holding the dictionary and the camera's tuned
+    DetectorParameters, is built once and shared by all calls. Strategies
+    that search crops of the frame use crop_detector for them, which should
+    not carry perimeter rates tuned on whole frames; see
+    DetectorProfile.create_crop_detector().
+    """
+
+    def __init__(
+        self,
+        aruco_detector: aruco.ArucoDetector,
+        crop_detector: Optional[aruco.ArucoDetector] = None,
+    ):
+        self.aruco_detector = aruco_detector
+        self.crop_detector = crop_detector if crop_detector is not None else aruco_detector
+
+    def detect(self, gray: np.ndarray) -> Detections:
+        corners, ids, _ = self.aruco_detector.detectMarkers(gray)
+        return corners, ids
+
+    def detect_crop(self, crop: np.ndarray) -> Detections:
+        corners, ids, _ = self.crop_detector.detectMarkers(crop)
+        return corners, ids
+
+    def reset(self):
+        """Forget any state carried over from previous frames."""
+        pass
+
+    def close(self):
+        """Release resources held by the detector."""
+        pass
+
+
+class RoiTrackingDetector(MarkerDetector):
+    """
+    Detect markers only inside padded windows around their last known corners.
+
+    A full-frame scan is run every full_scan_interval frames to pick up new
+    markers, and immediately whenever a tracked marker is not found in its
+    window.
+    """
+
+    def __init__(
+        self,
+        aruco_detector: aruco.ArucoDetector,
+        full_scan_interval: int = ROI_FULL_SCAN_INTERVAL,
+        padding_factor: float = ROI_PADDING_FACTOR,
+        min_padding: int = ROI_MIN_PADDING,
+        crop_detector: Optional[aruco.ArucoDetector] = None,
+    ):
+        super().__init__(aruco_detector, crop_detector)
+        self.full_scan_interval = full_scan_interval
+        self.padding_factor = padding_factor
+        self.min_padding = min_padding
+        self._tracks: dict[int, np.ndarray] = {}
+        self._frames_since_full_scan = 0
+
+    def detect(self, gray: np.ndarray) -> Detections:
+        if not self._tracks or self._frames_since_full_scan >= self.full_scan_interval:
+            return self._full_scan(gray)
+
+        found: dict[int, np.ndarray] = {}
+        for x0, y0, x1, y1 in self._search_windows(gray.shape):
+            corners, ids = self.detect_crop(gray[y0:y1, x0:x1])
+            if ids is None:
+                continue
+            offset = np.array([x0, y0], dtype=np.float32)
+            for marker_corners, marker_id in zip(corners, ids.flatten()):
+                found.setdefault(int(marker_id), marker_corners + offset)
+
+        if not self._tracks.keys() <= found.keys():
+            # A tracked marker left its window, rescan the whole frame
+            return self._full_scan(gray)
+
+        self._frames_since_full_scan += 1
+        self._tracks = {marker_id: c.reshape(4, 2) for marker_id, c in found.items()}
+        return _pack(found)
+
+    def reset(self):
+        self._tracks.clear()
+        self._frames_since_full_scan = 0
+
+    def _full_scan(self, gray: np.ndarray) -> Detections:
+        corners, ids = super().detect(gray)
+        self._frames_since_full_scan = 0
+        if ids is None:
+            self._tracks = {}
+        else:
+            self._tracks = {
+                int(marker_id): c.reshape(4, 2) for c, marker_id in zip(corners, ids.flatten())
+            }
+        return corners, ids
+
+    def _search_windows(self, shape: tuple[int, ...]) -> list[tuple[int, int, int, int]]:
+        """Padded, clipped and merged (x0, y0, x1, y1) windows around all tracks."""
+        height, width = shape[:2]
+        windows = []
+        for corners in self._tracks.values():
+            x_min, y_min = corners.min(axis=0)
+            x_max, y_max = corners.max(axis=0)
+            size = max(x_max - x_min, y_max - y_min)
+            pad = max(self.min_padding, self.padding_factor * size)
+            windows.append(
+                [
+                    max(0, int(x_min - pad)),
+                    max(0, int(y_min - pad)),
+                    min(width, int(x_max + pad) + 1),
+                    min(height, int(y_max + pad) + 1),
+                ]
+            )
+        return _merge_windows(windows)
+
+
+class PyramidDetector(MarkerDetector):
+    """
+    Detect on a downscaled frame, then refine the corners at full resolution.
+
+    Corners found in the low-resolution pass are mapped back up and refined
+    with cornerSubPix on the full-resolution image. Every audit_interval frames
+    a full-resolution scan is run as well; markers it finds that the
+    low-resolution pass did not are counted in missed_markers and that frame
+    publishes the full-resolution result instead.
+    """
+
+    SUBPIX_CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.01)
+
+    def __init__(
+        self,
+        aruco_detector: aruco.ArucoDetector,
+        scale: float = PYRAMID_SCALE,
+        audit_interval: int = PYRAMID_AUDIT_INTERVAL,
+    ):
+        super().__init__(aruco_detector)
+        if not 0 < scale <= 1:
+            raise ValueError(f"Pyramid scale must be in (0, 1], got {scale}")
+        self.scale = scale
+        self.audit_interval = audit_interval
+        # Refinement window just larger than one low-resolution pixel
+        half_window = max(2, int(np.ceil(1 / scale)) + 1)
+        self._subpix_window = (half_window, half_window)
+        self._frames_since_audit = 0
+        self.audited_frames = 0
+        self.missed_markers = 0
+        self.last_missed = 0
+
+    def detect(self, gray: np.ndarray) -> Detections:
+        small = cv2.resize(
+            gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA
+        )
+        corners, ids = super().detect(small)
+        if ids is not None:
+            corners = self._refine(gray, corners)
+
+        self._frames_since_audit += 1
+        if self.audit_interval and self._frames_since_audit >= self.audit_interval:
+            return self._audit(gray, corners, ids)
+        return corners, ids
+
+    def reset(self):
+        self._frames_since_audit = 0
+
+    def _refine(self, gray: np.ndarray, corners: Sequence[np.ndarray]) -> tuple:
+        points = np.concatenate(corners).reshape(-1, 1, 2)
+        # Map pixel centres of the downscaled image back to the full image
+        points = ((points + 0.5) / self.scale - 0.5).astype(np.float32)
+        cv2.cornerSubPix(gray, points, self._subpix_window, (-1, -1), self.SUBPIX_CRITERIA)
+        return tuple(points.reshape(-1, 1, 4, 2))
+
+    def _audit(self, gray: np.ndarray, corners, ids) -> Detections:
+        self._frames_since_audit = 0
+        full_corners, full_ids = super().detect(gray)
+        found = set() if ids is None else set(ids.flatten().tolist())
+        full_found = set() if full_ids is None else set(full_ids.flatten().tolist())
+        missed = full_found - found
+
+        self.audited_frames += 1
+        self.last_missed = len(missed)
+        self.missed_markers += len(missed)
+        if missed:
+            logger.info(
+                f"Pyramid pass at scale {self.scale} missed {len(missed)} marker(s) "
+                f"{sorted(missed)} ({self.missed_markers} over {self.audited_frames} audits)"
+            )
+            return full_corners, full_ids
+        return corners, ids
+
+
+class TiledDetector(MarkerDetector):
+    """
+    Split the frame into overlapping tiles and detect them in parallel.
+
+    OpenCV releases the GIL inside detectMarkers, so the tiles of one frame
+    run concurrently on a persistent thread pool. The overlap has to be larger
+    than a marker so every marker lies completely inside at least one tile;
+    markers seen in several tiles are merged by id and corner distance.
+    """
+
+    def __init__(
+        self,
+        aruco_detector: aruco.ArucoDetector,
+        grid: tuple[int, int] = TILE_GRID,
+        overlap: int = TILE_OVERLAP,
+        workers: int = TILE_WORKERS,
+        duplicate_distance: float = TILE_DUPLICATE_DISTANCE,
+        crop_detector: Optional[aruco.ArucoDetector] = None,
+    ):
+        super().__init__(aruco_detector, crop_detector)
+        self.grid = grid
+        self.overlap = overlap
+        self.duplicate_distance = duplicate_distance
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._tiles: list[tuple[int, int, int, int]] = []
+        self._tiles_shape: Optional[tuple[int, ...]] = None
+
+    def detect(self, gray: np.ndarray) -> Detections:
+        if gray.shape != self._tiles_shape:
+            self._tiles = _tile_windows(gray.shape, self.grid, self.overlap)
+            self._tiles_shape = gray.shape
+
+        tile_results = self._executor.map(
+            lambda tile: self._detect_tile(gray, tile), self._tiles
+        )
+        merged_ids: list[int] = []
+        merged_corners: list[np.ndarray] = []
+        for corners, ids in tile_results:
+            for marker_corners, marker_id in zip(corners, ids):
+                if not self._is_duplicate(marker_id, marker_corners, merged_ids, merged_corners):
+                    merged_ids.append(marker_id)
+                    merged_corners.append(marker_corners)
+
+        if not merged_ids:
+            return (), None
+        ids = np.array(merged_ids, dtype=np.int32).reshape(-1, 1)
+        return tuple(c.reshape(1, 4, 2) for c in merged_corners), ids
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def _detect_tile(self, gray: np.ndarray, tile: tuple[int, int, int, int]):
+        x0, y0, x1, y1 = tile
+        corners, ids = self.detect_crop(gray[y0:y1, x0:x1])
+        if ids is None:
+            return [], []
+        offset = np.array([x0, y0], dtype=np.float32)
+        return [c.reshape(4, 2) + offset for c in corners], ids.flatten().tolist()
+
+    def _is_duplicate(self, marker_id, corners, merged_ids, merged_corners) -> bool:
+        for other_id, other_corners in zip(merged_ids, merged_corners):
+            if other_id != marker_id:
+                continue
+            mean_distance = np.linalg.norm(corners - other_corners, axis=1).mean()
+            if mean_distance < self.duplicate_distance:
+                return True
+        return False
+
+
+def _tile_windows(
+    shape: tuple[int, ...], grid: tuple[int, int], overlap: int
+) -> list[tuple[int, int, int, int]]:
+    """(x0, y0, x1, y1) tiles covering the frame, grown by overlap / 2 on each side."""
+    height, width = shape[:2]
+    columns, rows = grid
+    xs = np.linspace(0, width, columns + 1).astype(int)
+    ys = np.linspace(0, height, rows + 1).astype(int)
+    half = overlap // 2
+    return [
+        (
+            max(0, xs[c] - half),
+            max(0, ys[r] - half),
+            min(width, xs[c + 1] + half),
+            min(height, ys[r + 1] + half),
+        )
+        for r in range(rows)
+        for c in range(columns)
+    ]
+
+
+def _merge_windows(windows: list[list[int]]) -> list[tuple[int, int, int, int]]:
+    """Union overlapping windows so no marker is split between two crops."""
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(windows)):
+            for j in range(i + 1, len(windows)):
+                a, b = windows[i], windows[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    windows[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del windows[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return [tuple(w) for w in windows]
+
+
+def _pack(found: dict[int, np.ndarray]) -> Detections:
+    """Convert {id: corners} back into the detectMarkers output layout."""
+    if not found:
+        return (), None
+    ids = np.array(list(found.keys()), dtype=np.int32).reshape(-1, 1)
+    corners = tuple(c.reshape(1, 4, 2).astype(np.float32) for c in found.values())
+    return corners, ids
+
+
+def create_marker_detector(
+    mode: DetectionMode,
+    aruco_detector: aruco.ArucoDetector,
+    crop_detector: Optional[aruco.ArucoDetector] = None,
+) -> MarkerDetector:
+    match mode:
+        case DetectionMode.ROI_TRACKING:
+            return RoiTrackingDetector(aruco_detector, crop_detector=crop_detector)
+        case DetectionMode.PYRAMID:
+            return PyramidDetector(aruco_detector)
+        case DetectionMode.TILED:
+            return TiledDetector(aruco_detector, crop_detector=crop_detector)
+        case _:
+            return MarkerDetector(aruco_detector)
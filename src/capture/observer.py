@@ -1,96 +1,282 @@
 # from typing import Dict
 import logging
-import pathlib
+from functools import partial
+from typing import Optional
+
 import cv2
 import cv2.aruco as aruco
 import numpy as np
 
 # from models.vectors import Pose2D
+from capture.detection_recording import DetectionRecorder
+from capture.frame_buffer_pool import FrameBufferPool
+from capture.frame_grabber import FrameGrabber, LatestFrameBuffer
+from capture.frame_source import CameraFrameSource, CapturedFrame, FrameSource
+from capture.marker_detector import create_marker_detector
+from capture.detector_profile import load_detector_profile
+from capture.process_pool_detector import ProcessPoolDetector
+from constants import DETECTION_WORKERS, PREVIEW_BUFFERS
+from enums.capture.detection_mode import DetectionMode
+from enums.capture.undistort_mode import UndistortMode
 from stores.controller_context import ControllerContext
 from PyQt6.QtCore import QThread, pyqtSignal
 from PyQt6.QtGui import QImage
 
 logger = logging.getLogger(__name__)
 
-calibration_data_path = pathlib.Path(__file__).parent.parent.parent / "calibration_data_latest.npz"
 
+def undistort_corners(corners, camera_matrix, dist_coeff):
+    """
+    Undistort detected marker corners instead of the whole frame.
 
-def get_available_cameras(max_cameras: int = 10) -> list[tuple[int, str]]:
-    """Scan for available cameras and return list of (index, description)."""
-    available = []
-    for i in range(max_cameras):
-        cap = cv2.VideoCapture(i)
-        if cap.isOpened():
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            available.append((i, f"Camera {i} ({width}x{height})"))
-            cap.release()
-    return available
+    The corners are mapped back into pixel coordinates of the ideal pinhole
+    camera (P = camera_matrix), which is the same space cv2.undistort produces
+    with its default new camera matrix.
+    """
+    if len(corners) == 0:
+        return corners
+    points = np.concatenate(corners).reshape(-1, 1, 2).astype(np.float32)
+    undistorted = cv2.undistortPoints(
+        points, camera_matrix, dist_coeff, P=camera_matrix
+    )
+    return tuple(undistorted.reshape(-1, 1, 4, 2))
 
 
 class ObserverThread(QThread):
-    change_pixmap_signal = pyqtSignal(QImage)
+    # The QImage points into a pooled buffer, call the second argument once
+    # the image has been converted or copied to hand the buffer back
+    change_pixmap_signal = pyqtSignal(QImage, object)
     frame_signal = pyqtSignal(object, object, object)
-    dictionary = aruco.getPredefinedDictionary(aruco.DICT_5X5_100)
 
-    def __init__(self, context: ControllerContext, camera_index: int = 0):
+    def __init__(
+        self,
+        context: ControllerContext,
+        camera_index: int = 0,
+        undistort_mode: UndistortMode = UndistortMode.FULL_FRAME,
+        detection_mode: DetectionMode = DetectionMode.FULL_FRAME,
+        frame_source: Optional[FrameSource] = None,
+        camera_id: Optional[int] = None,
+    ):
         super().__init__()
         self._running = True
         self.context = context
-        self.cap = None
         self.camera_index = camera_index
+        # Which camera channel to publish to, the primary camera by default
+        self.channel = (
+            context.camera_channels[camera_id]
+            if camera_id is not None
+            else next(iter(context.camera_channels.values()))
+        )
+        self.undistort_mode = undistort_mode
+        self.detection_mode = detection_mode
+        # Full-resolution buffers are recycled instead of allocated per frame
+        self.buffer_pool = FrameBufferPool()
+        self.frame_source = (
+            frame_source
+            if frame_source is not None
+            else CameraFrameSource(camera_index, pool=self.buffer_pool)
+        )
+        self.grabber = FrameGrabber(
+            self.frame_source,
+            LatestFrameBuffer(on_drop=lambda dropped: self.buffer_pool.release(dropped.image)),
+        )
+        self.processed_frames = 0
+        self.detection_workers = DETECTION_WORKERS
+        self.recorder: Optional[DetectionRecorder] = None
 
     def run(self):
-        self.cap = cv2.VideoCapture(self.camera_index)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 2560)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 1440)
-
-        try:
-            npz_file = np.load(calibration_data_path)
-            camera_matrix = npz_file["camera_matrix"]
-            dist_coeff = npz_file["dist_coeffs"]
-        except FileNotFoundError:
-            logger.error(f"Calibration file not found: {calibration_data_path}")
-            if self.cap and self.cap.isOpened():
-                self.cap.release()
-            return
-        except Exception as e:
-            logger.error(f"Failed to load calibration data: {e}")
-            if self.cap and self.cap.isOpened():
-                self.cap.release()
+        calibration_profile = self.channel.calibration_profile
+        if calibration_profile.get() is None:
+            logger.error("ObserverThread: Cannot run without calibration data")
             return
 
-        arucoParams = cv2.aruco.DetectorParameters()
+        # Tuned once per camera by scripts/tune_detector_parameters.py
+        detector_profile = load_detector_profile(self.channel.config.camera_id)
+        aruco_detector = detector_profile.create_detector()
+        crop_detector = detector_profile.create_crop_detector()
+        detection_mode = self.detection_mode
+        detector = create_marker_detector(detection_mode, aruco_detector, crop_detector)
+        undistort_mode = self.undistort_mode
+        process_pool: Optional[ProcessPoolDetector] = None
+        # Frames handed to the process pool, kept for the preview and recording
+        in_flight: dict[int, tuple[np.ndarray, CapturedFrame]] = {}
+
+        # The grabber keeps draining the camera while we process, so a slow
+        # iteration drops old frames instead of queueing them up
+        frame_buffer = self.grabber.buffer
+        self.grabber.start()
 
         while self._running:
-            ret, frame = self.cap.read()
-            if not ret:
-                break
+            captured = frame_buffer.take(timeout=0.5)
+            if captured is None:
+                if frame_buffer.closed:
+                    break
+                continue
+            frame = captured.image
+            self.processed_frames += 1
 
-            undistorted_frame = cv2.undistort(
-                frame, cameraMatrix=camera_matrix, distCoeffs=dist_coeff
-            )
-            gray = cv2.cvtColor(undistorted_frame, cv2.COLOR_BGR2GRAY)
-            corners, ids, _ = aruco.detectMarkers(
-                gray, self.dictionary, parameters=arucoParams
-            )
-            rgb_frame = cv2.cvtColor(undistorted_frame, cv2.COLOR_BGR2RGB)
+            calibration = calibration_profile.get()
+            frame_size = (frame.shape[1], frame.shape[0])
+            if calibration.image_size != frame_size:
+                calibration_profile.set_image_size(frame_size)
+                calibration = calibration_profile.get()
 
-            rgb_frame = aruco.drawDetectedMarkers(rgb_frame, corners, ids)
+            if self.detection_mode != detection_mode:
+                detection_mode = self.detection_mode
+                detector.close()
+                detector = create_marker_detector(detection_mode, aruco_detector, crop_detector)
+            if self.undistort_mode != undistort_mode:
+                # Tracked corners live in the old image space
+                undistort_mode = self.undistort_mode
+                detector.reset()
 
-            self.context.frame_data_store.update(ids=ids, corners=corners)
+            if undistort_mode == UndistortMode.CORNERS:
+                display_frame = frame
+            else:
+                display_frame = cv2.remap(
+                    frame,
+                    calibration.map1,
+                    calibration.map2,
+                    cv2.INTER_LINEAR,
+                    dst=self.buffer_pool.acquire(frame.shape, frame.dtype),
+                )
 
-            h, w, ch = rgb_frame.shape
-            bytes_per_line = ch * w
-            qt_image = QImage(
-                rgb_frame.data, w, h, bytes_per_line, QImage.Format.Format_RGB888
+            if detection_mode != DetectionMode.PROCESS_POOL:
+                if process_pool is not None:
+                    process_pool.close()
+                    process_pool = None
+                    self._release_in_flight(in_flight)
+                # Grayscale capture profiles deliver luma only, no conversion needed
+                gray = (
+                    display_frame
+                    if display_frame.ndim == 2
+                    else cv2.cvtColor(
+                        display_frame,
+                        cv2.COLOR_BGR2GRAY,
+                        dst=self.buffer_pool.acquire(display_frame.shape[:2]),
+                    )
+                )
+                corners, ids = detector.detect(gray)
+                self._publish(captured, corners, ids, calibration, undistort_mode)
+                self._emit_preview(display_frame, corners, ids)
+                self._release_frames(frame, display_frame, gray)
+                continue
+
+            if process_pool is None or process_pool.frame_shape != display_frame.shape:
+                if process_pool is not None:
+                    process_pool.close()
+                    self._release_in_flight(in_flight)
+                process_pool = ProcessPoolDetector(
+                    display_frame.shape, detector_profile, workers=self.detection_workers
+                )
+            try:
+                # Waits for a worker only when every slot of the ring is busy
+                if process_pool.submit(captured.sequence, display_frame, timeout=0.5):
+                    in_flight[captured.sequence] = (display_frame, captured)
+                else:
+                    self._release_frames(frame, display_frame)
+                results = process_pool.collect()
+            except RuntimeError as e:
+                logger.error(f"Process pool detection failed, using full-frame detection: {e}")
+                process_pool.close()
+                process_pool = None
+                self._release_in_flight(in_flight)
+                self.set_detection_mode(DetectionMode.FULL_FRAME)
+                continue
+            finished = []
+            for sequence, corners, ids in results:
+                preview_frame, published = in_flight.pop(sequence)
+                corners = tuple(corners.reshape(-1, 1, 4, 2))
+                self._publish(published, corners, ids, calibration, undistort_mode)
+                finished.append((preview_frame, published))
+            if results:
+                self._emit_preview(preview_frame, corners, ids)
+            for preview_frame, published in finished:
+                self._release_frames(published.image, preview_frame)
+
+        if process_pool is not None:
+            process_pool.close()
+        self._release_in_flight(in_flight)
+        detector.close()
+        self.stop_recording()
+        self.grabber.stop()
+        self.grabber.wait()
+        logger.info(
+            f"ObserverThread: grabbed {self.grabber.grabbed_frames} frames, "
+            f"processed {self.processed_frames}, dropped {frame_buffer.dropped_frames}"
+        )
+
+    def _publish(self, captured, corners, ids, calibration, undistort_mode):
+        if undistort_mode == UndistortMode.CORNERS:
+            corners = undistort_corners(
+                corners, calibration.camera_matrix, calibration.dist_coeffs
             )
-            self.change_pixmap_signal.emit(qt_image)
+        self.channel.frame_data_store.update(
+            ids=ids, corners=corners, sequence=captured.sequence, timestamp=captured.timestamp
+        )
+        recorder = self.recorder
+        if recorder is not None:
+            # The raw frame, so a replay runs through the same undistortion
+            recorder.write(captured.sequence, captured.timestamp, ids, corners, captured.image)
+
+    def _emit_preview(self, display_frame, corners, ids):
+        if not self.receivers(self.change_pixmap_signal):
+            # Secondary rig cameras run without a preview
+            return
+        h, w = display_frame.shape[:2]
+        rgb_frame = self.buffer_pool.try_acquire((h, w, 3), limit=PREVIEW_BUFFERS)
+        if rgb_frame is None:
+            # The GUI has not painted the previous previews yet
+            return
+        cv2.cvtColor(
+            display_frame,
+            cv2.COLOR_GRAY2RGB if display_frame.ndim == 2 else cv2.COLOR_BGR2RGB,
+            dst=rgb_frame,
+        )
+        aruco.drawDetectedMarkers(rgb_frame, corners, ids)
+
+        bytes_per_line = 3 * w
+        qt_image = QImage(
+            rgb_frame.data, w, h, bytes_per_line, QImage.Format.Format_RGB888
+        )
+        # The buffer must outlive the QImage, which does not own its pixels
+        self.change_pixmap_signal.emit(qt_image, partial(self.buffer_pool.release, rgb_frame))
+
+    def _release_frames(self, *frames):
+        """Hand pooled frames back, each once even where stages passed it through."""
+        for frame in {id(frame): frame for frame in frames}.values():
+            self.buffer_pool.release(frame)
+
+    def _release_in_flight(self, in_flight: dict[int, tuple[np.ndarray, CapturedFrame]]):
+        for display_frame, captured in in_flight.values():
+            self._release_frames(captured.image, display_frame)
+        in_flight.clear()
+
+    def set_undistort_mode(self, mode: UndistortMode):
+        """Switch between full-frame and corner-only undistortion."""
+        self.undistort_mode = mode
+        logger.info(f"ObserverThread undistort mode: {mode.name}")
+
+    def set_detection_mode(self, mode: DetectionMode):
+        """Switch the marker detection strategy."""
+        self.detection_mode = mode
+        logger.info(f"ObserverThread detection mode: {mode.name}")
+
+    def start_recording(self, path, record_frames: bool = False):
+        """Record everything published from now on, see DetectionRecording."""
+        self.stop_recording()
+        self.recorder = DetectionRecorder(path, record_frames)
+
+    def stop_recording(self):
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
 
-        if self.cap and self.cap.isOpened():
-            self.cap.release()
+    @property
+    def dropped_frames(self) -> int:
+        """Frames replaced by a newer one before detection could take them."""
+        return self.grabber.buffer.dropped_frames
 
     def stop(self):
         self._running = False
-        if self.cap and self.cap.isOpened():
-            self.cap.release()
+        self.grabber.stop()
@@ -0,0 +1,93 @@
+"""Fusion of per-camera marker observations into world-frame agent poses."""
+
+import time
+from threading import Lock
+from typing import Optional
+
+import numpy as np
+
+from constants import ALL_MARKER_IDS, FUSION_MAX_AGE, MARKER_DICTIONARY_SIZE
+from models.vectors import Pose2D, Stamp
+
+
+class PoseFuser:
+    """
+    Weighted fusion of the latest observation of every marker from every camera.
+
+    Each camera's newest frame replaces all of that camera's previous
+    observations. Cameras whose last frame is older than max_age are ignored.
+    Positions are weighted means, yaw is the weighted circular mean, and each
+    fused pose is stamped with the capture time of the oldest observation
+    that went into it. All cameras and markers are fused in one set of NumPy operations over a
+    (cameras x dictionary size) table.
+    """
+
+    def __init__(self, camera_ids: list[int], max_age: float = FUSION_MAX_AGE):
+        self.max_age = max_age
+        self._lock = Lock()
+        self._rows = {camera_id: row for row, camera_id in enumerate(camera_ids)}
+        shape = (len(camera_ids), MARKER_DICTIONARY_SIZE)
+        self._x = np.zeros(shape)
+        self._y = np.zeros(shape)
+        self._cos = np.zeros(shape)
+        self._sin = np.zeros(shape)
+        self._weight = np.zeros(shape)
+        self._timestamp = np.full(len(camera_ids), -np.inf)
+        self._expected = np.zeros(MARKER_DICTIONARY_SIZE, dtype=bool)
+        self._expected[ALL_MARKER_IDS] = True
+
+    def submit(
+        self,
+        camera_id: int,
+        ids: np.ndarray,
+        xy: np.ndarray,
+        yaw: np.ndarray,
+        weights: np.ndarray,
+        timestamp: Optional[float] = None,
+    ) -> dict[int, Optional[Pose2D]]:
+        """
+        Record one camera's observations and return the fused poses.
+
+        ids, yaw and weights have shape (N,), xy has shape (N, 2), all in the
+        world frame, timestamp is the capture time of the camera's frame.
+        The result holds every expected marker (None when no fresh camera
+        sees it) and every other marker currently observed.
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            row = self._rows[camera_id]
+            self._weight[row] = 0.0
+            self._x[row, ids] = xy[:, 0]
+            self._y[row, ids] = xy[:, 1]
+            self._cos[row, ids] = np.cos(yaw)
+            self._sin[row, ids] = np.sin(yaw)
+            self._weight[row, ids] = weights
+            self._timestamp[row] = timestamp
+
+            fresh = (timestamp - self._timestamp) <= self.max_age
+            weight = self._weight * fresh[:, None]
+            total = weight.sum(axis=0)
+            seen = total > 0
+            safe_total = np.where(seen, total, 1.0)
+            x = (weight * self._x).sum(axis=0) / safe_total
+            y = (weight * self._y).sum(axis=0) / safe_total
+            theta = np.arctan2((weight * self._sin).sum(axis=0), (weight * self._cos).sum(axis=0))
+            oldest = np.where(weight > 0, self._timestamp[:, None], np.inf).min(axis=0)
+
+        seen_ids = np.flatnonzero(seen)
+        poses: dict[int, Optional[Pose2D]] = dict.fromkeys(
+            np.flatnonzero(self._expected & ~seen).tolist()
+        )
+        poses.update(
+            zip(
+                seen_ids.tolist(),
+                map(
+                    Pose2D,
+                    x[seen_ids].tolist(),
+                    y[seen_ids].tolist(),
+                    theta[seen_ids].tolist(),
+                    map(Stamp, oldest[seen_ids].tolist()),
+                ),
+            )
+        )
+        return poses
@@ -0,0 +1,185 @@
+"""Marker detection on a pool of worker processes fed through shared memory."""
+
+import logging
+import multiprocessing
+import queue
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from capture.detector_profile import DetectorProfile
+from constants import DETECTION_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# (sequence, corners as an (N, 4, 2) float32 array, ids as (N, 1) int32 or None)
+DetectionResult = tuple[int, np.ndarray, Optional[np.ndarray]]
+
+
+class SharedFrameRing:
+    """A fixed number of equally shaped frame slots in one shared memory block."""
+
+    def __init__(
+        self,
+        slots: int,
+        shape: tuple[int, ...],
+        dtype=np.uint8,
+        name: Optional[str] = None,
+    ):
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        slot_size = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._owner = name is None
+        if self._owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=slot_size * slots)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._frames = np.ndarray(
+            (slots, *self.shape), dtype=self.dtype, buffer=self._shm.buf
+        )
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def slot(self, index: int) -> np.ndarray:
+        return self._frames[index]
+
+    def close(self):
+        del self._frames
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def _detection_worker(
+    ring_name: str,
+    slots: int,
+    shape: tuple[int, ...],
+    detector_profile: DetectorProfile,
+    tasks: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+):
+    # Parallelism comes from the pool, keep OpenCV from oversubscribing cores
+    cv2.setNumThreads(1)
+    ring = SharedFrameRing(slots, shape, name=ring_name)
+    aruco_detector = detector_profile.create_detector()
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            sequence, slot = task
+            frame = ring.slot(slot)
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+            corners, ids, _ = aruco_detector.detectMarkers(gray)
+            corners = np.array(corners, dtype=np.float32).reshape(-1, 4, 2)
+            results.put((sequence, slot, corners, ids))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
+
+
+class ProcessPoolDetector:
+    """
+    Detect markers on worker processes so detection is not bound by the GIL.
+
+    submit() copies a frame into a free slot of a SharedFrameRing and queues
+    its slot index; workers convert it to grayscale, run detectMarkers and
+    send back only corners and ids. collect() hands results back in the order
+    the frames were submitted. The ring has two slots per worker so every
+    worker can have the next frame waiting while it processes the current one.
+    """
+
+    def __init__(
+        self,
+        frame_shape: tuple[int, ...],
+        detector_profile: Optional[DetectorProfile] = None,
+        workers: int = DETECTION_WORKERS,
+    ):
+        self.frame_shape = tuple(frame_shape)
+        self.workers = max(1, workers)
+        mp_context = multiprocessing.get_context("spawn")
+        self._ring = SharedFrameRing(2 * self.workers, self.frame_shape)
+        self._tasks = mp_context.Queue()
+        self._results = mp_context.Queue()
+        self._free_slots = deque(range(self._ring.slots))
+        self._submitted: deque[int] = deque()
+        self._finished: dict[int, DetectionResult] = {}
+        self._processes = [
+            mp_context.Process(
+                target=_detection_worker,
+                args=(
+                    self._ring.name,
+                    self._ring.slots,
+                    self.frame_shape,
+                    detector_profile if detector_profile is not None else DetectorProfile(),
+                    self._tasks,
+                    self._results,
+                ),
+                daemon=True,
+            )
+            for _ in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+        logger.info(f"ProcessPoolDetector started {self.workers} workers")
+
+    def submit(self, sequence: int, frame: np.ndarray, timeout: Optional[float] = None) -> bool:
+        """
+        Queue a frame for detection.
+
+        Blocks up to timeout for a worker to free a slot when all are busy.
+        Returns False if no slot became available.
+        """
+        if not self._free_slots:
+            self._receive(timeout)
+            if not self._free_slots:
+                return False
+        slot = self._free_slots.popleft()
+        np.copyto(self._ring.slot(slot), frame)
+        self._submitted.append(sequence)
+        self._tasks.put((sequence, slot))
+        return True
+
+    def collect(self, timeout: Optional[float] = 0) -> list[DetectionResult]:
+        """Return finished results in submission order without skipping any."""
+        if self._submitted:
+            self._receive(timeout)
+        ready = []
+        while self._submitted and self._submitted[0] in self._finished:
+            ready.append(self._finished.pop(self._submitted.popleft()))
+        return ready
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._submitted)
+
+    def close(self):
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=1.0)
+            if process.is_alive():
+                process.terminate()
+        self._ring.close()
+        logger.info("ProcessPoolDetector stopped")
+
+    def _receive(self, timeout: Optional[float]):
+        """Drain the result queue, waiting up to timeout for the first result."""
+        block = timeout is None or timeout > 0
+        while True:
+            try:
+                sequence, slot, corners, ids = self._results.get(block=block, timeout=timeout)
+            except queue.Empty:
+                if block and not all(process.is_alive() for process in self._processes):
+                    raise RuntimeError("A detection worker process exited unexpectedly")
+                return
+            self._free_slots.append(slot)
+            self._finished[sequence] = (sequence, corners, ids)
+            block = False
@@ -0,0 +1,260 @@
+"""Camera-free test input: rendered ArUco markers moving with known poses."""
+
+import math
+import time
+from typing import Optional
+
+import cv2
+import cv2.aruco as aruco
+import numpy as np
+
+from capture.frame_source import CapturedFrame, FrameSource
+from capture.marker_pose import marker_object_points
+from constants import MARKER_DICTIONARY_SIZE, MARKER_LENGTH
+from models.vectors import Pose2D
+
+# Marker image resolution before warping, white quiet zone included
+_MARKER_PIXELS = 120
+_QUIET_ZONE = 0.2  # Quiet zone width as a fraction of the marker length
+
+
+class SyntheticScene:
+    """
+    N DICT_5X5_100 markers driving circles on the floor below a camera.
+
+    The camera looks straight down from height meters, so its frame is the
+    world frame FrameAnalyzer reports without an extrinsic: x right, y down
+    the image, markers at z = height. Every marker circles its own cell of a
+    grid that covers the view, so markers never overlap. Rendering is fully
+    determined by the time and the seed.
+
+    Markers are warped into the frame with the pinhole model; when
+    dist_coeffs are given the whole frame is then distorted with them.
+    """
+
+    def __init__(
+        self,
+        marker_count: int = 4,
+        width: int = 1280,
+        height: int = 720,
+        camera_height: float = 2.0,
+        marker_length: float = MARKER_LENGTH,
+        camera_matrix: Optional[np.ndarray] = None,
+        dist_coeffs: Optional[np.ndarray] = None,
+        blur: float = 0.0,
+        noise: float = 0.0,
+        speed: float = 0.3,
+        seed: int = 0,
+    ):
+        if not 0 < marker_count <= MARKER_DICTIONARY_SIZE:
+            raise ValueError(f"Marker count must be in 1..{MARKER_DICTIONARY_SIZE}")
+        self.marker_count = marker_count
+        self.size = (width, height)
+        self.camera_height = camera_height
+        self.marker_length = marker_length
+        self.camera_matrix = (
+            camera_matrix
+            if camera_matrix is not None
+            else np.array([[0.8 * width, 0, width / 2], [0, 0.8 * width, height / 2], [0, 0, 1]])
+        )
+        self.dist_coeffs = dist_coeffs
+        self.blur = blur
+        self.noise = noise
+        self.speed = speed  # Meters per second, the fastest marker
+        self.seed = seed
+
+        dictionary = aruco.getPredefinedDictionary(aruco.DICT_5X5_100)
+        border = int(round(_MARKER_PIXELS * _QUIET_ZONE))
+        self._marker_images = [
+            cv2.copyMakeBorder(
+                aruco.generateImageMarker(dictionary, marker_id, _MARKER_PIXELS),
+                border, border, border, border, cv2.BORDER_CONSTANT, value=255,
+            )
+            for marker_id in range(marker_count)
+        ]
+        patch = _MARKER_PIXELS + 2 * border
+        # Outer corners of the patch's corner pixels (pixel centres are integers)
+        self._patch_corners = np.array(
+            [[0, 0], [patch, 0], [patch, patch], [0, patch]], dtype=np.float32
+        ) - 0.5
+        # Marker corners plus quiet zone, in the marker frame
+        self._object_points = marker_object_points(marker_length * (1 + 2 * _QUIET_ZONE))
+        self._marker_points = marker_object_points(marker_length)
+
+        self._layout_trajectories(np.random.default_rng(seed))
+        self._background = self._render_background(np.random.default_rng(seed))
+        self._distortion_maps = self._build_distortion_maps() if dist_coeffs is not None else None
+        self._noise = np.empty((height, width), np.int16)
+
+    def _layout_trajectories(self, rng: np.random.Generator):
+        width, height = self.size
+        fx, fy = self.camera_matrix[0, 0], self.camera_matrix[1, 1]
+        cx, cy = self.camera_matrix[0, 2], self.camera_matrix[1, 2]
+        # Visible floor, with a margin so markers stay fully in view
+        margin = self.marker_length
+        x_min = -cx / fx * self.camera_height + margin
+        x_max = (width - cx) / fx * self.camera_height - margin
+        y_min = -cy / fy * self.camera_height + margin
+        y_max = (height - cy) / fy * self.camera_height - margin
+        columns = max(1, math.ceil(math.sqrt(self.marker_count * (x_max - x_min) / (y_max - y_min))))
+        rows = math.ceil(self.marker_count / columns)
+        cell = min((x_max - x_min) / columns, (y_max - y_min) / rows)
+        # Circle radius that keeps a marker (diagonal incl. quiet zone) inside its cell
+        radius = max(0.0, cell / 2 - self.marker_length * (1 + 2 * _QUIET_ZONE) * 0.75)
+        index = np.arange(self.marker_count)
+        self._centers = np.column_stack(
+            [
+                x_min + (index % columns + 0.5) * (x_max - x_min) / columns,
+                y_min + (index // columns + 0.5) * (y_max - y_min) / rows,
+            ]
+        )
+        self._radius = radius * rng.uniform(0.5, 1.0, self.marker_count)
+        linear_speed = self.speed * rng.uniform(0.5, 1.0, self.marker_count)
+        self._angular_speed = (
+            rng.choice([-1.0, 1.0], self.marker_count)
+            * linear_speed
+            / np.maximum(self._radius, 1e-3)
+        )
+        self._phase = rng.uniform(0, 2 * np.pi, self.marker_count)
+
+    def _render_background(self, rng: np.random.Generator) -> np.ndarray:
+        width, height = self.size
+        # Smooth uneven lighting plus a little floor texture
+        x = np.linspace(-1, 1, width, dtype=np.float32)
+        y = np.linspace(-1, 1, height, dtype=np.float32)
+        lighting = 170 - 40 * (x[None, :] ** 2 + y[:, None] ** 2)
+        texture = cv2.resize(
+            rng.normal(0, 8, (height // 16 + 1, width // 16 + 1)).astype(np.float32),
+            (width, height),
+        )
+        return np.clip(lighting + texture, 0, 255).astype(np.uint8)
+
+    def _build_distortion_maps(self) -> tuple[np.ndarray, np.ndarray]:
+        """For every distorted output pixel, where it lies in the ideal image."""
+        width, height = self.size
+        grid = np.mgrid[0:height, 0:width][::-1].reshape(2, -1).T.astype(np.float32)
+        ideal = cv2.undistortPoints(
+            grid.reshape(-1, 1, 2), self.camera_matrix, self.dist_coeffs, P=self.camera_matrix
+        ).reshape(height, width, 2)
+        return cv2.convertMaps(ideal, None, cv2.CV_16SC2)
+
+    def poses(self, t: float) -> dict[int, Pose2D]:
+        """Ground truth at time t, in the camera-above-floor world frame."""
+        angle = self._phase + self._angular_speed * t
+        x = self._centers[:, 0] + self._radius * np.cos(angle)
+        y = self._centers[:, 1] + self._radius * np.sin(angle)
+        # Markers face their direction of travel
+        yaw = angle + np.copysign(np.pi / 2, self._angular_speed)
+        yaw = (yaw + np.pi) % (2 * np.pi) - np.pi
+        return {
+            marker_id: Pose2D(float(x[marker_id]), float(y[marker_id]), float(yaw[marker_id]))
+            for marker_id in range(self.marker_count)
+        }
+
+    def marker_transform(self, pose: Pose2D) -> tuple[np.ndarray, np.ndarray]:
+        """Camera-frame rvec and tvec of a marker lying face up at pose."""
+        # Marker z towards the camera: yaw about the camera axis, then flip
+        rotation_yaw, _ = cv2.Rodrigues(np.array([0.0, 0.0, pose.theta]))
+        rotation_flip, _ = cv2.Rodrigues(np.array([np.pi, 0.0, 0.0]))
+        rvec, _ = cv2.Rodrigues(rotation_yaw @ rotation_flip)
+        tvec = np.array([pose.x, pose.y, self.camera_height])
+        return rvec, tvec
+
+    def marker_corners(self, pose: Pose2D) -> np.ndarray:
+        """Ideal (4, 2) pixel corners of a marker, without lens distortion."""
+        rvec, tvec = self.marker_transform(pose)
+        corners, _ = cv2.projectPoints(
+            self._marker_points, rvec, tvec, self.camera_matrix, np.zeros(5)
+        )
+        return corners.reshape(4, 2)
+
+    def render(self, t: float, index: int = 0) -> tuple[np.ndarray, dict[int, Pose2D]]:
+        """Gray frame at time t and the ground-truth pose of every marker in it."""
+        frame = self._background.copy()
+        width, height = self.size
+        poses = self.poses(t)
+        for marker_id, pose in poses.items():
+            rvec, tvec = self.marker_transform(pose)
+            projected, _ = cv2.projectPoints(
+                self._object_points, rvec, tvec, self.camera_matrix, np.zeros(5)
+            )
+            projected = projected.reshape(4, 2).astype(np.float32)
+            # Warp only into the marker's bounding box, not the whole frame
+            x0, y0 = np.floor(projected.min(axis=0)).astype(int)
+            x1, y1 = np.ceil(projected.max(axis=0)).astype(int) + 1
+            x0, y0 = max(x0, 0), max(y0, 0)
+            x1, y1 = min(x1, width), min(y1, height)
+            if x1 <= x0 or y1 <= y0:
+                continue
+            homography = cv2.getPerspectiveTransform(
+                self._patch_corners, projected - np.float32([x0, y0])
+            )
+            # Transparent border: pixels outside the marker keep the floor
+            cv2.warpPerspective(
+                self._marker_images[marker_id],
+                homography,
+                (x1 - x0, y1 - y0),
+                dst=frame[y0:y1, x0:x1],
+                flags=cv2.INTER_LINEAR,
+                borderMode=cv2.BORDER_TRANSPARENT,
+            )
+
+        if self._distortion_maps is not None:
+            frame = cv2.remap(frame, *self._distortion_maps, cv2.INTER_LINEAR)
+        if self.blur > 0:
+            frame = cv2.GaussianBlur(frame, (0, 0), self.blur)
+        if self.noise > 0:
+            # OpenCV's per-thread RNG, reseeded so every frame is reproducible
+            cv2.setRNGSeed(self.seed * 1_000_003 + index)
+            cv2.randn(self._noise, 0, self.noise)
+            frame = cv2.add(frame, self._noise, dtype=cv2.CV_8U)
+        return frame, poses
+
+
+class SyntheticFrameSource(FrameSource):
+    """
+    Renders a SyntheticScene as camera input at a fixed frame rate.
+
+    Scene time advances by 1 / fps per frame regardless of how long
+    rendering takes, so the frame content is deterministic; with realtime set
+    read() also waits for each frame's due time like a camera would.
+    frame_count limits the stream, None renders forever.
+    """
+
+    def __init__(
+        self,
+        scene: SyntheticScene,
+        fps: float = 30.0,
+        frame_count: Optional[int] = None,
+        realtime: bool = True,
+        color: bool = False,
+    ):
+        self.scene = scene
+        self.fps = fps
+        self.frame_count = frame_count
+        self.realtime = realtime
+        self.color = color
+        self._index = 0
+        self._start: Optional[float] = None
+
+    def open(self) -> bool:
+        self._index = 0
+        self._start = time.monotonic()
+        return True
+
+    def read(self) -> Optional[CapturedFrame]:
+        if self.frame_count is not None and self._index >= self.frame_count:
+            return None
+        if self._start is None:
+            self.open()
+        t = self._index / self.fps
+        if self.realtime:
+            delay = self._start + t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        timestamp = time.monotonic()
+        image, poses = self.scene.render(t, self._index)
+        self._index += 1
+        if self.color:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        return CapturedFrame(image, timestamp, ground_truth=poses)
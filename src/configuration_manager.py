@@ -1,4 +1,5 @@
-from threading import Lock
+from threading import Condition
+from typing import Optional
 from enums.configurations.command_type import CommandType
 from enums.configurations.formation_shape import FormationShape
 from models.configuration_message import ConfigurationMessage
@@ -6,24 +7,34 @@ from models.vectors import Pose2D
 
 
 class ConfigurationManager:
-    _lock: Lock
+    _condition: Condition
     _current_command: CommandType
     _current_formation: FormationShape
     _target: Pose2D
 
     def __init__(self):
-        self._lock = Lock()
+        self._condition = Condition()
+        self.version = 0
         self._current_command = CommandType.CONFIGURE
         self._current_formation = FormationShape.LINE
         self._target = Pose2D(0, 0, 0)
 
     def update_configuration(self, message: ConfigurationMessage):
         print(f"Updating configuration: {message}")
-        with self._lock:
+        with self._condition:
             self._current_command = message.command
             self._current_formation = message.shape
             self._target = message.target
+            self.version += 1
+            self._condition.notify_all()
 
     def get_current_config(self):
-        with self._lock:
+        with self._condition:
             return self._current_command, self._current_formation, self._target
+
+    def wait_for_newer(self, version: int, timeout: Optional[float] = None) -> Optional[int]:
+        """Block until the configuration changed after version, return the new one. None on timeout."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.version > version, timeout):
+                return None
+            return self.version
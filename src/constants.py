@@ -1,10 +1,98 @@
 """Centralized constants for the Odyssey Formation Control system."""
 
+import pathlib
+
 import numpy as np
 
+# Camera calibration
+CALIBRATION_DATA_PATH = pathlib.Path(__file__).parent.parent / "calibration_data_latest.npz"
+CALIBRATION_RELOAD_INTERVAL = 1.0  # Seconds between checks for a new calibration file
+
+# Multi-camera rig (optional, single camera from the UI when missing)
+CAMERA_RIG_PATH = pathlib.Path(__file__).parent.parent / "camera_rig.json"
+FUSION_MAX_AGE = 0.2  # Seconds - ignore cameras whose last frame is older
+
+# Ground-plane pose mode
+GROUND_PLANE_PATH = pathlib.Path(__file__).parent.parent / "ground_plane_homography.npz"
+# Reference markers on the floor: id -> (x, y, yaw) in meters / radians.
+# They must be mounted at the same height as the robot markers.
+GROUND_REFERENCE_MARKERS = {
+    96: (0.0, 0.0, 0.0),
+    97: (2.0, 0.0, 0.0),
+    98: (2.0, 1.5, 0.0),
+    99: (0.0, 1.5, 0.0),
+}
+
+# Capture resolution requested from the camera
+CAPTURE_WIDTH = 2560
+CAPTURE_HEIGHT = 1440
+CAMERA_DISCOVERY_MAX = 10  # Device indices probed where V4L2 sysfs is not available
+CAPTURE_BUFFER_SIZE = 1  # Driver-side frame queue, more only adds latency
+FRAME_POOL_MAX_FREE = 4  # Idle full-resolution buffers kept per image shape
+PREVIEW_BUFFERS = 2  # Preview frames the GUI may hold before previews are skipped
+# Negotiated per camera by scripts/negotiate_capture_profile.py
+CAPTURE_PROFILE_PATH = pathlib.Path(__file__).parent.parent / "capture_profiles.json"
+CAPTURE_RESOLUTIONS = [(2560, 1440), (1920, 1080), (1280, 720), (640, 480)]
+CAPTURE_REQUEST_FPS = 60  # Asked for while negotiating, the measured rate decides
+CAPTURE_TARGET_FPS = 30  # Highest resolution reaching this rate is chosen
+
+# Session recording, see capture/detection_recording.py
+RECORDING_DIR = pathlib.Path(__file__).parent.parent / "recordings"
+RECORDING_JPEG_QUALITY = 90  # Only used when frames are recorded as well
+
+# ROI-tracked marker detection
+ROI_FULL_SCAN_INTERVAL = 30  # Frames between forced full-frame scans
+ROI_PADDING_FACTOR = 1.0  # Search window padding as a multiple of marker size
+ROI_MIN_PADDING = 40  # Pixels - minimum search window padding
+
+# Coarse-to-fine pyramid detection
+PYRAMID_SCALE = 0.5  # Downscale factor for the low-resolution detection pass
+PYRAMID_AUDIT_INTERVAL = 30  # Frames between full-resolution scans counting missed markers
+
+# Intra-frame tiled detection
+TILE_GRID = (4, 2)  # Tiles per frame as (columns, rows)
+TILE_OVERLAP = 160  # Pixels - must exceed the largest marker's size in the image
+TILE_WORKERS = 8  # Threads detecting tiles concurrently
+TILE_DUPLICATE_DISTANCE = 4.0  # Pixels - mean corner distance for duplicate markers
+
+# Multi-process detection
+DETECTION_WORKERS = 4  # Worker processes for the process pool detection backend
+
+# Tuned ArUco detector parameters per camera, see scripts/tune_detector_parameters.py
+DETECTOR_PROFILE_PATH = pathlib.Path(__file__).parent.parent / "detector_profiles.json"
+
 # ArUco marker configuration
 MARKER_LENGTH = 0.12  # in meters
 ALL_MARKER_IDS = np.array([0, 1, 2, 3])
+MARKER_DICTIONARY_SIZE = 100  # Number of ids in DICT_5X5_100
+
+# Marker pose solving
+POSE_GUESS_MAX_AGE = 0.0  # Seconds a previous pose is refined instead of solving anew, 0 disables
+POSE_MAX_REPROJECTION_ERROR = 2.0  # Pixels RMS, worse solutions are rejected
+
+# Per-agent state estimation (alpha-beta filter)
+ESTIMATOR_ALPHA = 0.6  # Position correction gain
+ESTIMATOR_BETA = 0.2  # Velocity correction gain
+ESTIMATOR_COAST_TIME = 0.3  # Seconds an undetected agent is predicted before it is lost
+POSE_PREDICTION_LEAD = 0.01  # Seconds from serial write until the robot acts on it
+
+# Serial transmission, sent whenever a new pose or target is published
+SERIAL_MIN_SEND_INTERVAL = 0.02  # Seconds - 115200 baud carries four robots at 50 Hz
+SERIAL_RESEND_INTERVAL = 0.1  # Seconds - the last state is repeated when nothing changes
+
+# Pose history kept by AgentPoseStore for velocities and UI trails
+POSE_HISTORY_LENGTH = 90  # Samples per agent, 3 s at 30 fps; 0 disables the history
+POSE_HISTORY_FIT_SAMPLES = 6  # Newest samples fitted for velocity and acceleration
+POSE_TRAIL_DURATION = 2.0  # Seconds of trail drawn per agent
+
+# Pipeline stages run in their own process on a shared-memory ControllerContext,
+# any of "FrameAnalyzer", "PathCrossingResolver", "LinkControllerThread", "PositionUpdater"
+PROCESS_STAGES: tuple[str, ...] = ()
+SHARED_FRAME_MAX_MARKERS = 256  # Detections per frame a shared FrameDataStore holds
+SEQLOCK_WRITE_TIMEOUT = 1.0  # Seconds a write may look unfinished before readers give up
+
+# Data age at transmit time
+STALENESS_BUDGET_MS = 150.0  # Pose/target age considered stale, None disables the check
 
 # Formation link configuration
 LINK_LENGTH = 0.5  # in meters
@@ -31,3 +119,4 @@ PCR_TIME_WINDOW = 2.0  # Seconds - arrival time conflict window
 PCR_ROBOT_SPEED_MIN = 0.2  # m/s - minimum robot speed
 PCR_ROBOT_SPEED_MAX = 1.0  # m/s - maximum robot speed
 PCR_CLEAR_MARGIN = 1.5  # Hysteresis factor for clearing conflicts
+PCR_SMALL_FLEET = 12  # Robots up to which pairs are checked in a Python loop instead of NumPy
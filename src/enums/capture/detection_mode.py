@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class DetectionMode(Enum):
+    FULL_FRAME = 1  # detectMarkers over the whole frame every time
+    ROI_TRACKING = 2  # search around last known markers, periodic full scans
+    PYRAMID = 3  # detect on a downscaled frame, refine corners at full resolution
+    PROCESS_POOL = 4  # detect on worker processes fed through shared memory
+    TILED = 5  # detect overlapping tiles of one frame in a thread pool
@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class PoseMode(Enum):
+    PNP = 1  # 6-DoF IPPE solvePnP per marker
+    PLANAR = 2  # ground-plane homography for all markers at once
@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class UndistortMode(Enum):
+    FULL_FRAME = 1  # cv2.undistort the whole frame before detection
+    CORNERS = 2  # detect on the raw frame, undistort only the marker corners
@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class StalenessPolicy(Enum):
+    FLAG = 1  # send anyway, log and count the stale message
+    SKIP = 2  # do not send messages built from stale data
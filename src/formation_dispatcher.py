@@ -1,5 +1,4 @@
 import logging
-import time
 from math import cos, sin
 import numpy as np
 from PyQt6.QtCore import QThread, pyqtSignal
@@ -20,12 +19,13 @@ class FormationDispatcher(QThread):
         self._running = True
 
     def run(self):
+        # Link poses only change with the formation
+        formation_changes = self.context.formation_state_store.subscribe()
         while self._running:
-            descriptor = self.context.formation_state_store.get()
-
-            if descriptor is None:
-                time.sleep(0.5)
+            state = formation_changes.wait(timeout=0.5)
+            if state is None or state.formation is None:
                 continue
+            descriptor = state.formation
 
             (r_d_x, r_d_y), q_d, joints, multipliers = (
                 descriptor.r_d,
@@ -44,6 +44,7 @@ class FormationDispatcher(QThread):
             orientation = q_d
 
             link_poses = []
+            link_pose_updates = {}
             for i in range(NUM_LINKS):
                 # Use shape-specific multiplier for link length
                 link_length = multipliers[i] * LINK_LENGTH
@@ -54,14 +55,15 @@ class FormationDispatcher(QThread):
 
                 # Extract position from transformation matrix
                 pos = (cumulative[0, 2], cumulative[1, 2])
-                self.context.link_pose_store.update(i, Pose2D(pos[0], pos[1], orientation))
+                link_pose_updates[i] = Pose2D(pos[0], pos[1], orientation)
                 link_poses.append((pos[0], pos[1], orientation))
 
+            # All links in one snapshot, readers never see a half-updated chain
+            self.context.link_pose_store.update_batch(link_pose_updates)
+
             # Emit signal with computed poses
             self.poses_computed.emit((r_d_x, r_d_y), q_d, joints, link_poses)
 
-            time.sleep(0.5)
-
     def stop(self):
         self._running = False
         logger.info("Stopping FormationDispatcher")
@@ -1,5 +1,4 @@
 import math
-import time
 from configuration_manager import ConfigurationManager
 from models.vectors import Pose2D
 from stores.controller_context import ControllerContext
@@ -23,7 +22,13 @@ class GlobalSupervisor(QThread):
         self._running = False
 
     def run(self):
+        # -1 so the initial configuration is published right away
+        config_version = -1
         while self._running:
+            version = self.config_manager.wait_for_newer(config_version, timeout=0.5)
+            if version is None:
+                continue
+            config_version = version
             _, shape, target = self.config_manager.get_current_config()
 
             joints = self.get_joint_angles(shape)
@@ -36,7 +41,6 @@ class GlobalSupervisor(QThread):
             # print(f"Global Supervisor: {self.current_formation}")
 
             self.context.formation_state_store.update(self.current_formation)
-            time.sleep(0.1)
 
     def get_coordinates(self, target: Pose2D) -> tuple[tuple[float, float], float]:
         return ((target.x, target.y), target.theta)
@@ -1,6 +1,5 @@
 import logging
 import numpy as np
-import time
 from math import sin, cos
 from PyQt6.QtCore import QThread
 from constants import LINK_AGENT_MAP, NOMINAL_OFFSETS
@@ -20,11 +19,14 @@ class LinkControllerThread(QThread):
 
     def run(self):
         logger.info(f"Running LinkControllerThread for link {self.link_id}")
+        link_changes = self.context.link_pose_store.subscribe()
         while self._running:
-            link_pose = self.context.link_pose_store.get(self.link_id)
+            state = link_changes.wait(timeout=0.5)
+            if state is None:
+                continue
+            link_pose = state.link_poses.get(self.link_id)
             if link_pose is None:
                 # print(f"Link {self.link_id} pose not available, waiting...")
-                time.sleep(0.5)
                 continue
 
             r_d, q_d = (link_pose.x, link_pose.y), link_pose.theta
@@ -35,6 +37,8 @@ class LinkControllerThread(QThread):
             )
 
             agent_poses = dict[int, Pose2D]()
+            # Targets come from the formation, not a camera frame, and are only
+            # recomputed when it changes, so they carry no stamp that would age
 
             for i in agent_ids:
                 offset = NOMINAL_OFFSETS[i]
@@ -47,7 +51,6 @@ class LinkControllerThread(QThread):
             # print(f"Link {self.link_id} updating agent {agent_id} pose: {pose.x:.3f}, {pose.y:.3f}, {pose.theta:.3f}")
 
             self.context.agent_target_store.update_batch(agent_poses)
-            time.sleep(0.05)  # 20Hz update rate
 
     def stop(self):
         self._running = False
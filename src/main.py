@@ -1,8 +1,9 @@
 import logging
 import math
 import sys
+from datetime import datetime
 
-from PyQt6.QtCore import pyqtSlot, Qt
+from PyQt6.QtCore import QSettings, pyqtSlot, Qt
 
 from PyQt6.QtGui import QImage, QPixmap
 from PyQt6.QtWidgets import (
@@ -21,10 +22,16 @@ from PyQt6.QtWidgets import (
 import serial
 import serial.tools.list_ports
 
+from capture.camera_rig import load_camera_rig
 from capture.frame_analyzer import FrameAnalyzer
-from capture.observer import ObserverThread, get_available_cameras
+from capture.camera_discovery import CameraDiscoveryThread
+from capture.observer import ObserverThread
 from configuration_manager import ConfigurationManager
+from constants import PROCESS_STAGES, RECORDING_DIR
 from path_crossing_resolver import PathCrossingResolver
+from enums.capture.detection_mode import DetectionMode
+from enums.capture.pose_mode import PoseMode
+from enums.capture.undistort_mode import UndistortMode
 from enums.configurations.command_type import CommandType
 from enums.configurations.formation_shape import FormationShape
 from formation_dispatcher import FormationDispatcher
@@ -32,13 +39,17 @@ from global_supervisor import GlobalSupervisor
 from link_controller import LinkControllerThread
 from models.configuration_message import ConfigurationMessage
 from models.vectors import Pose2D
+from pose_trail_view import PoseTrailView
 from position_updater import PositionUpdater
+from stage_process import StageProcess
 from stores.controller_context import ControllerContext
+from stores.shared_controller_context import SharedControllerContext
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
+logger = logging.getLogger(__name__)
 
 
 class MainWindow(QWidget):
@@ -47,6 +58,8 @@ class MainWindow(QWidget):
         self.setWindowTitle("Odyssey Formation Control")
         self.serial_port = None
         self.observer_thread = None
+        self.camera_discovery = None
+        self.settings = QSettings("Odyssey", "Odyssey")
 
         self.image_label = QLabel()
 
@@ -63,11 +76,41 @@ class MainWindow(QWidget):
         self.connect_camera_btn = QPushButton("Start Camera")
         self.connect_camera_btn.clicked.connect(self.start_camera)
 
+        self.corner_undistort_checkbox = QCheckBox("Undistort corners only")
+        self.corner_undistort_checkbox.setChecked(False)
+        self.corner_undistort_checkbox.stateChanged.connect(self.on_corner_undistort_changed)
+
+        self.detection_mode_dropdown = QComboBox()
+        for mode in DetectionMode:
+            self.detection_mode_dropdown.addItem(mode.name, mode)
+        self.detection_mode_dropdown.currentIndexChanged.connect(self.on_detection_mode_changed)
+
+        self.pose_mode_dropdown = QComboBox()
+        for mode in PoseMode:
+            self.pose_mode_dropdown.addItem(mode.name, mode)
+        self.pose_mode_dropdown.currentIndexChanged.connect(self.on_pose_mode_changed)
+
+        self.calibrate_ground_btn = QPushButton("Calibrate Ground Plane")
+        self.calibrate_ground_btn.clicked.connect(self.calibrate_ground_plane)
+
+        self.record_btn = QPushButton("Record")
+        self.record_btn.setCheckable(True)
+        self.record_btn.toggled.connect(self.on_record_toggled)
+        self.record_frames_checkbox = QCheckBox("with frames")
+
         camera_controls = QHBoxLayout()
         camera_controls.addWidget(QLabel("Camera:"))
         camera_controls.addWidget(self.camera_dropdown)
         camera_controls.addWidget(self.refresh_camera_btn)
         camera_controls.addWidget(self.connect_camera_btn)
+        camera_controls.addWidget(self.corner_undistort_checkbox)
+        camera_controls.addWidget(QLabel("Detection:"))
+        camera_controls.addWidget(self.detection_mode_dropdown)
+        camera_controls.addWidget(QLabel("Pose:"))
+        camera_controls.addWidget(self.pose_mode_dropdown)
+        camera_controls.addWidget(self.calibrate_ground_btn)
+        camera_controls.addWidget(self.record_btn)
+        camera_controls.addWidget(self.record_frames_checkbox)
 
         # --- Serial Port Section ---
         self.port_dropdown = QComboBox()
@@ -139,6 +182,8 @@ class MainWindow(QWidget):
         log_widget = QHBoxLayout()
         log_widget.addWidget(self.serial_log)
         log_widget.addWidget(self.formation_log)
+        self.trail_view = PoseTrailView()
+        log_widget.addWidget(self.trail_view)
 
         # --- Main Layout ---
         main_layout = QHBoxLayout()
@@ -154,34 +199,72 @@ class MainWindow(QWidget):
         self.initialize_threads()
 
     def initialize_threads(self):
-        self.context = ControllerContext()
-
-        # Auto-select first available camera
-        cameras = get_available_cameras()
-        camera_index = cameras[0][0] if cameras else 0
-
-        self.observer_thread = ObserverThread(self.context, camera_index)
+        rig_cameras = load_camera_rig()
+        self.rig_cameras = rig_cameras
+        self.process_stages = set(PROCESS_STAGES)
+        if len(rig_cameras) > 1 and "FrameAnalyzer" in self.process_stages:
+            # The PoseFuser needs every camera's analyzer in one process
+            logger.warning("FrameAnalyzer runs in the GUI process with several cameras")
+            self.process_stages.discard("FrameAnalyzer")
+        if self.process_stages:
+            self.context = SharedControllerContext(rig_cameras)
+        else:
+            self.context = ControllerContext(rig_cameras)
+        self.trail_view.set_store(self.context.agent_pose_store)
+
+        if rig_cameras:
+            camera_index = rig_cameras[0].device_index
+        else:
+            # Start on the last used camera right away, enumeration runs in
+            # the background and switches cameras only if this one is gone
+            camera_index = int(self.settings.value("camera/last_index", 0))
+
+        self.observer_thread = ObserverThread(
+            self.context,
+            camera_index,
+            self.get_undistort_mode(),
+            self.detection_mode_dropdown.currentData(),
+        )
         self.observer_thread.change_pixmap_signal.connect(self.update_image)
         self.observer_thread.start()
 
-        # Populate camera dropdown and select current camera
-        self.refresh_cameras()
-        for i in range(self.camera_dropdown.count()):
-            if self.camera_dropdown.itemData(i) == camera_index:
-                self.camera_dropdown.setCurrentIndex(i)
-                break
+        self.analyzer_thread = self.start_stage(
+            FrameAnalyzer,
+            # The analyzer does not use the observer, which cannot leave this process
+            None if "FrameAnalyzer" in self.process_stages else self.observer_thread,
+            self.context,
+            pose_mode=self.pose_mode_dropdown.currentData(),
+        )
 
-        self.analyzer_thread = FrameAnalyzer(self.observer_thread, self.context)
-        self.analyzer_thread.start()
+        # Further rig cameras run their own capture and analysis in parallel,
+        # their poses are fused by the context's PoseFuser
+        self.secondary_pipelines: list[tuple[ObserverThread, FrameAnalyzer]] = []
+        for camera in rig_cameras[1:]:
+            observer = ObserverThread(
+                self.context,
+                camera.device_index,
+                self.get_undistort_mode(),
+                self.detection_mode_dropdown.currentData(),
+                camera_id=camera.camera_id,
+            )
+            analyzer = FrameAnalyzer(
+                observer,
+                self.context,
+                camera.camera_id,
+                pose_mode=self.pose_mode_dropdown.currentData(),
+            )
+            observer.start()
+            analyzer.start()
+            self.secondary_pipelines.append((observer, analyzer))
+
+        self.discover_cameras(refresh=False)
 
         self.configuration_manager = ConfigurationManager()
 
         # Path crossing resolver handles collision avoidance
-        self.path_crossing_resolver_thread = PathCrossingResolver(self.context)
-        self.path_crossing_resolver_thread.start()
+        self.path_crossing_resolver_thread = self.start_stage(PathCrossingResolver, self.context)
 
-        self.position_thread = PositionUpdater(self.context)
-        self.position_thread.start()
+        self.position_thread = self.start_stage(PositionUpdater, self.context)
 
         self.global_supervisor_thread = GlobalSupervisor(
             self.context, self.configuration_manager
@@ -192,15 +275,45 @@ class MainWindow(QWidget):
         self.formation_dispatcher_thread.poses_computed.connect(self.on_poses_computed)
         self.formation_dispatcher_thread.start()
 
-        self.link_threads = [LinkControllerThread(i, self.context) for i in range(4)]
-        for thread in self.link_threads:
-            thread.start()
+        self.link_threads = [
+            self.start_stage(LinkControllerThread, i, self.context) for i in range(4)
+        ]
+
+    def start_stage(self, stage_class: type, *args, **kwargs):
+        """Start a pipeline stage as a QThread, or in its own process if PROCESS_STAGES lists it."""
+        if stage_class.__name__ in self.process_stages:
+            stage = StageProcess(stage_class, *args, **kwargs)
+        else:
+            stage = stage_class(*args, **kwargs)
+        stage.start()
+        return stage
 
     def refresh_cameras(self):
-        """Discover available cameras and populate the dropdown."""
+        """Enumerate the cameras again, ignoring cached results."""
+        self.discover_cameras(refresh=True)
+
+    def discover_cameras(self, refresh: bool):
+        """Enumerate cameras in the background, the dropdown is filled when done."""
+        if self.camera_discovery is not None and self.camera_discovery.isRunning():
+            return
+        active = [self.observer_thread.camera_index] if self.observer_thread else []
+        active += [observer.camera_index for observer, _ in self.secondary_pipelines]
+        self.camera_discovery = CameraDiscoveryThread(refresh, active)
+        self.camera_discovery.cameras_found.connect(self.on_cameras_found)
+        self.camera_discovery.start()
+
+    def on_cameras_found(self, cameras: list):
+        """Populate the dropdown and select the camera that is running."""
         self.camera_dropdown.clear()
-        for index, description in get_available_cameras():
+        for index, description in cameras:
             self.camera_dropdown.addItem(description, index)
+        current = self.camera_dropdown.findData(self.observer_thread.camera_index)
+        if current >= 0:
+            self.camera_dropdown.setCurrentIndex(current)
+        elif cameras and not self.rig_cameras:
+            # The last used camera is gone, fall back to the first one found
+            self.serial_log.append(f"Camera {self.observer_thread.camera_index} not found")
+            self.start_camera()
 
     def start_camera(self):
         """Start the camera with the selected index."""
@@ -209,17 +322,76 @@ class MainWindow(QWidget):
             self.serial_log.append("No camera selected")
             return
 
+        # A recording belongs to one camera session
+        self.record_btn.setChecked(False)
+
         # Stop existing observer if running
         if self.observer_thread and self.observer_thread.isRunning():
             self.observer_thread.stop()
             self.observer_thread.wait()
 
         # Start new observer with selected camera
-        self.observer_thread = ObserverThread(self.context, camera_index)
+        self.observer_thread = ObserverThread(
+            self.context,
+            camera_index,
+            self.get_undistort_mode(),
+            self.detection_mode_dropdown.currentData(),
+        )
         self.observer_thread.change_pixmap_signal.connect(self.update_image)
         self.observer_thread.start()
+        self.settings.setValue("camera/last_index", camera_index)
         self.serial_log.append(f"Started camera {camera_index}")
 
+    def get_undistort_mode(self) -> UndistortMode:
+        """Undistortion mode selected in the UI."""
+        if self.corner_undistort_checkbox.isChecked():
+            return UndistortMode.CORNERS
+        return UndistortMode.FULL_FRAME
+
+    def on_corner_undistort_changed(self, state):
+        """Toggle corner-only undistortion on the running observer."""
+        if self.observer_thread:
+            self.observer_thread.set_undistort_mode(self.get_undistort_mode())
+        for observer, _ in self.secondary_pipelines:
+            observer.set_undistort_mode(self.get_undistort_mode())
+
+    def on_detection_mode_changed(self, index):
+        """Switch the marker detection strategy on the running observer."""
+        if self.observer_thread:
+            self.observer_thread.set_detection_mode(self.detection_mode_dropdown.currentData())
+        for observer, _ in self.secondary_pipelines:
+            observer.set_detection_mode(self.detection_mode_dropdown.currentData())
+
+    def on_pose_mode_changed(self, index):
+        """Switch between PnP and ground-plane pose estimation."""
+        for analyzer in self.analyzers():
+            analyzer.set_pose_mode(self.pose_mode_dropdown.currentData())
+
+    def calibrate_ground_plane(self):
+        """Fit every camera's ground plane to the reference markers it currently sees."""
+        for analyzer in self.analyzers():
+            analyzer.calibrate_ground_plane()
+        self.serial_log.append("Ground plane calibration requested")
+
+    def on_record_toggled(self, checked: bool):
+        """Record what every camera publishes, one file per camera."""
+        observers = [self.observer_thread] + [observer for observer, _ in self.secondary_pipelines]
+        if not checked:
+            for observer in observers:
+                observer.stop_recording()
+            self.serial_log.append("Recording stopped")
+            return
+        session = datetime.now().strftime("session-%Y%m%d-%H%M%S")
+        record_frames = self.record_frames_checkbox.isChecked()
+        for observer in observers:
+            camera_id = observer.channel.config.camera_id
+            path = RECORDING_DIR / f"{session}-cam{camera_id}.odr"
+            observer.start_recording(path, record_frames)
+        self.serial_log.append(f"Recording {session} to {RECORDING_DIR}")
+
+    def analyzers(self) -> list[FrameAnalyzer]:
+        return [self.analyzer_thread] + [analyzer for _, analyzer in self.secondary_pipelines]
+
     def handle_send_command(self):
         message: ConfigurationMessage = ConfigurationMessage(
             CommandType.CONFIGURE, FormationShape.LINE, Pose2D(0, 0, 0)
@@ -293,16 +465,21 @@ class MainWindow(QWidget):
 
         self.formation_log.append(log)
 
-    @pyqtSlot(QImage)
-    def update_image(self, qt_image):
+    @pyqtSlot(QImage, object)
+    def update_image(self, qt_image, release_buffer):
         """Receive QImage from the thread and update the label."""
+        # fromImage copies the pixels, the observer may reuse its buffer after this
         self.image_label.setPixmap(QPixmap.fromImage(qt_image))
+        release_buffer()
 
     def closeEvent(self, a0: any) -> None:
         """Handle the window close event to properly terminate the thread."""
         if self.observer_thread:
             self.observer_thread.stop()
         self.analyzer_thread.stop()
+        for observer, analyzer in self.secondary_pipelines:
+            observer.stop()
+            analyzer.stop()
         self.path_crossing_resolver_thread.stop()
         self.position_thread.stop()
         self.global_supervisor_thread.stop()
@@ -312,12 +489,18 @@ class MainWindow(QWidget):
         if self.observer_thread:
             self.observer_thread.wait()
         self.analyzer_thread.wait()
+        for observer, analyzer in self.secondary_pipelines:
+            observer.wait()
+            analyzer.wait()
         self.path_crossing_resolver_thread.wait()
         self.position_thread.wait()
         self.global_supervisor_thread.wait()
         self.formation_dispatcher_thread.wait()
         for thread in self.link_threads:
             thread.wait()
+        if self.camera_discovery is not None:
+            self.camera_discovery.wait()
+        self.context.close()
         a0.accept()
 
 
@@ -0,0 +1,15 @@
+import pathlib
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from constants import CALIBRATION_DATA_PATH
+
+
+@dataclass
+class CameraConfig:
+    camera_id: int
+    device_index: int
+    calibration_path: pathlib.Path = CALIBRATION_DATA_PATH
+    # Camera-to-world homogeneous transform (4x4), identity for a single camera
+    extrinsic: np.ndarray = field(default_factory=lambda: np.eye(4))
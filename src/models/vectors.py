@@ -1,8 +1,17 @@
 
 from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Stamp:
+    timestamp: float  # time.monotonic() of the capture (or computation) the data came from
+    sequence: Optional[int] = None  # frame sequence number, None if not derived from a frame
+
 
 @dataclass
 class Pose2D:
     x: float
     y: float
-    theta: float
\ No newline at end of file
+    theta: float
+    stamp: Optional[Stamp] = None
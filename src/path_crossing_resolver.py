@@ -2,10 +2,10 @@
 
 import logging
 import math
-import time
 from dataclasses import dataclass
-from typing import Dict, Optional, Set, Tuple
+from typing import Dict, Mapping, Optional, Set, Tuple
 
+import numpy as np
 from PyQt6.QtCore import QThread
 
 from constants import (
@@ -13,10 +13,12 @@ from constants import (
     PCR_COLLISION_RADIUS,
     PCR_ROBOT_SPEED_MAX,
     PCR_ROBOT_SPEED_MIN,
+    PCR_SMALL_FLEET,
     PCR_TIME_WINDOW,
 )
 from models.vectors import Pose2D
 from stores.controller_context import ControllerContext
+from stores.pose_table import PoseTable
 
 logger = logging.getLogger(__name__)
 
@@ -78,6 +80,28 @@ def segments_intersect(
     return False, None
 
 
+def segments_intersect_all(
+    p1: np.ndarray, t1: np.ndarray, p2: np.ndarray, t2: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    segments_intersect() for (N, 2) arrays of segment pairs.
+
+    Returns a boolean mask and the (N, 2) intersection points, which are
+    meaningless where the mask is False.
+    """
+    d1 = t1 - p1
+    d2 = t2 - p2
+    dp = p2 - p1
+    cross = d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0]
+    parallel = np.abs(cross) < 1e-10
+    # Parallel pairs divide by one instead of ~0 and are masked out below
+    safe_cross = np.where(parallel, 1.0, cross)
+    t = (dp[:, 0] * d2[:, 1] - dp[:, 1] * d2[:, 0]) / safe_cross
+    u = (dp[:, 0] * d1[:, 1] - dp[:, 1] * d1[:, 0]) / safe_cross
+    intersects = ~parallel & (0 <= t) & (t <= 1) & (0 <= u) & (u <= 1)
+    return intersects, p1 + t[:, None] * d1
+
+
 def distance(p1: Tuple[float, float], p2: Tuple[float, float]) -> float:
     """Calculate Euclidean distance between two points."""
     return math.sqrt((p2[0] - p1[0]) ** 2 + (p2[1] - p1[1]) ** 2)
@@ -99,20 +123,71 @@ def estimate_time_to_point(
     final_target: Tuple[float, float],
     speed_min: float,
     speed_max: float,
+    measured_speed: Optional[float] = None,
 ) -> float:
     """
     Estimate time to reach a point with dynamic speed.
 
-    Speed is based on distance to final_target (not the intermediate point).
+    Speed is based on distance to final_target (not the intermediate point),
+    unless a finite measured_speed is given, clamped to the same limits.
     """
     dist_to_point = distance(current, target)
-    dist_to_final = distance(current, final_target)
-    speed = calculate_speed(dist_to_final, speed_min, speed_max)
+    if measured_speed is not None and math.isfinite(measured_speed):
+        speed = max(speed_min, min(measured_speed, speed_max))
+    else:
+        speed = calculate_speed(distance(current, final_target), speed_min, speed_max)
     if speed <= 0:
         return float("inf")
     return dist_to_point / speed
 
 
+def estimate_times_to_points(
+    current: np.ndarray,
+    target: np.ndarray,
+    final_target: np.ndarray,
+    speed_min: float,
+    speed_max: float,
+    measured_speed: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    estimate_time_to_point() for (N, 2) arrays of points.
+
+    Where measured_speed is finite it replaces the distance-based guess,
+    clamped to the same limits.
+    """
+    dist_to_point = np.hypot(*(target - current).T)
+    speed = np.clip(np.hypot(*(final_target - current).T), speed_min, speed_max)
+    if measured_speed is not None:
+        speed = np.where(
+            np.isfinite(measured_speed), np.clip(measured_speed, speed_min, speed_max), speed
+        )
+    with np.errstate(divide="ignore"):
+        return np.where(speed > 0, dist_to_point / speed, np.inf)
+
+
+def overlapping_boxes(low: np.ndarray, high: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Index pairs i < j of the (N, 2) boxes low..high that overlap, in nested-loop order.
+
+    Sweeps the boxes sorted by their left edge, so only pairs that overlap
+    along x are ever built instead of all N * (N - 1) / 2.
+    """
+    count = len(low)
+    order = np.argsort(low[:, 0], kind="stable")
+    left = low[order, 0]
+    # Boxes after i in the sweep that start before i ends overlap it along x
+    start = np.arange(1, count + 1)
+    end = np.searchsorted(left, high[order, 0], side="right")
+    overlaps = np.maximum(end - start, 0)
+    offsets = np.cumsum(overlaps) - overlaps
+    a = order[np.repeat(np.arange(count), overlaps)]
+    b = order[np.arange(overlaps.sum()) - np.repeat(offsets - start, overlaps)]
+    along_y = (low[a, 1] <= high[b, 1]) & (low[b, 1] <= high[a, 1])
+    first, second = np.minimum(a, b)[along_y], np.maximum(a, b)[along_y]
+    pair_order = np.lexsort((second, first))
+    return first[pair_order], second[pair_order]
+
+
 class PathCrossingResolver(QThread):
     """
     Detects path crossings and resolves conflicts using priority-based strategy.
@@ -138,11 +213,13 @@ class PathCrossingResolver(QThread):
         self.speed_min = PCR_ROBOT_SPEED_MIN
         self.speed_max = PCR_ROBOT_SPEED_MAX
         self.clear_margin = PCR_CLEAR_MARGIN
+        # Arrival times from the robots' measured speeds when history is kept
+        self.use_measured_speed = True
 
     def detect_conflicts(
         self,
-        targets: Dict[int, Pose2D],
-        poses: Dict[int, Optional[Pose2D]],
+        targets: Mapping[int, Pose2D],
+        poses: Mapping[int, Optional[Pose2D]],
     ) -> list[PathConflict]:
         """
         Detect conflicts between all robot pairs.
@@ -151,91 +228,154 @@ class PathCrossingResolver(QThread):
         1. Robots are currently too close (proximity conflict)
         2. Two robot paths intersect geometrically with similar arrival times
         3. Two robots have targets that are too close
+
+        Small fleets are checked pair by pair, where NumPy's per-call
+        overhead would cost more than the loop. Larger ones are narrowed to
+        the pairs whose paths, grown by half the collision radius, have
+        overlapping bounding boxes, as every kind of conflict needs, and
+        those are tested at once on the pose tables' arrays; only the pairs
+        found in conflict become PathConflict objects.
         """
-        conflicts = []
-        robot_ids = sorted(targets.keys())
+        targets = PoseTable.from_mapping(targets)
+        poses = PoseTable.from_mapping(poses)
+        size = min(targets.size, poses.size)
+        robot_ids = np.flatnonzero(targets.valid[:size] & poses.valid[:size])
+        position = poses.pose[:2, robot_ids].T
+        target = targets.pose[:2, robot_ids].T
+        if robot_ids.size <= PCR_SMALL_FLEET:
+            return self._detect_pairwise(robot_ids, position, target)
+
+        margin = self.collision_radius / 2
+        first, second = overlapping_boxes(
+            np.minimum(position, target) - margin, np.maximum(position, target) + margin
+        )
+        p1, t1 = position[first], target[first]
+        p2, t2 = position[second], target[second]
+
+        # 1. PROXIMITY CHECK: Are robots currently too close?
+        proximity = np.hypot(*(p2 - p1).T) < self.collision_radius
+
+        # 2. PATH CROSSING CHECK: Do the paths intersect?
+        intersects, intersection = segments_intersect_all(p1, t1, p2, t2)
+        # Arrival times only matter for crossing paths
+        speed = np.full(robot_ids.size, np.nan)
+        crossing_robots = np.unique(np.concatenate((first[intersects], second[intersects])))
+        if crossing_robots.size:
+            speed[crossing_robots] = self.measured_speeds(
+                robot_ids[crossing_robots], position[crossing_robots], target[crossing_robots]
+            )
+        time_a = estimate_times_to_points(
+            p1, intersection, t1, self.speed_min, self.speed_max, speed[first]
+        )
+        time_b = estimate_times_to_points(
+            p2, intersection, t2, self.speed_min, self.speed_max, speed[second]
+        )
+        # Conflict if both arrive within time window of each other
+        crossing = intersects & (np.abs(time_a - time_b) < self.time_window)
+
+        # 3. TARGET PROXIMITY CHECK: Are targets too close?
+        targets_close = ~intersects & (np.hypot(*(t2 - t1).T) < self.collision_radius)
 
-        for i, robot_a in enumerate(robot_ids):
-            for robot_b in robot_ids[i + 1 :]:
-                target_a = targets.get(robot_a)
-                target_b = targets.get(robot_b)
-                pose_a = poses.get(robot_a)
-                pose_b = poses.get(robot_b)
+        conflicts = []
+        for k in np.flatnonzero(proximity | crossing | targets_close).tolist():
+            robot_a, robot_b = int(robot_ids[first[k]]), int(robot_ids[second[k]])
+            if proximity[k]:
+                # Emergency proximity conflict, proximity takes precedence
+                point, times = p1[k], (0.0, 0.0)
+            elif crossing[k]:
+                point, times = intersection[k], (time_a[k], time_b[k])
+            else:
+                point = t1[k]
+                times = (
+                    estimate_time_to_point(p1[k], t1[k], t1[k], self.speed_min, self.speed_max),
+                    estimate_time_to_point(p2[k], t2[k], t2[k], self.speed_min, self.speed_max),
+                )
+            conflicts.append(
+                PathConflict(
+                    robot_a=robot_a,
+                    robot_b=robot_b,
+                    intersection_point=tuple(point.tolist()),
+                    time_to_intersection_a=float(times[0]),
+                    time_to_intersection_b=float(times[1]),
+                )
+            )
 
-                # Skip if any required data is missing
-                if target_a is None or target_b is None:
-                    continue
-                if pose_a is None or pose_b is None:
-                    continue
+        return conflicts
 
-                p1 = (pose_a.x, pose_a.y)
-                t1 = (target_a.x, target_a.y)
-                p2 = (pose_b.x, pose_b.y)
-                t2 = (target_b.x, target_b.y)
+    def _detect_pairwise(
+        self, robot_ids: np.ndarray, position: np.ndarray, target: np.ndarray
+    ) -> list[PathConflict]:
+        """detect_conflicts() for a few robots, one pair at a time in Python."""
+        ids = robot_ids.tolist()
+        points = [tuple(p) for p in position.tolist()]
+        goals = [tuple(t) for t in target.tolist()]
+        speeds: Optional[list[float]] = None
+        conflicts = []
+        for a in range(len(ids)):
+            for b in range(a + 1, len(ids)):
+                p1, t1, p2, t2 = points[a], goals[a], points[b], goals[b]
 
                 # 1. PROXIMITY CHECK: Are robots currently too close?
-                current_distance = distance(p1, p2)
-                if current_distance < self.collision_radius:
-                    # Emergency proximity conflict - robots are already too close
-                    conflicts.append(
-                        PathConflict(
-                            robot_a=robot_a,
-                            robot_b=robot_b,
-                            intersection_point=p1,  # Current position as conflict point
-                            time_to_intersection_a=0.0,  # Already there
-                            time_to_intersection_b=0.0,
-                        )
-                    )
-                    continue  # Skip other checks, proximity takes precedence
+                if distance(p1, p2) < self.collision_radius:
+                    conflicts.append(PathConflict(ids[a], ids[b], p1, 0.0, 0.0))
+                    continue
 
                 # 2. PATH CROSSING CHECK: Do the paths intersect?
                 intersects, intersection = segments_intersect(p1, t1, p2, t2)
-
-                if intersects and intersection:
-                    # Check arrival times (speed based on distance to final target)
+                if intersects:
+                    if speeds is None:
+                        # Only fitted once some paths cross
+                        speeds = self.measured_speeds(robot_ids, position, target).tolist()
                     time_a = estimate_time_to_point(
-                        p1, intersection, t1, self.speed_min, self.speed_max
+                        p1, intersection, t1, self.speed_min, self.speed_max, speeds[a]
                     )
                     time_b = estimate_time_to_point(
-                        p2, intersection, t2, self.speed_min, self.speed_max
+                        p2, intersection, t2, self.speed_min, self.speed_max, speeds[b]
                     )
-
-                    # Conflict if both arrive within time window of each other
                     if abs(time_a - time_b) < self.time_window:
-                        conflicts.append(
-                            PathConflict(
-                                robot_a=robot_a,
-                                robot_b=robot_b,
-                                intersection_point=intersection,
-                                time_to_intersection_a=time_a,
-                                time_to_intersection_b=time_b,
-                            )
-                        )
-                else:
-                    # 3. TARGET PROXIMITY CHECK: Are targets too close?
-                    if distance(t1, t2) < self.collision_radius:
-                        conflicts.append(
-                            PathConflict(
-                                robot_a=robot_a,
-                                robot_b=robot_b,
-                                intersection_point=t1,
-                                time_to_intersection_a=estimate_time_to_point(
-                                    p1, t1, t1, self.speed_min, self.speed_max
-                                ),
-                                time_to_intersection_b=estimate_time_to_point(
-                                    p2, t2, t2, self.speed_min, self.speed_max
-                                ),
-                            )
-                        )
+                        conflicts.append(PathConflict(ids[a], ids[b], intersection, time_a, time_b))
 
+                # 3. TARGET PROXIMITY CHECK: Are targets too close?
+                elif distance(t1, t2) < self.collision_radius:
+                    conflicts.append(
+                        PathConflict(
+                            ids[a],
+                            ids[b],
+                            t1,
+                            estimate_time_to_point(p1, t1, t1, self.speed_min, self.speed_max),
+                            estimate_time_to_point(p2, t2, t2, self.speed_min, self.speed_max),
+                        )
+                    )
         return conflicts
 
+    def measured_speeds(
+        self, robot_ids: np.ndarray, position: np.ndarray, target: np.ndarray
+    ) -> np.ndarray:
+        """
+        Speed of each robot towards its target from the pose history.
+
+        NaN where the history is off, too short or has no slot for the robot,
+        or the robot is at its target, in which case the distance-based guess
+        is used.
+        """
+        history = self.context.agent_pose_store.history
+        if history is None or not self.use_measured_speed:
+            return np.full(len(robot_ids), np.nan)
+        # Agents beyond the history's slots have none
+        velocity = np.full((len(robot_ids), 2), np.nan)
+        inside = robot_ids < history.size
+        velocity[inside] = history.velocity(robot_ids[inside])[:, :2]
+        path = target - position
+        length = np.hypot(*path.T)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(length > 1e-6, np.einsum("ij,ij->i", velocity, path) / length, np.nan)
+
     def resolve_conflicts(
         self,
-        targets: Dict[int, Pose2D],
-        poses: Dict[int, Optional[Pose2D]],
+        targets: Mapping[int, Pose2D],
+        poses: Mapping[int, Optional[Pose2D]],
         conflicts: list[PathConflict],
-    ) -> Dict[int, Pose2D]:
+    ) -> PoseTable:
         """
         Resolve conflicts using priority-based strategy.
 
@@ -243,7 +383,7 @@ class PathCrossingResolver(QThread):
         Higher priority robot continues to its target.
         Lower priority robot waits at current position.
         """
-        resolved = dict(targets)
+        waiting_targets: Dict[int, Pose2D] = {}
         waiting_robots: Set[int] = set()
 
         # Get current conflict pairs
@@ -298,16 +438,22 @@ class PathCrossingResolver(QThread):
         for robot_id in waiting_robots:
             pose = poses.get(robot_id)
             if pose:
-                # WAIT strategy: target = current position
-                resolved[robot_id] = Pose2D(pose.x, pose.y, pose.theta)
+                # WAIT strategy: target = current position, as old as that pose
+                waiting_targets[robot_id] = Pose2D(pose.x, pose.y, pose.theta, pose.stamp)
 
-        return resolved
+        return PoseTable.from_mapping(targets).merged(waiting_targets)
 
     def run(self):
         logger.info("Running PathCrossingResolver")
+        # Runs once per new target or pose instead of on a timer
+        input_changes = self.context.world_state.subscribe("agent_targets", "agent_poses")
         while self._running:
-            raw_targets = self.context.agent_target_store.get_all()
-            current_poses = self.context.agent_pose_store.get_all()
+            # Targets and poses from the same moment, neither is copied
+            state = input_changes.wait(timeout=0.5)
+            if state is None:
+                continue
+            raw_targets = state.agent_targets
+            current_poses = state.agent_poses
 
             if self.enabled and raw_targets and current_poses:
                 # Detect path crossings
@@ -322,9 +468,6 @@ class PathCrossingResolver(QThread):
                 # Pass through raw targets
                 self.context.resolved_target_store.update_batch(raw_targets)
 
-            # 20Hz update rate (path planning doesn't need to be as fast as APF)
-            time.sleep(0.05)
-
         logger.info("Stopping PathCrossingResolver")
 
     def stop(self):
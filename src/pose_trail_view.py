@@ -0,0 +1,69 @@
+"""Top-down view of the agents with the trail each left behind."""
+
+from typing import Optional
+
+import numpy as np
+from PyQt6.QtCore import QPointF, QTimer
+from PyQt6.QtGui import QColor, QPainter, QPen, QPolygonF
+from PyQt6.QtWidgets import QWidget
+
+from constants import POSE_TRAIL_DURATION
+from stores.agent_pose_store import AgentPoseStore
+
+
+class PoseTrailView(QWidget):
+    """
+    Draws the last seconds of every agent's pose history, scaled to fit.
+
+    Everything comes from AgentPoseStore.history, the view keeps no state of
+    its own besides the repaint timer.
+    """
+
+    def __init__(self, duration: float = POSE_TRAIL_DURATION, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.duration = duration
+        self.store: Optional[AgentPoseStore] = None
+        self.setMinimumSize(240, 180)
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.update)
+        self._timer.start(100)
+
+    def set_store(self, store: AgentPoseStore):
+        self.store = store
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(30, 30, 30))
+        history = self.store.history if self.store is not None else None
+        if history is None:
+            return
+        ids = self.store.get_all().valid_ids
+        ids = ids[ids < history.size]
+        if ids.size == 0:
+            return
+        times, samples = history.samples(ids)
+        # Relative to the newest sample rather than the clock, so replays draw too
+        recent = times >= np.nanmax(times) - self.duration
+        if not recent.any():
+            return
+        points = samples[recent][:, :2]
+        low, high = points.min(axis=0) - 0.2, points.max(axis=0) + 0.2
+        scale = min(self.width() / (high[0] - low[0]), self.height() / (high[1] - low[1]))
+
+        def to_view(x: float, y: float) -> QPointF:
+            # World y points up
+            return QPointF((x - low[0]) * scale, self.height() - (y - low[1]) * scale)
+
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        for row, agent_id in enumerate(ids.tolist()):
+            trail = samples[row, recent[row]]
+            if len(trail) == 0:
+                continue
+            color = QColor.fromHsv(agent_id * 67 % 360, 200, 230)
+            painter.setPen(QPen(color, 2))
+            painter.drawPolyline(QPolygonF([to_view(x, y) for x, y, _ in trail.tolist()]))
+            x, y, theta = trail[-1].tolist()
+            head = to_view(x, y)
+            painter.drawEllipse(head, 4, 4)
+            painter.drawLine(head, head + QPointF(np.cos(theta) * 12, -np.sin(theta) * 12))
+            painter.drawText(head + QPointF(6, -6), str(agent_id))
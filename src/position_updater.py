@@ -1,4 +1,7 @@
 import logging
+import numpy as np
+from constants import POSE_PREDICTION_LEAD, SERIAL_MIN_SEND_INTERVAL, SERIAL_RESEND_INTERVAL
+from enums.configurations.staleness_policy import StalenessPolicy
 from stores.controller_context import ControllerContext
 from PyQt6.QtCore import QThread, QMutex
 import serial
@@ -15,9 +18,17 @@ class PositionUpdater(QThread):
         self.serial_conn = None
         self._current_port = None | serial.Serial
         self._mutex = QMutex()
+        # Age of the data behind the last message sent for each robot
+        self.message_age_ms: dict[int, float] = {}
+        self.stale_messages = 0
+        self._stale_agents: set[int] = set()
+        self._last_send = 0.0
 
     def run(self):
         logger.info("Running PositionUpdater")
+        # PathCrossingResolver republishes the targets for every new pose, so
+        # this fires once per frame, after the targets have been resolved
+        input_changes = self.context.resolved_target_store.subscribe()
         while self._running:
             if self.context.port is None or self.context.port == "":
                 time.sleep(0.5)
@@ -42,27 +53,43 @@ class PositionUpdater(QThread):
                     time.sleep(0.5)
                     continue
 
+            # On timeout the last state is resent
+            input_changes.wait(timeout=SERIAL_RESEND_INTERVAL)
+            wait_left = self._last_send + SERIAL_MIN_SEND_INTERVAL - time.monotonic()
+            if wait_left > 0:
+                # Rate limit for the serial link
+                time.sleep(wait_left)
+            self._last_send = time.monotonic()
+
             targets = self.context.resolved_target_store.get_all()
-            all_poses = self.context.agent_pose_store.get_all()
+            # Predict where each agent is when this message takes effect
+            now = time.monotonic()
+            poses = self.context.pose_estimator.predict_table(now + POSE_PREDICTION_LEAD)
 
             # Determine move signal: 0 = STOP, 1 = MOVE
-            any_missing = any(pose is None for pose in all_poses.values())
+            any_missing = bool((poses.present & ~poses.valid).any())
             move_signal = 0 if (self.context.safety_stop_enabled and any_missing) else 1
 
-            for marker_id, pose in all_poses.items():
-                if marker_id > 3:
-                    continue
-                if pose is None:
+            # Robots with a pose; without a resolved target they hold position
+            ids = poses.valid_ids
+            ids = ids[ids <= 3]
+            x, y, theta = poses.pose[:, ids]
+            has_target = targets.valid_mask(ids)
+            target_ids = ids[has_target]
+            xt, yt = x.copy(), y.copy()
+            target_time = poses.timestamp[ids]
+            xt[has_target] = targets.x[target_ids]
+            yt[has_target] = targets.y[target_ids]
+            target_time[has_target] = targets.timestamp[target_ids]
+            ages_ms = message_ages_ms(now, poses.timestamp[ids], target_time)
+
+            rows = zip(*(column.tolist() for column in (ids, ages_ms, x, y, theta, xt, yt)))
+            for marker_id, age_ms, px, py, ptheta, pxt, pyt in rows:
+                self.message_age_ms[marker_id] = age_ms
+                if self.check_stale(marker_id, age_ms):
                     continue
-                else:
-                    if marker_id not in targets:
-                        xt = pose.x
-                        yt = pose.y
-                    else:
-                        target_pose = targets[marker_id]
-                        xt, yt = target_pose.x, target_pose.y
 
-                    message = f"{move_signal},{marker_id},{pose.x:.3f},{pose.y:.3f},{pose.theta:.3f},{xt:.3f},{yt:.3f}\n"
+                message = f"{move_signal},{marker_id},{px:.3f},{py:.3f},{ptheta:.3f},{pxt:.3f},{pyt:.3f}\n"
 
                 logger.debug(message.strip())
 
@@ -76,14 +103,45 @@ class PositionUpdater(QThread):
                     if self.serial_conn and self.serial_conn.is_open:
                         self.serial_conn.close()
                     self.serial_conn = None
+                    break
                 finally:
                     self._mutex.unlock()
-
-            time.sleep(0.05)
         logger.info("Stopping PositionUpdater")
 
+    def check_stale(self, marker_id: int, age_ms: float) -> bool:
+        """
+        Apply the staleness budget to a message. Returns True if it must be skipped.
+
+        Only transitions into and out of the stale state are logged.
+        """
+        budget = self.context.staleness_budget_ms
+        if budget is None or age_ms <= budget:
+            if marker_id in self._stale_agents:
+                self._stale_agents.discard(marker_id)
+                logger.info(f"Robot {marker_id}: data fresh again ({age_ms:.0f} ms)")
+            return False
+
+        self.stale_messages += 1
+        if marker_id not in self._stale_agents:
+            self._stale_agents.add(marker_id)
+            logger.warning(
+                f"Robot {marker_id}: data is {age_ms:.0f} ms old, budget {budget:.0f} ms "
+                f"({self.context.staleness_policy.name})"
+            )
+        return self.context.staleness_policy == StalenessPolicy.SKIP
+
     def stop(self):
         self._running = False
         if self.serial_conn and self.serial_conn.is_open:
             self.serial_conn.close()
             logger.info("Serial port closed")
+
+
+def message_ages_ms(now: float, *timestamps: np.ndarray) -> np.ndarray:
+    """
+    Age of the oldest stamped input of each message, 0 where none are stamped.
+
+    Unstamped inputs are NaN in the timestamp arrays, as in PoseTable.
+    """
+    oldest = np.fmin.reduce(np.stack(timestamps))
+    return np.where(np.isnan(oldest), 0.0, (now - oldest) * 1000.0)
@@ -0,0 +1,87 @@
+"""Run a pipeline stage in its own process instead of a QThread of the GUI process."""
+
+import logging
+import multiprocessing
+import signal
+import threading
+from typing import Optional
+
+from stores.controller_context import ControllerContext
+from stores.shared_memory import process_context
+
+logger = logging.getLogger(__name__)
+
+
+class StageProcess:
+    """
+    Runs stage_class(*args, **kwargs).run() in a spawned process.
+
+    The arguments are pickled, so the stage's ControllerContext must be a
+    SharedControllerContext; the stage then reads and writes the same shared
+    memory as the rest of the pipeline while its Python code has an
+    interpreter, and a GIL, of its own.
+
+    Mirrors the part of the QThread API the GUI uses: start(), stop(),
+    wait() and isRunning(). Calls of the stage's other public methods, e.g.
+    set_enabled() or set_pose_mode(), are forwarded to the stage in the
+    process, where they run on a helper thread just as a GUI thread's call
+    on a QThread stage would. Their return values are not sent back.
+    """
+
+    def __init__(self, stage_class: type, *args, **kwargs):
+        self.stage_class = stage_class
+        self._args = args
+        self._kwargs = kwargs
+        self._calls = process_context.Queue()
+        self._process: Optional[multiprocessing.Process] = None
+
+    def start(self):
+        self._process = process_context.Process(
+            target=_run_stage,
+            args=(self.stage_class, self._args, self._kwargs, self._calls),
+            name=self.stage_class.__name__,
+            daemon=True,
+        )
+        self._process.start()
+        logger.info(f"{self.stage_class.__name__} running in process {self._process.pid}")
+
+    def stop(self):
+        self._calls.put(("stop", ()))
+
+    def wait(self, msecs: Optional[int] = None) -> bool:
+        """Wait for the process to end, True unless msecs passed first."""
+        if self._process is None:
+            return True
+        self._process.join(None if msecs is None else msecs / 1000)
+        return not self._process.is_alive()
+
+    def isRunning(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or not callable(getattr(self.stage_class, name, None)):
+            raise AttributeError(f"{self.stage_class.__name__} stage has no method {name}")
+        return lambda *args: self._calls.put((name, args))
+
+
+def _run_stage(stage_class: type, args: tuple, kwargs: dict, calls):
+    # Logging is configured per process, and Ctrl+C is the GUI's to handle
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    stage = stage_class(*args, **kwargs)
+
+    def forward_calls():
+        while True:
+            name, call_args = calls.get()
+            getattr(stage, name)(*call_args)
+            if name == "stop":
+                return
+
+    threading.Thread(target=forward_calls, name=f"{stage_class.__name__} calls", daemon=True).start()
+    stage.run()
+    # The context was attached when the arguments were unpickled, unmap it
+    for argument in (*args, *kwargs.values()):
+        if isinstance(argument, ControllerContext):
+            argument.close()
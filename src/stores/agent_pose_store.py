@@ -1,32 +1,66 @@
-from threading import Lock
-from typing import Dict, Optional
-# from dataclasses import dataclass
+from typing import Dict, Mapping, Optional
+
+import numpy as np
 
 from models.vectors import Pose2D
+from stores.pose_history import PoseHistory
+from stores.pose_table import PoseTable
+from stores.world_state_store import WorldStateStore, WorldStateSubscription
 
 
 class AgentPoseStore:
-    def __init__(self):
-        self._lock = Lock()
-        self._poses: Dict[int, Optional[Pose2D]] = {}
+    """
+    Measured agent poses, a view on WorldState.agent_poses.
+
+    With a history_length, every stamped pose published is also appended to
+    a PoseHistory for velocity queries and trails; history passes in an
+    existing one instead.
+    """
+
+    def __init__(
+        self,
+        world_state: Optional[WorldStateStore] = None,
+        history_length: int = 0,
+        history: Optional[PoseHistory] = None,
+    ):
+        self._world_state = world_state if world_state is not None else WorldStateStore()
+        if history is None and history_length > 0:
+            history = PoseHistory(history_length)
+        self.history = history
 
     def update(self, agent_id: int, pose: Optional[Pose2D]):
-        with self._lock:
-            # print(f"{agent_id}:{pose}")
-            self._poses[agent_id] = pose
+        self.update_batch({agent_id: pose})
 
-    def update_batch(self, pose_dict: Dict[int, Optional[Pose2D]]):
-        with self._lock:
-            self._poses.update(pose_dict)
+    def update_batch(self, pose_dict: Mapping[int, Optional[Pose2D]]):
+        state = self._world_state.merge("agent_poses", pose_dict)
+        if self.history is not None:
+            ids = pose_dict.ids if isinstance(pose_dict, PoseTable) else np.fromiter(pose_dict, np.int64)
+            self._record(state.agent_poses, ids)
+
+    def update_arrays(self, ids: np.ndarray, pose: np.ndarray, **columns):
+        """Update from arrays without Pose2D objects, see PoseTable.merged_arrays."""
+        state = self._world_state.merge_arrays("agent_poses", ids, pose, **columns)
+        if self.history is not None:
+            self._record(state.agent_poses, np.asarray(ids, dtype=np.int64))
+
+    def _record(self, poses: PoseTable, ids: np.ndarray):
+        # From the snapshot this update produced, so the merge decides what is stored
+        valid = poses.valid[ids]
+        if not valid.all():
+            ids = ids[valid]
+        self.history.record(ids, poses.pose[:, ids], poses.timestamp[ids])
 
     def get(self, agent_id: int) -> Optional[Pose2D]:
-        with self._lock:
-            return self._poses.get(agent_id)
+        return self._world_state.snapshot().agent_poses.get(agent_id)
 
-    def get_all(self) -> Dict[int, Optional[Pose2D]]:
-        with self._lock:
-            return self._poses.copy()
+    def get_all(self) -> PoseTable:
+        """Read-only mapping, consistent with itself without a copy."""
+        return self._world_state.snapshot().agent_poses
 
     def get_agents_for_link(self, agent_ids: list[int]) -> Dict[int, Optional[Pose2D]]:
-        with self._lock:
-            return {aid: self._poses[aid] for aid in agent_ids if aid in self._poses}
+        poses = self._world_state.snapshot().agent_poses
+        return {aid: poses[aid] for aid in agent_ids if aid in poses}
+
+    def subscribe(self) -> WorldStateSubscription:
+        """Wait for changes instead of polling, see WorldStateSubscription."""
+        return self._world_state.subscribe("agent_poses")
@@ -1,39 +1,46 @@
-"""Thread-safe store for path-resolved target positions."""
+"""Store for path-resolved target positions."""
 
-from threading import Lock
-from typing import Dict, Optional
+from typing import Mapping, Optional
+
+import numpy as np
 
 from models.vectors import Pose2D
+from stores.pose_table import PoseTable
+from stores.world_state_store import WorldStateStore, WorldStateSubscription
 
 
 class AgentResolvedTargetStore:
     """
-    Thread-safe storage for path-resolved target positions.
+    Storage for path-resolved target positions, a view on
+    WorldState.resolved_targets.
 
     This store holds targets that have been processed by the PathCrossingResolver
     to handle path intersection conflicts before APF collision avoidance.
     """
 
-    def __init__(self):
-        self._lock = Lock()
-        self._poses: Dict[int, Pose2D] = {}
+    def __init__(self, world_state: Optional[WorldStateStore] = None):
+        self._world_state = world_state if world_state is not None else WorldStateStore()
 
     def update(self, agent_id: int, pose: Pose2D):
         """Update the resolved target for a single agent."""
-        with self._lock:
-            self._poses[agent_id] = pose
+        self._world_state.merge("resolved_targets", {agent_id: pose})
 
-    def update_batch(self, pose_dict: Dict[int, Pose2D]):
+    def update_batch(self, pose_dict: Mapping[int, Pose2D]):
         """Update resolved targets for multiple agents at once."""
-        with self._lock:
-            self._poses.update(pose_dict)
+        self._world_state.merge("resolved_targets", pose_dict)
+
+    def update_arrays(self, ids: np.ndarray, pose: np.ndarray, **columns):
+        """Update resolved targets from arrays, see PoseTable.merged_arrays."""
+        self._world_state.merge_arrays("resolved_targets", ids, pose, **columns)
 
     def get(self, agent_id: int) -> Optional[Pose2D]:
         """Get the resolved target for a specific agent."""
-        with self._lock:
-            return self._poses.get(agent_id)
+        return self._world_state.snapshot().resolved_targets.get(agent_id)
+
+    def get_all(self) -> PoseTable:
+        """Get all resolved targets as a read-only mapping."""
+        return self._world_state.snapshot().resolved_targets
 
-    def get_all(self) -> Dict[int, Pose2D]:
-        """Get all resolved targets."""
-        with self._lock:
-            return self._poses.copy()
+    def subscribe(self) -> WorldStateSubscription:
+        """Wait for changes to the resolved targets, see WorldStateSubscription."""
+        return self._world_state.subscribe("resolved_targets")
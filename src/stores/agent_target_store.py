@@ -1,30 +1,37 @@
-from threading import Lock
-from typing import Dict, Optional
+from typing import Dict, Mapping, Optional
+
+import numpy as np
 
 from models.vectors import Pose2D
+from stores.pose_table import PoseTable
+from stores.world_state_store import WorldStateStore, WorldStateSubscription
 
 
 class AgentTargetStore:
-    def __init__(self):
-        self._lock = Lock()
-        self._poses: Dict[int, Pose2D] = {}
+    """Formation targets per agent, a view on WorldState.agent_targets."""
+
+    def __init__(self, world_state: Optional[WorldStateStore] = None):
+        self._world_state = world_state if world_state is not None else WorldStateStore()
 
     def update(self, agent_id: int, pose: Pose2D):
-        with self._lock:
-            self._poses[agent_id] = pose
+        self._world_state.merge("agent_targets", {agent_id: pose})
 
-    def update_batch(self, pose_dict: Dict[int, Pose2D]):
-        with self._lock:
-            self._poses.update(pose_dict)
+    def update_batch(self, pose_dict: Mapping[int, Pose2D]):
+        self._world_state.merge("agent_targets", pose_dict)
+
+    def update_arrays(self, ids: np.ndarray, pose: np.ndarray, **columns):
+        """Update from arrays without Pose2D objects, see PoseTable.merged_arrays."""
+        self._world_state.merge_arrays("agent_targets", ids, pose, **columns)
 
     def get(self, agent_id: int) -> Optional[Pose2D]:
-        with self._lock:
-            return self._poses.get(agent_id)
+        return self._world_state.snapshot().agent_targets.get(agent_id)
 
-    def get_all(self) -> Dict[int, Pose2D]:
-        with self._lock:
-            return self._poses.copy()
+    def get_all(self) -> PoseTable:
+        return self._world_state.snapshot().agent_targets
 
     def get_agents_for_link(self, agent_ids: list[int]) -> Dict[int, Pose2D]:
-        with self._lock:
-            return {aid: self._poses[aid] for aid in agent_ids if aid in self._poses}
+        targets = self._world_state.snapshot().agent_targets
+        return {aid: targets[aid] for aid in agent_ids if aid in targets}
+
+    def subscribe(self) -> WorldStateSubscription:
+        return self._world_state.subscribe("agent_targets")
@@ -0,0 +1,16 @@
+from dataclasses import dataclass
+
+from capture.calibration_profile import CalibrationProfile
+from capture.ground_plane import GroundPlane
+from models.camera_config import CameraConfig
+from stores.frame_data_store import FrameDataStore
+
+
+@dataclass
+class CameraChannel:
+    """Per-camera state: where the camera is and what it last detected."""
+
+    config: CameraConfig
+    frame_data_store: FrameDataStore
+    calibration_profile: CalibrationProfile
+    ground_plane: GroundPlane
@@ -1,30 +1,82 @@
+from typing import Optional
+
+from agent_state_estimator import AgentStateEstimator
+from capture.calibration_profile import CalibrationProfile
+from capture.ground_plane import GroundPlane, ground_plane_path
+from capture.pose_fusion import PoseFuser
+from constants import POSE_HISTORY_LENGTH, STALENESS_BUDGET_MS
+from enums.configurations.staleness_policy import StalenessPolicy
+from models.camera_config import CameraConfig
 from stores.agent_resolved_target_store import AgentResolvedTargetStore
 from stores.agent_target_store import AgentTargetStore
+from stores.camera_channel import CameraChannel
 from stores.formation_state_store import FormationStateStore
 from stores.frame_data_store import FrameDataStore
 from stores.link_pose_store import LinkPoseStore
 from stores.agent_pose_store import AgentPoseStore
+from stores.pose_history import PoseHistory
+from stores.world_state_store import WorldStateStore
 
 
 class ControllerContext:
+    world_state: WorldStateStore
     agent_pose_store: AgentPoseStore
     link_pose_store: LinkPoseStore
     formation_state_store: FormationStateStore
     frame_data_store: FrameDataStore
     agent_target_store: AgentTargetStore
     resolved_target_store: AgentResolvedTargetStore
-    port: str
-    safety_stop_enabled: bool
+    calibration_profile: CalibrationProfile
+    camera_channels: dict[int, CameraChannel]
+    pose_fuser: Optional[PoseFuser]
+    pose_estimator: AgentStateEstimator
+    # Settings written by the GUI, the defaults until it does
+    port: str = ""
+    safety_stop_enabled: bool = False
+    staleness_budget_ms: Optional[float] = STALENESS_BUDGET_MS
+    staleness_policy: StalenessPolicy = StalenessPolicy.FLAG
+
+    def __init__(self, cameras: Optional[list[CameraConfig]] = None):
+        # One snapshot behind all control stores, read world_state.snapshot()
+        # when several of them must come from the same moment
+        self.world_state = self._create_world_state()
+        self.agent_pose_store = AgentPoseStore(self.world_state, history=self._create_pose_history())
+        self.link_pose_store = LinkPoseStore(self.world_state)
+        self.formation_state_store = FormationStateStore(self.world_state)
+        self.agent_target_store = AgentTargetStore(self.world_state)
+        self.resolved_target_store = AgentResolvedTargetStore(self.world_state)
+
+        if not cameras:
+            cameras = [CameraConfig(camera_id=0, device_index=0)]
+        self.camera_channels = {
+            camera.camera_id: CameraChannel(
+                camera,
+                self._create_frame_data_store(camera),
+                CalibrationProfile(camera.calibration_path),
+                GroundPlane(ground_plane_path(camera.camera_id)),
+            )
+            for camera in cameras
+        }
+        # The first camera doubles as the single-camera pipeline
+        primary = self.camera_channels[cameras[0].camera_id]
+        self.frame_data_store = primary.frame_data_store
+        self.calibration_profile = primary.calibration_profile
+        self.pose_fuser = PoseFuser(list(self.camera_channels)) if len(cameras) > 1 else None
+        self.pose_estimator = self._create_pose_estimator()
+
+    def close(self):
+        """Release what the context holds outside the process, nothing for this one."""
+
+    # Where the shared state lives, overridden by SharedControllerContext
 
-    def __init__(self):
-        self.agent_pose_store = AgentPoseStore()
-        self.link_pose_store = LinkPoseStore()
-        self.formation_state_store = FormationStateStore()
-        self.frame_data_store = FrameDataStore()
-        self.agent_target_store = AgentTargetStore()
-        self.resolved_target_store = AgentResolvedTargetStore()
-        self.port = ""
-        self.safety_stop_enabled = False  
+    def _create_world_state(self) -> WorldStateStore:
+        return WorldStateStore()
 
+    def _create_pose_history(self) -> Optional[PoseHistory]:
+        return PoseHistory(POSE_HISTORY_LENGTH) if POSE_HISTORY_LENGTH > 0 else None
 
+    def _create_frame_data_store(self, camera: CameraConfig) -> FrameDataStore:
+        return FrameDataStore()
 
+    def _create_pose_estimator(self) -> AgentStateEstimator:
+        return AgentStateEstimator()
@@ -1,8 +1,9 @@
-from threading import Lock
 from typing import Optional
 from dataclasses import dataclass
 
-@dataclass
+from stores.world_state_store import WorldStateStore, WorldStateSubscription
+
+@dataclass(frozen=True)
 class FormationDescriptor:
     r_d: tuple[float, float]      # global position
     q_d: float                    # global orientation
@@ -10,14 +11,18 @@ class FormationDescriptor:
     link_multipliers: list[float] # length multipliers per link
 
 class FormationStateStore:
-    def __init__(self):
-        self._lock = Lock()
-        self._formation: Optional[FormationDescriptor] = None
+    """The commanded formation, a view on WorldState.formation."""
+
+    def __init__(self, world_state: Optional[WorldStateStore] = None):
+        self._world_state = world_state if world_state is not None else WorldStateStore()
 
     def update(self, new_state: FormationDescriptor):
-        with self._lock:
-            self._formation = new_state
+        # Republishing an unchanged formation would wake every subscriber
+        if new_state != self._world_state.snapshot().formation:
+            self._world_state.publish(formation=new_state)
 
     def get(self) -> Optional[FormationDescriptor]:
-        with self._lock:
-            return self._formation
+        return self._world_state.snapshot().formation
+
+    def subscribe(self) -> WorldStateSubscription:
+        return self._world_state.subscribe("formation")
@@ -1,26 +1,68 @@
-from threading import Lock
-from typing import Sequence
+import time
+from dataclasses import dataclass
+from threading import Condition
+from typing import Optional, Sequence
 
 from cv2 import UMat
 from numpy import ndarray
 import numpy as np
 
 
+@dataclass(frozen=True)
+class FrameData:
+    sequence: int  # capture sequence number of the frame the detections came from
+    timestamp: float  # time.monotonic() when that frame was captured
+    ids: Optional[ndarray]
+    corners: Sequence[UMat]
+
+
 class FrameDataStore:
     ids: ndarray
     corners: Sequence[UMat]
+    sequence: int
+    timestamp: float
 
     def __init__(self):
-        self._lock = Lock()
+        self._condition = Condition()
         self.ids = np.empty((4, 1))
         self.corners = []
+        self.sequence = 0
+        self.timestamp = 0.0
 
-    def update(self, ids, corners):
-        with self._lock:
+    def update(
+        self,
+        ids,
+        corners,
+        sequence: Optional[int] = None,
+        timestamp: Optional[float] = None,
+    ):
+        """
+        Publish the detections of a new frame and wake up waiting readers.
+
+        sequence must increase monotonically; when omitted the next number
+        after the current one is used. timestamp is the frame's capture time
+        and defaults to now.
+        """
+        with self._condition:
             self.ids = ids
             self.corners = corners
+            self.sequence = sequence if sequence is not None else self.sequence + 1
+            self.timestamp = timestamp if timestamp is not None else time.monotonic()
+            self._condition.notify_all()
 
     def get(self) -> tuple[ndarray, Sequence[UMat]]:
-        with self._lock:
+        with self._condition:
             return (self.ids, self.corners)
 
+    def get_latest(self) -> FrameData:
+        with self._condition:
+            return FrameData(self.sequence, self.timestamp, self.ids, self.corners)
+
+    def wait_for_newer(
+        self, sequence: int, timeout: Optional[float] = None
+    ) -> Optional[FrameData]:
+        """Block until a frame newer than sequence is published. None on timeout."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.sequence > sequence, timeout):
+                return None
+            return FrameData(self.sequence, self.timestamp, self.ids, self.corners)
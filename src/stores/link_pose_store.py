@@ -1,23 +1,33 @@
-from threading import Lock
-from typing import Dict, Optional
-from dataclasses import dataclass
+from typing import Mapping, Optional
+
+import numpy as np
 
 from models.vectors import Pose2D
+from stores.pose_table import PoseTable
+from stores.world_state_store import WorldStateStore, WorldStateSubscription
 
 
 class LinkPoseStore:
-    def __init__(self):
-        self._lock = Lock()
-        self._poses: Dict[int, Pose2D] = {}
+    """Formation link poses, a view on WorldState.link_poses."""
+
+    def __init__(self, world_state: Optional[WorldStateStore] = None):
+        self._world_state = world_state if world_state is not None else WorldStateStore()
 
     def update(self, link_id: int, pose: Pose2D):
-        with self._lock:
-            self._poses[link_id] = pose
+        self._world_state.merge("link_poses", {link_id: pose})
+
+    def update_batch(self, pose_dict: Mapping[int, Pose2D]):
+        self._world_state.merge("link_poses", pose_dict)
+
+    def update_arrays(self, ids: np.ndarray, pose: np.ndarray, **columns):
+        """Update from arrays without Pose2D objects, see PoseTable.merged_arrays."""
+        self._world_state.merge_arrays("link_poses", ids, pose, **columns)
 
     def get(self, link_id: int) -> Optional[Pose2D]:
-        with self._lock:
-            return self._poses.get(link_id)
+        return self._world_state.snapshot().link_poses.get(link_id)
+
+    def get_all(self) -> PoseTable:
+        return self._world_state.snapshot().link_poses
 
-    def get_all(self) -> Dict[int, Pose2D]:
-        with self._lock:
-            return self._poses.copy()
+    def subscribe(self) -> WorldStateSubscription:
+        return self._world_state.subscribe("link_poses")
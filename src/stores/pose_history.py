@@ -0,0 +1,160 @@
+"""Bounded per-agent pose history with vectorized motion queries."""
+
+from threading import Lock
+from typing import Optional
+
+import numpy as np
+
+from constants import MARKER_DICTIONARY_SIZE, POSE_HISTORY_FIT_SAMPLES
+
+
+def _wrap_angle(angle: np.ndarray) -> np.ndarray:
+    return (angle + np.pi) % (2 * np.pi) - np.pi
+
+
+class PoseHistory:
+    """
+    The last length timestamped poses of every agent in preallocated rings.
+
+    Slot i holds agent id i, like AgentStateEstimator and PoseTable. Only
+    samples newer than an agent's latest one are recorded, so republished
+    or coasted poses that keep their old stamp do not distort the history.
+    All queries take an array of agent ids and answer for all of them at
+    once; agents without enough history get NaN.
+    """
+
+    def __init__(self, length: int, size: int = MARKER_DICTIONARY_SIZE):
+        self.length = length
+        self.size = size
+        self._lock = Lock()
+        # -inf until written, so any real sample is newer than an empty slot
+        self._time = np.full((size, length), -np.inf)
+        self._pose = np.zeros((size, length, 3))  # x, y, theta
+        self._head = np.zeros(size, dtype=np.int64)  # next slot to write
+        self._count = np.zeros(size, dtype=np.int64)
+
+    def record(self, ids: np.ndarray, pose: np.ndarray, timestamp: np.ndarray):
+        """Append one sample per id, pose is (3, len(ids)) like PoseTable.pose."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if ids.size and ids.max() >= self.size:
+            inside = ids < self.size
+            ids, pose, timestamp = ids[inside], pose[:, inside], timestamp[inside]
+        with self._lock:
+            slots = self._head[ids]
+            # Slot -1 is the ring's last one, where the newest sample is when head is 0
+            newer = timestamp > self._time[ids, slots - 1]
+            if not newer.all():
+                ids, slots, pose, timestamp = ids[newer], slots[newer], pose[:, newer], timestamp[newer]
+            self._time[ids, slots] = timestamp
+            self._pose[ids, slots] = pose.T
+            self._head[ids] = (slots + 1) % self.length
+            self._count[ids] = np.minimum(self._count[ids] + 1, self.length)
+
+    def clear(self):
+        with self._lock:
+            self._time[:] = -np.inf
+            self._head[:] = 0
+            self._count[:] = 0
+
+    def samples(self, ids: np.ndarray, count: Optional[int] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The newest count samples per agent, oldest first.
+
+        Returns times (n, count) and poses (n, count, 3); missing samples
+        are NaN and always come first. Theta is unwrapped along the samples.
+        """
+        count = self.length if count is None else min(count, self.length)
+        ids = np.asarray(ids, dtype=np.int64)
+        with self._lock:
+            # Ring positions from count-1 samples back up to the newest
+            back = np.arange(count - 1, -1, -1)
+            slots = (self._head[ids, None] - 1 - back) % self.length
+            times = self._time[ids[:, None], slots]
+            poses = self._pose[ids[:, None], slots]
+            available = np.minimum(self._count[ids], count)
+        missing = back >= available[:, None]
+        times[missing] = np.nan
+        # Missing samples lead, give them the oldest real theta so they add no
+        # turns; then unwrap by summing the wrapped steps, cheaper than np.unwrap
+        oldest_theta = poses[np.arange(len(ids)), np.minimum(count - available, count - 1), 2]
+        theta = np.where(missing, oldest_theta[:, None], poses[..., 2])
+        steps = _wrap_angle(np.diff(theta, axis=1))
+        poses[..., 0, 2] = theta[:, 0]
+        np.cumsum(steps, axis=1, out=poses[..., 1:, 2])
+        poses[..., 1:, 2] += theta[:, :1]
+        poses[missing] = np.nan
+        return times, poses
+
+    def velocity(self, ids: np.ndarray, count: int = POSE_HISTORY_FIT_SAMPLES) -> np.ndarray:
+        """(n, 3) vx, vy, omega averaged over the newest samples by a least-squares line."""
+        # The slope in closed form, the general _fit costs several times more
+        # and this runs every control cycle
+        times, poses = self.samples(ids, count)
+        recorded = ~np.isnan(times)
+        samples = np.count_nonzero(recorded, axis=1)
+        t = np.where(recorded, times - times[:, -1:], 0.0)
+        scale = np.maximum(np.abs(t).max(axis=1), 1e-9)
+        t /= scale[:, None]
+        mean = t.sum(axis=1) / np.maximum(samples, 1)
+        centred = np.where(recorded, t - mean[:, None], 0.0)
+        spread = np.einsum("nk,nk->n", centred, centred)
+        slope = np.einsum("nk,nkc->nc", centred, np.where(recorded[..., None], poses, 0.0))
+        # Same condition as _fit: the normal matrix's determinant is samples * spread
+        solvable = (samples > 1) & (samples * spread > 1e-9)
+        velocity = np.full((len(times), 3), np.nan)
+        velocity[solvable] = slope[solvable] / (spread * scale)[solvable, None]
+        return velocity
+
+    def acceleration(self, ids: np.ndarray, count: int = POSE_HISTORY_FIT_SAMPLES) -> np.ndarray:
+        """(n, 3) ax, ay, angular acceleration from a least-squares parabola."""
+        return 2.0 * self._fit(ids, count, degree=2)[:, 2]
+
+    def speed(self, ids: np.ndarray, count: int = POSE_HISTORY_FIT_SAMPLES) -> np.ndarray:
+        """Translational speed per agent."""
+        velocity = self.velocity(ids, count)
+        return np.hypot(velocity[:, 0], velocity[:, 1])
+
+    def pose_at(self, ids: np.ndarray, timestamp: float) -> np.ndarray:
+        """
+        (n, 3) poses at timestamp, interpolated between the two samples around it.
+
+        Times outside an agent's history are clamped to its oldest or newest
+        sample; agents without history get NaN.
+        """
+        times, poses = self.samples(ids)
+        rows = np.arange(times.shape[0])
+        recorded = ~np.isnan(times)
+        first = np.argmax(recorded, axis=1)
+        # Index of the last sample at or before timestamp, clamped to the history
+        after = np.count_nonzero(recorded & (times <= timestamp), axis=1)
+        upper = np.clip(first + after, first, self.length - 1)
+        lower = np.maximum(upper - 1, first)
+        t0, t1 = times[rows, lower], times[rows, upper]
+        span = t1 - t0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.clip(np.where(span > 0, (timestamp - t0) / span, 1.0), 0.0, 1.0)
+        pose = poses[rows, lower] + weight[:, None] * (poses[rows, upper] - poses[rows, lower])
+        pose[:, 2] = _wrap_angle(pose[:, 2])
+        return pose
+
+    def _fit(self, ids: np.ndarray, count: int, degree: int) -> np.ndarray:
+        """Per-agent polynomial coefficients (n, degree + 1, 3), lowest order first."""
+        times, poses = self.samples(ids, count)
+        recorded = ~np.isnan(times)
+        # Relative to the newest sample and scaled to [-1, 0], which keeps the
+        # normal equations well conditioned
+        t = np.nan_to_num(times - times[:, -1:])
+        scale = np.maximum(np.abs(t).max(axis=1, keepdims=True), 1e-9)
+        powers = np.arange(degree + 1)
+        weights = recorded.astype(float)
+        basis = (t / scale)[..., None] ** powers  # (n, count, degree + 1)
+        weighted = basis * weights[..., None]
+        normal = np.einsum("nki,nkj->nij", weighted, basis)
+        rhs = np.einsum("nki,nkc->nic", weighted, np.nan_to_num(poses))
+        coefficients = np.full((len(times), degree + 1, 3), np.nan)
+        # Enough distinct samples for a determined fit
+        solvable = np.count_nonzero(recorded, axis=1) > degree
+        solvable &= np.abs(np.linalg.det(normal)) > 1e-9
+        if solvable.any():
+            coefficients[solvable] = np.linalg.solve(normal[solvable], rhs[solvable])
+        return coefficients / scale[..., None] ** powers[:, None]
@@ -0,0 +1,200 @@
+"""Array-backed, read-only table of poses indexed by agent id."""
+
+from collections.abc import Mapping
+from typing import Iterator, Optional
+
+import numpy as np
+
+from constants import MARKER_DICTIONARY_SIZE
+from models.vectors import Pose2D, Stamp
+
+
+class PoseTable(Mapping):
+    """
+    Poses of all agents as contiguous NumPy arrays, slot i holding agent id i.
+
+    x, y and theta are rows of one float64 block, timestamp is NaN for
+    unstamped poses and sequence -1 where the stamp has none. present marks
+    the agents that have an entry at all, valid those whose entry is a pose
+    rather than None (an expected but lost agent). All arrays are read-only
+    views; a change produces a new table through merged() or merged_arrays(),
+    which is what lets WorldState share tables between threads.
+
+    The Mapping interface is a compatibility layer for code written against
+    Dict[int, Optional[Pose2D]]. It builds Pose2D objects on access, hot
+    paths should use the arrays instead.
+    """
+
+    def __init__(
+        self,
+        pose: np.ndarray,
+        timestamp: np.ndarray,
+        sequence: np.ndarray,
+        present: np.ndarray,
+        valid: np.ndarray,
+    ):
+        for array in (pose, timestamp, sequence, present, valid):
+            array.flags.writeable = False
+        self.pose = pose  # (3, size): x, y, theta
+        self.timestamp = timestamp
+        self.sequence = sequence
+        self.present = present
+        self.valid = valid
+
+    @classmethod
+    def empty(cls, size: int = MARKER_DICTIONARY_SIZE) -> "PoseTable":
+        return cls(
+            np.zeros((3, size)),
+            np.full(size, np.nan),
+            np.full(size, -1, dtype=np.int64),
+            np.zeros(size, dtype=bool),
+            np.zeros(size, dtype=bool),
+        )
+
+    @classmethod
+    def from_mapping(cls, poses: Mapping) -> "PoseTable":
+        if isinstance(poses, PoseTable):
+            return poses
+        return cls.empty().merged(poses)
+
+    @property
+    def size(self) -> int:
+        return self.present.size
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.pose[0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.pose[1]
+
+    @property
+    def theta(self) -> np.ndarray:
+        return self.pose[2]
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Agent ids with an entry, ascending."""
+        return np.flatnonzero(self.present)
+
+    @property
+    def valid_ids(self) -> np.ndarray:
+        """Agent ids with a pose, ascending."""
+        return np.flatnonzero(self.valid)
+
+    def valid_mask(self, ids: np.ndarray) -> np.ndarray:
+        """Whether each of ids has a pose, False for ids beyond the table."""
+        ids = np.asarray(ids, dtype=np.int64)
+        inside = ids < self.size
+        mask = np.zeros(ids.size, dtype=bool)
+        mask[inside] = self.valid[ids[inside]]
+        return mask
+
+    def merged(self, updates: Mapping) -> "PoseTable":
+        """A copy with some entries replaced, updates maps id -> Pose2D or None."""
+        if isinstance(updates, PoseTable):
+            ids = updates.ids
+            return self.merged_arrays(
+                ids,
+                updates.pose[:, ids],
+                updates.timestamp[ids],
+                updates.sequence[ids],
+                updates.valid[ids],
+            )
+        nan = float("nan")
+        rows = [
+            (agent_id, 0.0, 0.0, 0.0, nan, -1.0, False)
+            if pose is None
+            else (
+                agent_id,
+                pose.x,
+                pose.y,
+                pose.theta,
+                nan if pose.stamp is None else pose.stamp.timestamp,
+                -1.0 if pose.stamp is None or pose.stamp.sequence is None else pose.stamp.sequence,
+                True,
+            )
+            for agent_id, pose in updates.items()
+        ]
+        table = np.array(rows, dtype=np.float64).reshape(-1, 7).T
+        ids = table[0].astype(np.int64)
+        pose = table[1:4]
+        timestamp = table[4]
+        sequence = table[5].astype(np.int64)
+        valid = table[6].astype(bool)
+        return self.merged_arrays(ids, pose, timestamp, sequence, valid)
+
+    def merged_arrays(
+        self,
+        ids: np.ndarray,
+        pose: np.ndarray,
+        timestamp=np.nan,
+        sequence=-1,
+        valid=True,
+    ) -> "PoseTable":
+        """
+        A copy with the entries of ids replaced, without Python objects.
+
+        pose is (3, len(ids)) x, y, theta; timestamp, sequence and valid are
+        per-id arrays or one value for all.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        size = max(self.size, int(ids.max()) + 1) if ids.size else self.size
+        new_pose = _grown(self.pose, size, 0.0)
+        new_timestamp = _grown(self.timestamp, size, np.nan)
+        new_sequence = _grown(self.sequence, size, -1)
+        new_present = _grown(self.present, size, False)
+        new_valid = _grown(self.valid, size, False)
+        new_pose[:, ids] = pose
+        new_timestamp[ids] = timestamp
+        new_sequence[ids] = sequence
+        new_present[ids] = True
+        new_valid[ids] = valid
+        return PoseTable(new_pose, new_timestamp, new_sequence, new_present, new_valid)
+
+    def __getitem__(self, agent_id: int) -> Optional[Pose2D]:
+        if not 0 <= agent_id < self.size or not self.present[agent_id]:
+            raise KeyError(agent_id)
+        if not self.valid[agent_id]:
+            return None
+        return self._pose2d(agent_id)
+
+    def items(self):
+        # One conversion per column instead of per entry
+        ids = self.ids
+        valid = self.valid[ids].tolist()
+        columns = (self.pose[:, ids].tolist(), self.timestamp[ids].tolist(), self.sequence[ids].tolist())
+        poses = map(_to_pose2d, *columns[0], *columns[1:])
+        return [
+            (agent_id, pose if is_valid else None)
+            for agent_id, is_valid, pose in zip(ids.tolist(), valid, poses)
+        ]
+
+    def values(self):
+        return [pose for _, pose in self.items()]
+
+    def _pose2d(self, agent_id: int) -> Pose2D:
+        x, y, theta = self.pose[:, agent_id].tolist()
+        return _to_pose2d(x, y, theta, float(self.timestamp[agent_id]), int(self.sequence[agent_id]))
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ids.tolist())
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.present))
+
+
+def _to_pose2d(x: float, y: float, theta: float, timestamp: float, sequence: int) -> Pose2D:
+    if timestamp != timestamp:  # NaN, no stamp
+        return Pose2D(x, y, theta)
+    return Pose2D(x, y, theta, Stamp(timestamp, sequence if sequence >= 0 else None))
+
+
+def _grown(array: np.ndarray, size: int, fill) -> np.ndarray:
+    """Writable copy of a per-agent array, padded with fill to size slots."""
+    if array.shape[-1] == size:
+        return array.copy()
+    grown = np.full(array.shape[:-1] + (size,), fill, dtype=array.dtype)
+    grown[..., : array.shape[-1]] = array
+    return grown
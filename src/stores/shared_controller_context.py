@@ -0,0 +1,248 @@
+"""ControllerContext whose shared state lives in shared memory, for stages in other processes."""
+
+from typing import Callable, Optional
+
+import numpy as np
+
+from agent_state_estimator import AgentStateEstimator
+from constants import MARKER_DICTIONARY_SIZE, POSE_HISTORY_LENGTH
+from enums.configurations.staleness_policy import StalenessPolicy
+from models.camera_config import CameraConfig
+from stores.controller_context import ControllerContext
+from stores.pose_history import PoseHistory
+from stores.shared_frame_data_store import SharedFrameDataStore
+from stores.shared_memory import SeqLock, SharedArrays, process_context
+from stores.shared_world_state_store import SharedWorldStateStore
+
+# Serial port names are short, /dev/serial/by-id/ paths included
+_PORT_BYTES = 256
+
+
+def _share_arrays(owner, arrays: SharedArrays):
+    """Swap owner's private arrays for the shared ones of the same name, keeping the values."""
+    for name in arrays.specs:
+        shared = arrays[name]
+        if arrays.created:
+            shared[...] = getattr(owner, name)
+        setattr(owner, name, shared)
+
+
+def _release_arrays(owner, arrays: SharedArrays):
+    # Views into the block keep it mapped, drop them before unmapping
+    for name in arrays.specs:
+        setattr(owner, name, None)
+    arrays.close()
+
+
+class SharedPoseHistory(PoseHistory):
+    """PoseHistory whose rings live in shared memory, guarded by a process-shared lock."""
+
+    def __init__(
+        self,
+        length: int,
+        size: int = MARKER_DICTIONARY_SIZE,
+        arrays: Optional[SharedArrays] = None,
+        lock=None,
+    ):
+        super().__init__(length, size)
+        self._arrays = arrays if arrays is not None else SharedArrays({
+            "_time": ((size, length), "float64"),
+            "_pose": ((size, length, 3), "float64"),
+            "_head": ((size,), "int64"),
+            "_count": ((size,), "int64"),
+        })
+        self._lock = lock if lock is not None else process_context.Lock()
+        _share_arrays(self, self._arrays)
+
+    def __reduce__(self):
+        return SharedPoseHistory, (self.length, self.size, self._arrays, self._lock)
+
+    def close(self):
+        _release_arrays(self, self._arrays)
+
+
+class SharedAgentStateEstimator(AgentStateEstimator):
+    """
+    AgentStateEstimator whose filter state lives in shared memory.
+
+    FrameAnalyzer corrects it and PositionUpdater predicts from it, which
+    may happen in different processes.
+    """
+
+    def __init__(
+        self,
+        size: int = MARKER_DICTIONARY_SIZE,
+        arrays: Optional[SharedArrays] = None,
+        lock=None,
+    ):
+        super().__init__(size=size)
+        self.size = size
+        self._arrays = arrays if arrays is not None else SharedArrays({
+            "_position": ((size, 3), "float64"),
+            "_rate": ((size, 3), "float64"),
+            "_time": ((size,), "float64"),
+            "_last_seen": ((size,), "float64"),
+            "_last_sequence": ((size,), "int64"),
+            "_expected": ((size,), "bool"),
+        })
+        self._lock = lock if lock is not None else process_context.Lock()
+        _share_arrays(self, self._arrays)
+
+    def __reduce__(self):
+        # Gains and coast time are the constants' defaults in every process
+        return SharedAgentStateEstimator, (self.size, self._arrays, self._lock)
+
+    def close(self):
+        _release_arrays(self, self._arrays)
+
+
+class SharedSettings:
+    """The GUI-written ControllerContext settings, in shared memory under a seqlock."""
+
+    def __init__(self, arrays: Optional[SharedArrays] = None, lock=None):
+        self._arrays = arrays if arrays is not None else SharedArrays({
+            "seqlock": ((1,), "int64"),
+            "port": ((_PORT_BYTES,), "uint8"),
+            # port length, safety stop, staleness budget (NaN for None), staleness policy
+            "values": ((4,), "float64"),
+        })
+        self._lock = lock if lock is not None else process_context.Lock()
+        self._seqlock = SeqLock(self._arrays["seqlock"])
+
+    def __reduce__(self):
+        return SharedSettings, (self._arrays, self._lock)
+
+    def close(self):
+        self._seqlock = None
+        self._arrays.close()
+
+    def get(self) -> tuple[str, bool, Optional[float], StalenessPolicy]:
+        def read():
+            length, safety, budget, policy = self._arrays["values"].tolist()
+            return self._arrays["port"][: int(length)].tobytes(), safety, budget, policy
+
+        port, safety, budget, policy = self._seqlock.read(read)[1]
+        return (
+            port.decode("utf-8"),
+            bool(safety),
+            None if budget != budget else budget,
+            StalenessPolicy(int(policy)),
+        )
+
+    def set(
+        self,
+        port: Optional[str] = None,
+        safety_stop_enabled: Optional[bool] = None,
+        staleness_budget_ms: Optional[float] = None,
+        staleness_policy: Optional[StalenessPolicy] = None,
+        clear_budget: bool = False,
+    ):
+        """Change the given settings; staleness_budget_ms=None needs clear_budget."""
+        values = self._arrays["values"]
+        with self._lock, self._seqlock.write():
+            if port is not None:
+                encoded = port.encode("utf-8")
+                if len(encoded) > _PORT_BYTES:
+                    raise ValueError(f"Port name longer than {_PORT_BYTES} bytes: {port}")
+                self._arrays["port"][: len(encoded)] = np.frombuffer(encoded, np.uint8)
+                values[0] = len(encoded)
+            if safety_stop_enabled is not None:
+                values[1] = safety_stop_enabled
+            if staleness_budget_ms is not None or clear_budget:
+                values[2] = np.nan if staleness_budget_ms is None else staleness_budget_ms
+            if staleness_policy is not None:
+                values[3] = staleness_policy.value
+
+
+class SharedControllerContext(ControllerContext):
+    """
+    ControllerContext for pipeline stages running in separate processes.
+
+    The world state, the pose history, the state estimator, every camera's
+    FrameDataStore and the GUI settings live in multiprocessing.shared_memory;
+    the store views, calibration and ground plane are rebuilt per process on
+    top of them. Pickling the context, which is how it reaches a spawned
+    stage process, carries only the names of the shared blocks and the
+    process-shared locks, and unpickling attaches to them.
+
+    The process that created the context owns the memory and must close()
+    it once every stage has stopped. The PoseFuser stays per process, so
+    with several cameras the FrameAnalyzers must run in the creating one.
+    """
+
+    def __init__(self, cameras: Optional[list[CameraConfig]] = None, shared: Optional[dict] = None):
+        self._cameras = cameras
+        # Shared parts by name, filled by the _create hooks; given when attaching
+        self._shared = shared if shared is not None else {}
+        created = shared is None
+        self._settings: SharedSettings = self._shared_part("settings", SharedSettings)
+        if created:
+            defaults = ControllerContext
+            self._settings.set(
+                defaults.port,
+                defaults.safety_stop_enabled,
+                defaults.staleness_budget_ms,
+                defaults.staleness_policy,
+                clear_budget=True,
+            )
+        super().__init__(cameras)
+
+    def __reduce__(self):
+        return SharedControllerContext, (self._cameras, self._shared)
+
+    def close(self):
+        parts = list(self._shared.values())
+        self._shared.clear()
+        for part in parts:
+            part.close()
+
+    def _shared_part(self, key: str, create: Callable):
+        if key not in self._shared:
+            self._shared[key] = create()
+        return self._shared[key]
+
+    def _create_world_state(self) -> SharedWorldStateStore:
+        return self._shared_part("world_state", SharedWorldStateStore)
+
+    def _create_pose_history(self) -> Optional[PoseHistory]:
+        if POSE_HISTORY_LENGTH <= 0:
+            return None
+        return self._shared_part("pose_history", lambda: SharedPoseHistory(POSE_HISTORY_LENGTH))
+
+    def _create_frame_data_store(self, camera: CameraConfig) -> SharedFrameDataStore:
+        return self._shared_part(f"frame_data.{camera.camera_id}", SharedFrameDataStore)
+
+    def _create_pose_estimator(self) -> SharedAgentStateEstimator:
+        return self._shared_part("pose_estimator", SharedAgentStateEstimator)
+
+    @property
+    def port(self) -> str:
+        return self._settings.get()[0]
+
+    @port.setter
+    def port(self, port: Optional[str]):
+        self._settings.set(port=port or "")
+
+    @property
+    def safety_stop_enabled(self) -> bool:
+        return self._settings.get()[1]
+
+    @safety_stop_enabled.setter
+    def safety_stop_enabled(self, enabled: bool):
+        self._settings.set(safety_stop_enabled=enabled)
+
+    @property
+    def staleness_budget_ms(self) -> Optional[float]:
+        return self._settings.get()[2]
+
+    @staleness_budget_ms.setter
+    def staleness_budget_ms(self, budget: Optional[float]):
+        self._settings.set(staleness_budget_ms=budget, clear_budget=budget is None)
+
+    @property
+    def staleness_policy(self) -> StalenessPolicy:
+        return self._settings.get()[3]
+
+    @staleness_policy.setter
+    def staleness_policy(self, policy: StalenessPolicy):
+        self._settings.set(staleness_policy=policy)
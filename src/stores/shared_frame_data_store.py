@@ -0,0 +1,122 @@
+"""FrameDataStore backed by shared memory, for a FrameAnalyzer in another process."""
+
+import logging
+import time
+from typing import Optional
+
+import numpy as np
+
+from constants import SHARED_FRAME_MAX_MARKERS
+from stores.frame_data_store import FrameData, FrameDataStore
+from stores.shared_memory import SeqLock, SharedArrays, process_context
+
+logger = logging.getLogger(__name__)
+
+
+def _specs(max_markers: int) -> dict:
+    return {
+        "seqlock": ((1,), "int64"),
+        # frame sequence, number of markers, whether ids is None
+        "header": ((3,), "int64"),
+        "timestamp": ((1,), "float64"),
+        "ids": ((max_markers,), "int32"),
+        "corners": ((max_markers, 4, 2), "float32"),
+    }
+
+
+class SharedFrameDataStore(FrameDataStore):
+    """
+    The latest detections of one camera in multiprocessing.shared_memory.
+
+    Same interface as FrameDataStore: update() copies ids and corners into
+    fixed-size arrays inside a seqlock and wakes the waiting readers through
+    a shared Condition, readers get a FrameData with their own copy. Ids are
+    returned as (N, 1) int32 and corners as N (1, 4, 2) float32 arrays, the
+    layout cv2.aruco produces. Detections beyond max_markers are dropped.
+    """
+
+    def __init__(
+        self,
+        max_markers: int = SHARED_FRAME_MAX_MARKERS,
+        arrays: Optional[SharedArrays] = None,
+        condition=None,
+    ):
+        self.max_markers = max_markers
+        self._arrays = arrays if arrays is not None else SharedArrays(_specs(max_markers))
+        self._condition = condition if condition is not None else process_context.Condition()
+        self._seqlock = SeqLock(self._arrays["seqlock"])
+        self._header = self._arrays["header"]
+        self._warned_overflow = False
+
+    def __reduce__(self):
+        return SharedFrameDataStore, (self.max_markers, self._arrays, self._condition)
+
+    def close(self):
+        # Views into the block keep it mapped, drop them before unmapping
+        self._header = self._seqlock = None
+        self._arrays.close()
+
+    @property
+    def ids(self):
+        return self.get_latest().ids
+
+    @property
+    def corners(self):
+        return self.get_latest().corners
+
+    @property
+    def sequence(self) -> int:
+        return int(self._header[0])
+
+    @property
+    def timestamp(self) -> float:
+        return float(self._arrays["timestamp"][0])
+
+    def update(
+        self,
+        ids,
+        corners,
+        sequence: Optional[int] = None,
+        timestamp: Optional[float] = None,
+    ):
+        count = 0 if ids is None else len(ids)
+        if count > self.max_markers:
+            if not self._warned_overflow:
+                logger.warning(f"{count} markers detected, only {self.max_markers} are shared")
+                self._warned_overflow = True
+            count = self.max_markers
+        with self._condition:
+            with self._seqlock.write():
+                if count:
+                    self._arrays["ids"][:count] = np.reshape(ids, -1)[:count]
+                    self._arrays["corners"][:count] = np.reshape(corners[:count], (count, 4, 2))
+                self._header[0] = sequence if sequence is not None else self._header[0] + 1
+                self._header[1] = count
+                self._header[2] = ids is None
+                self._arrays["timestamp"][0] = timestamp if timestamp is not None else time.monotonic()
+            self._condition.notify_all()
+
+    def get(self):
+        frame_data = self.get_latest()
+        return (frame_data.ids, frame_data.corners)
+
+    def get_latest(self) -> FrameData:
+        return self._seqlock.read(self._read)[1]
+
+    def wait_for_newer(
+        self, sequence: int, timeout: Optional[float] = None
+    ) -> Optional[FrameData]:
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._header[0] > sequence, timeout):
+                return None
+            return self.get_latest()
+
+    def _read(self) -> FrameData:
+        frame_sequence, count, no_ids = self._header.tolist()
+        timestamp = float(self._arrays["timestamp"][0])
+        if no_ids:
+            return FrameData(frame_sequence, timestamp, None, ())
+        count = min(count, self.max_markers)
+        ids = self._arrays["ids"][:count, None].copy()
+        corners = self._arrays["corners"][:count, None].copy()
+        return FrameData(frame_sequence, timestamp, ids, tuple(corners))
@@ -0,0 +1,128 @@
+"""NumPy arrays in shared memory and the seqlock that guards them."""
+
+import multiprocessing
+import platform
+import time
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Callable, Optional, TypeVar
+
+import numpy as np
+
+from constants import SEQLOCK_WRITE_TIMEOUT
+
+T = TypeVar("T")
+
+# Every array starts on its own cache line
+_ALIGNMENT = 64
+
+# CPUs whose memory model keeps stores, and loads, in program order (TSO)
+_ORDERED_MACHINES = ("x86_64", "amd64", "i386", "i686", "x86")
+
+# Stage processes are spawned, locks shared with them must come from the same context
+process_context = multiprocessing.get_context("spawn")
+
+
+class SharedArrays:
+    """
+    Named NumPy arrays laid out in one multiprocessing.shared_memory block.
+
+    specs maps each name to (shape, dtype). Without a name a new block is
+    created and zero-filled; pickling the object and unpickling it in
+    another process attaches to the same block by name. The creator owns the
+    block and removes it in close(), attached copies only unmap it.
+    """
+
+    def __init__(self, specs: dict[str, tuple[tuple[int, ...], str]], name: Optional[str] = None):
+        self.specs = specs
+        offsets = {}
+        size = 0
+        for key, (shape, dtype) in specs.items():
+            offsets[key] = size
+            nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            size += -(-nbytes // _ALIGNMENT) * _ALIGNMENT
+        self.created = name is None
+        self._shm = shared_memory.SharedMemory(name=name, create=self.created, size=max(size, 1))
+        self._arrays = {
+            key: np.ndarray(shape, dtype, buffer=self._shm.buf, offset=offsets[key])
+            for key, (shape, dtype) in specs.items()
+        }
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        return self._arrays[key]
+
+    def __reduce__(self):
+        return SharedArrays, (self.specs, self._shm.name)
+
+    def close(self):
+        # Views into the buffer must be gone before it can be unmapped
+        self._arrays.clear()
+        self._shm.close()
+        if self.created:
+            self._shm.unlink()
+
+
+class SeqLock:
+    """
+    Sequence lock over a one-element int64 counter in shared memory.
+
+    A writer makes the counter odd, changes the data and makes it even
+    again. Readers copy the data without taking any lock and retry when the
+    counter was odd or moved while they copied, so a reader never waits for
+    another reader and never delays the writer. Writers must be serialized
+    by the caller, e.g. with the lock of a Condition.
+
+    There are no memory fences, the counter and data stores must become
+    visible in program order, so construction fails on anything but x86.
+    A writer that dies halfway leaves the counter odd for good; readers
+    raise RuntimeError once it has looked that way for write_timeout
+    seconds instead of spinning forever.
+    """
+
+    def __init__(self, counter: np.ndarray, write_timeout: float = SEQLOCK_WRITE_TIMEOUT):
+        machine = platform.machine().lower()
+        if machine not in _ORDERED_MACHINES:
+            raise RuntimeError(
+                f"SeqLock relies on x86 memory ordering, shared-memory stores are not "
+                f"supported on {machine or 'this CPU'}"
+            )
+        self._counter = counter
+        self.write_timeout = write_timeout
+
+    @property
+    def sequence(self) -> int:
+        return int(self._counter[0])
+
+    @contextmanager
+    def write(self):
+        self._counter[0] += 1
+        try:
+            yield
+        finally:
+            self._counter[0] += 1
+
+    def read(self, copy: Callable[[], T]) -> tuple[int, T]:
+        """copy() a consistent state of the data, returns the sequence it belongs to."""
+        # The odd sequence a writer is in the middle of and when it was first seen
+        unfinished: Optional[tuple[int, float]] = None
+        while True:
+            start = int(self._counter[0])
+            if start & 1:
+                # A writer is halfway through, let it finish
+                now = time.monotonic()
+                if unfinished is None or unfinished[0] != start:
+                    unfinished = (start, now)
+                elif now - unfinished[1] > self.write_timeout:
+                    raise RuntimeError(
+                        f"Shared memory write {start} unfinished for {self.write_timeout} s, "
+                        f"its writer probably died"
+                    )
+                time.sleep(0)
+                continue
+            value = copy()
+            if int(self._counter[0]) == start:
+                return start, value
@@ -0,0 +1,180 @@
+"""WorldStateStore backed by shared memory, readable and writable from several processes."""
+
+from dataclasses import fields, replace
+from typing import Optional
+
+import numpy as np
+
+from constants import MARKER_DICTIONARY_SIZE, NUM_LINKS
+from stores.formation_state_store import FormationDescriptor
+from stores.pose_table import PoseTable
+from stores.shared_memory import SeqLock, SharedArrays, process_context
+from stores.world_state_store import WorldState, WorldStateStore
+
+FIELD_NAMES = [field.name for field in fields(WorldState)]
+POSE_FIELDS = ("agent_poses", "agent_targets", "resolved_targets", "link_poses")
+POSE_COLUMNS = ("pose", "timestamp", "sequence", "present", "valid")
+
+
+def _specs(size: int) -> dict:
+    specs = {
+        "seqlock": ((1,), "int64"),
+        # Slot 0 is the state version, the others the version of each field's last change
+        "versions": ((len(FIELD_NAMES),), "int64"),
+        # r_d (2), q_d, theta_d, link_multipliers
+        "formation": ((3 + 2 * NUM_LINKS,), "float64"),
+        # has formation, len(theta_d), len(link_multipliers)
+        "formation_lengths": ((3,), "int64"),
+    }
+    for field in POSE_FIELDS:
+        specs[f"{field}.pose"] = ((3, size), "float64")
+        specs[f"{field}.timestamp"] = ((size,), "float64")
+        specs[f"{field}.sequence"] = ((size,), "int64")
+        specs[f"{field}.present"] = ((size,), "bool")
+        specs[f"{field}.valid"] = ((size,), "bool")
+    return specs
+
+
+class SharedWorldStateStore(WorldStateStore):
+    """
+    WorldStateStore whose state lives in multiprocessing.shared_memory.
+
+    Writers in any process take the shared Condition's lock, write the
+    changed fields in place inside a seqlock and wake every subscriber.
+    Readers copy the fields under the seqlock without locking; the copy is
+    an ordinary immutable WorldState, cached until the next write, and
+    fields that did not change since the last copy are reused rather than
+    copied again. Pose tables have a fixed capacity of size agents.
+
+    Pickling the store, e.g. as an argument of a spawned process, attaches
+    the other process to the same memory.
+    """
+
+    def __init__(
+        self,
+        size: int = MARKER_DICTIONARY_SIZE,
+        arrays: Optional[SharedArrays] = None,
+        condition=None,
+    ):
+        self.size = size
+        self._arrays = arrays if arrays is not None else SharedArrays(_specs(size))
+        self._condition = condition if condition is not None else process_context.Condition()
+        self._seqlock = SeqLock(self._arrays["seqlock"])
+        self._versions = self._arrays["versions"]
+        self._index = {name: index for index, name in enumerate(FIELD_NAMES)}
+        if self._arrays.created:
+            empty = PoseTable.empty(size)
+            for field in POSE_FIELDS:
+                self._write_table(field, empty)
+        # (seqlock sequence, snapshot, field versions) of the last copy
+        self._cache: Optional[tuple[int, WorldState, np.ndarray]] = None
+
+    def __reduce__(self):
+        return SharedWorldStateStore, (self.size, self._arrays, self._condition)
+
+    def close(self):
+        # Views into the block keep it mapped, drop them before unmapping
+        self._cache = self._versions = self._seqlock = None
+        self._arrays.close()
+
+    @property
+    def _state(self) -> WorldState:
+        # What the inherited publish() and merge() build the next state from
+        return self.snapshot()
+
+    def snapshot(self) -> WorldState:
+        cache = self._cache
+        if cache is not None and cache[0] == self._seqlock.sequence:
+            return cache[1]
+        sequence, (state, versions) = self._seqlock.read(lambda: self._read(cache))
+        self._cache = (sequence, state, versions)
+        return state
+
+    @property
+    def version(self) -> int:
+        return int(self._versions[0])
+
+    def wait_for_newer(
+        self, field_names: tuple[str, ...], version: int, timeout: Optional[float] = None
+    ) -> Optional[WorldState]:
+        indices = [self._index[name] for name in field_names]
+        with self._condition:
+            changed = self._condition.wait_for(
+                lambda: bool((self._versions[indices] > version).any()), timeout
+            )
+            return self.snapshot() if changed else None
+
+    def _read(self, cache: Optional[tuple[int, WorldState, np.ndarray]]):
+        versions = self._versions.copy()
+        changes = {"version": int(versions[0])}
+        for name in POSE_FIELDS + ("formation",):
+            index = self._index[name]
+            if cache is not None and cache[2][index] == versions[index]:
+                continue
+            if name == "formation":
+                changes[name] = self._read_formation()
+            else:
+                changes[name] = self._read_table(name)
+        if cache is None:
+            return WorldState(**changes), versions
+        return replace(cache[1], **changes), versions
+
+    def _read_table(self, field: str) -> PoseTable:
+        return PoseTable(*(self._arrays[f"{field}.{column}"].copy() for column in POSE_COLUMNS))
+
+    def _read_formation(self) -> Optional[FormationDescriptor]:
+        has_formation, joints, links = self._arrays["formation_lengths"].tolist()
+        if not has_formation:
+            return None
+        values = self._arrays["formation"].tolist()
+        return FormationDescriptor(
+            (values[0], values[1]),
+            values[2],
+            values[3 : 3 + joints],
+            values[3 + NUM_LINKS : 3 + NUM_LINKS + links],
+        )
+
+    def _swap(self, changes: dict) -> WorldState:
+        # Checked before anything is written, a failed write must not leave half a state
+        for name, value in changes.items():
+            if isinstance(value, PoseTable) and value.size > self.size:
+                raise ValueError(f"{name}: {value.size} agent slots do not fit the {self.size} shared ones")
+            if isinstance(value, FormationDescriptor) and max(
+                len(value.theta_d), len(value.link_multipliers)
+            ) > NUM_LINKS:
+                raise ValueError(f"Formations with more than {NUM_LINKS} links do not fit shared memory")
+        state = replace(self._state, version=self._state.version + 1, **changes)
+        with self._seqlock.write():
+            for name, value in changes.items():
+                if name == "formation":
+                    self._write_formation(value)
+                else:
+                    self._write_table(name, value)
+                self._versions[self._index[name]] = state.version
+            self._versions[0] = state.version
+        self._cache = (self._seqlock.sequence, state, self._versions.copy())
+        self._condition.notify_all()
+        return state
+
+    def _write_table(self, field: str, table: PoseTable):
+        size = table.size
+        for column in POSE_COLUMNS:
+            target = self._arrays[f"{field}.{column}"]
+            target[..., :size] = getattr(table, column)
+        if size < self.size:
+            # A smaller table has no entries for the remaining slots
+            empty = PoseTable.empty(self.size - size)
+            for column in POSE_COLUMNS:
+                self._arrays[f"{field}.{column}"][..., size:] = getattr(empty, column)
+
+    def _write_formation(self, formation: Optional[FormationDescriptor]):
+        lengths = self._arrays["formation_lengths"]
+        if formation is None:
+            lengths[0] = 0
+            return
+        joints, links = len(formation.theta_d), len(formation.link_multipliers)
+        values = self._arrays["formation"]
+        values[:3] = (*formation.r_d, formation.q_d)
+        values[3 : 3 + joints] = formation.theta_d
+        values[3 + NUM_LINKS : 3 + NUM_LINKS + links] = formation.link_multipliers
+        lengths[:] = (1, joints, links)
@@ -0,0 +1,119 @@
+"""Versioned, immutable snapshots of everything the control loop shares."""
+
+from dataclasses import dataclass, fields, replace
+from threading import Condition
+from typing import TYPE_CHECKING, Mapping, Optional
+
+import numpy as np
+
+from stores.pose_table import PoseTable
+
+if TYPE_CHECKING:
+    # formation_state_store is itself a view on this module
+    from stores.formation_state_store import FormationDescriptor
+
+
+@dataclass(frozen=True)
+class WorldState:
+    version: int  # increases by one with every published change
+    agent_poses: PoseTable
+    agent_targets: PoseTable
+    resolved_targets: PoseTable
+    link_poses: PoseTable
+    formation: Optional["FormationDescriptor"]
+
+
+class WorldStateStore:
+    """
+    Holds the current WorldState and swaps in a new one on every change.
+
+    Writers copy the table they change, build a new snapshot and replace
+    the reference under a lock, so concurrent writes to different fields are
+    not lost. Readers just take the reference: a snapshot is never modified
+    after it is published, so all of its fields belong to the same moment
+    and can be used without locking or copying.
+
+    Stages that only need to run when their input changed subscribe() to
+    the fields they read instead of polling.
+    """
+
+    def __init__(self):
+        self._condition = Condition()
+        self._state = WorldState(
+            version=0,
+            agent_poses=PoseTable.empty(),
+            agent_targets=PoseTable.empty(),
+            resolved_targets=PoseTable.empty(),
+            link_poses=PoseTable.empty(),
+            formation=None,
+        )
+        # Version of the last change to each field
+        self._field_versions = {field.name: 0 for field in fields(WorldState)}
+
+    def snapshot(self) -> WorldState:
+        # Reading one attribute is atomic, no lock needed
+        return self._state
+
+    @property
+    def version(self) -> int:
+        return self._state.version
+
+    def publish(self, **changes) -> WorldState:
+        """Replace whole fields of the current state, e.g. publish(formation=...)."""
+        with self._condition:
+            return self._swap(changes)
+
+    def merge(self, field: str, updates: Mapping) -> WorldState:
+        """Update some entries of a pose table field, keeping the others."""
+        with self._condition:
+            return self._swap({field: getattr(self._state, field).merged(updates)})
+
+    def merge_arrays(self, field: str, ids: np.ndarray, pose: np.ndarray, **columns) -> WorldState:
+        """merge() from arrays, see PoseTable.merged_arrays."""
+        with self._condition:
+            table = getattr(self._state, field).merged_arrays(ids, pose, **columns)
+            return self._swap({field: table})
+
+    def subscribe(self, *field_names: str) -> "WorldStateSubscription":
+        return WorldStateSubscription(self, field_names)
+
+    def wait_for_newer(
+        self, field_names: tuple[str, ...], version: int, timeout: Optional[float] = None
+    ) -> Optional[WorldState]:
+        """Block until one of the fields changed after version. None on timeout."""
+        with self._condition:
+            changed = self._condition.wait_for(
+                lambda: any(self._field_versions[name] > version for name in field_names),
+                timeout,
+            )
+            return self._state if changed else None
+
+    def _swap(self, changes: dict) -> WorldState:
+        state = replace(self._state, version=self._state.version + 1, **changes)
+        self._state = state
+        for name in changes:
+            self._field_versions[name] = state.version
+        self._condition.notify_all()
+        return state
+
+
+class WorldStateSubscription:
+    """
+    Lets a stage sleep until a field it reads changes.
+
+    Each wait() returns once anything changed since the snapshot the
+    previous wait() returned, so no change is missed, while a burst of
+    changes wakes the stage only once.
+    """
+
+    def __init__(self, store: WorldStateStore, field_names: tuple[str, ...]):
+        self._store = store
+        self.field_names = field_names
+        self.version = 0
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[WorldState]:
+        """The newest snapshot, or None if nothing changed within timeout."""
+        state = self._store.wait_for_newer(self.field_names, self.version, timeout)
+        if state is not None:
+            self.version = state.version
+        return state